@@ -1,21 +1,71 @@
+import logging
+import time
+from contextlib import contextmanager
+from django.db import connection, transaction
 from django.utils import timezone
 from user.models import SubAdminSubscription, SignUP
+from user.principal import invalidate_principals
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def advisory_lock(name):
+    """Hold a named database lock for the block; yields False if another run has it.
+
+    MySQL and PostgreSQL use their advisory locks, other backends always run.
+    """
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", [name])
+            acquired = cursor.fetchone()[0] == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", [name])
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [name])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [name])
+    else:
+        yield True
+
 
 def deactivate_expire_account():
-    # Get the current time
+    start = time.monotonic()
     now = timezone.now()
 
-    # Find all subscriptions where the end date has passed and the subscription is still active
-    expired_subscriptions = SubAdminSubscription.objects.filter(endDate__lt=now, isActive=True)
+    with advisory_lock('findMyDSC.deactivate_expire_account') as acquired:
+        if not acquired:
+            logger.info("deactivate_expire_account: previous run still holds the lock, skipping")
+            return {'skipped': True}
 
-    for subscription in expired_subscriptions:
-        # Deactivate the user associated with this expired subscription
-        user = subscription.subAdminID
-        user.hasChosenPlan = False
-        user.save()
+        # Subscriptions whose end date has passed but are still marked active
+        expired_subscriptions = SubAdminSubscription.objects.filter(endDate__lt=now, isActive=True)
 
-        # Deactivate the subscription
-        subscription.isActive = False
-        subscription.save()
+        with transaction.atomic():
+            # Send the owning sub-admins back to plan selection, then close the subscriptions
+            subAdminIDs = list(SignUP.objects.filter(
+                subAdminID__in=expired_subscriptions.values('subAdminID')
+            ).values_list('subAdminID', flat=True))
+            subAdmins = SignUP.objects.filter(subAdminID__in=subAdminIDs).update(hasChosenPlan=False)
+            subscriptions = expired_subscriptions.update(isActive=False)
+            invalidate_principals(*subAdminIDs)
 
-    
+    metrics = {
+        'skipped': False,
+        'subscriptions': subscriptions,
+        'subAdmins': subAdmins,
+        'seconds': round(time.monotonic() - start, 3),
+    }
+    logger.info("deactivate_expire_account: %(subscriptions)d subscriptions and %(subAdmins)d "
+                "sub-admins deactivated in %(seconds).3fs", metrics)
+    return metrics
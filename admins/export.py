@@ -0,0 +1,346 @@
+import hashlib
+import tempfile
+from datetime import timedelta
+from itertools import chain
+import openpyxl
+from openpyxl.utils import get_column_letter
+from django.core.files import File
+from django.db.models import Count, Max
+from django.utils import timezone
+from user.models import (
+    UpdatedDSC, UpdatedClient, UpdatedCompany, UpdatedGroup, UpdatedUser, Work, PendingWork, AnnualFiling, Trademark,
+    ArchivedPendingWork, ArchivedAnnualFiling, ArchivedTrademark,
+)
+from .models import ExportJob
+
+# Rows are pulled from the database in chunks of this size
+CHUNK_SIZE = 2000
+
+# A job still Running after this long is assumed to have lost its worker
+STALE_AFTER = timedelta(hours=1)
+
+# Column widths are fixed up front: a write-only sheet emits its column
+# definitions before the first row, so they cannot be sized from the data.
+DSC_COLUMNS = [
+    ('Group Name', 25), ('Company Name', 35), ('Client Name', 25), ('Status', 12), ('Location', 20),
+    ('Renewal Date', 14), ('Contact Person', 25), ('Phone Number', 15), ('Last Modified Date', 21),
+    ('Last Received By', 20), ('Last Received From', 20), ('Last Delivered By', 20), ('Last Delivery To', 20),
+]
+
+PENDING_WORK_COLUMNS = [
+    ('Company Name', 35), ('Group Name', 25), ('Form No.', 12), ('Event Date', 12), ('Status', 15),
+    ('Internal Due Date', 19), ('Due Date', 12), ('Remarks', 30), ('SRN No.', 14), ('SRN Date', 12),
+    ('SRN Amount', 13), ('Responsible Person', 22), ('Fees', 12), ('Billing', 15),
+]
+
+ANNUAL_FILING_COLUMNS = [
+    ('Company Name', 35), ('Group Name', 25), ('DPT-3', 12), ('MGT-14', 12), ('AOC-4', 12),
+    ('MGT-7', 12), ('Form-11', 12), ('Form-8', 12), ('Financial Year', 16),
+]
+
+REPORT_COLUMNS = [
+    ('SRN Date', 12), ('SRN No.', 14), ('Company Name', 35), ('Group Name', 25), ('Status', 12),
+    ('Form No.', 12), ('SRN Challan Amt', 17),
+]
+
+TRADEMARK_COLUMNS = [
+    ('SRN No.', 9), ('Name of Trademark', 30), ('Name of Applicant', 30), ('Group', 25), ('Application No.', 17),
+    ('Class ', 8), ('Date of Application', 21), ('Current Status 1', 18), ('Current Status 2', 18),
+    ('Remarks', 30), ('Notice Receive / Serve Date', 29), ('Reply Due Date', 16), ('Fees Amt.', 12),
+    ('Hearing Date', 14), ('Renewal Date', 14), ('Fees Received', 15),
+]
+
+# (form label, model field suffix) for the six annual filing forms
+ANNUAL_FORMS = [
+    ('DPT3', 'DPT3'), ('MGT14', 'MGT14'), ('AOC4', 'AOC4'),
+    ('MGT7', 'MGT7'), ('Form 11', 'Form11'), ('Form 8', 'Form8'),
+]
+
+
+def write_sheet(wb, title, columns, rows):
+    ws = wb.create_sheet(title=title)
+    for index, (header, width) in enumerate(columns, start=1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    ws.append([header for header, width in columns])
+    for row in rows:
+        ws.append(row)
+
+
+def client_map(sub_admin_id):
+    """Map each company to its first client (lowest clientID), in one query."""
+    clients = {}
+    rows = UpdatedClient.objects.filter(companyID__subAdminID=sub_admin_id).order_by('-clientID').values_list(
+        'companyID', 'clientName', 'clientPhone'
+    )
+    for companyID, clientName, clientPhone in rows.iterator(chunk_size=CHUNK_SIZE):
+        # Descending order, so the lowest clientID is written last
+        clients[companyID] = (clientName, clientPhone)
+    return clients
+
+
+def dsc_rows(sub_admin_id):
+    clients = client_map(sub_admin_id)
+    dsc_data = UpdatedDSC.objects.filter(subAdminID=sub_admin_id).select_related('companyID__groupID')
+
+    for dsc in dsc_data.iterator(chunk_size=CHUNK_SIZE):
+        company = dsc.companyID
+        group = company.groupID if company else None
+        clientName, clientPhone = clients.get(dsc.companyID_id, ('', ''))
+
+        yield [
+            group.groupName if group else '',
+            company.companyName if company else '',
+            dsc.clientName,
+            dsc.status,
+            dsc.location,
+            dsc.renewalDate.strftime('%d-%m-%Y') if dsc.renewalDate else '',
+            clientName,
+            clientPhone,
+            dsc.modifiedDate.strftime('%d-%m-%Y %H:%M:%S'),
+            dsc.receivedBy,
+            dsc.receivedFrom,
+            dsc.deliveredBy,
+            dsc.deliveredTo
+        ]
+
+
+def pending_work_rows(sub_admin_id, archived):
+    # Archived rows live in their own table (user/archive.py)
+    if archived:
+        pending_works = ArchivedPendingWork.objects.filter(subAdminID=sub_admin_id)
+    else:
+        pending_works = PendingWork.objects.filter(subAdminID=sub_admin_id, isArchived=False)
+    pending_works = pending_works.select_related('companyID__groupID', 'formID', 'userID')
+
+    for task in pending_works.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            task.companyID.companyName,
+            task.companyID.groupID.groupName,
+            task.formID.formNo,
+            task.eventDate,
+            task.status,
+            task.internalDueDate,
+            task.actualDueDate,
+            task.remark,
+            task.srnNo,
+            task.srnDate,
+            task.amt,
+            task.userID.userName,
+            task.fees,
+            task.billing,
+        ]
+
+
+def annual_filing_rows(sub_admin_id, archived):
+    if archived:
+        annual_filings = ArchivedAnnualFiling.objects.filter(subAdminID=sub_admin_id)
+    else:
+        annual_filings = AnnualFiling.objects.filter(subAdminID=sub_admin_id, isArchived=False)
+    annual_filings = annual_filings.select_related('companyID__groupID')
+
+    for filing in annual_filings.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            filing.companyID.companyName,
+            filing.companyID.groupID.groupName,
+            filing.statusDPT3,
+            filing.statusMGT14,
+            filing.statusAOC4,
+            filing.statusMGT7,
+            filing.statusForm11,
+            filing.statusForm8,
+            filing.financialYear,
+        ]
+
+
+def pending_work_report_rows(sub_admin_id):
+    # Reports cover live and archived rows alike
+    pwReports = chain(
+        PendingWork.objects.filter(subAdminID=sub_admin_id).select_related('companyID__groupID', 'formID')
+        .iterator(chunk_size=CHUNK_SIZE),
+        ArchivedPendingWork.objects.filter(subAdminID=sub_admin_id).select_related('companyID__groupID', 'formID')
+        .iterator(chunk_size=CHUNK_SIZE),
+    )
+
+    for report in pwReports:
+        yield [
+            report.srnDate,
+            report.srnNo,
+            report.companyID.companyName,
+            report.companyID.groupID.groupName,
+            report.status,
+            report.formID.formNo,
+            report.amt,
+        ]
+
+
+def annual_filing_report_rows(sub_admin_id):
+    afReports = chain(
+        AnnualFiling.objects.filter(subAdminID=sub_admin_id).select_related('companyID__groupID')
+        .iterator(chunk_size=CHUNK_SIZE),
+        ArchivedAnnualFiling.objects.filter(subAdminID=sub_admin_id).select_related('companyID__groupID')
+        .iterator(chunk_size=CHUNK_SIZE),
+    )
+
+    for report in afReports:
+        # One row per approved form
+        for form_no, suffix in ANNUAL_FORMS:
+            if getattr(report, f'status{suffix}') == "Approved":
+                yield [
+                    getattr(report, f'srnDate{suffix}'),
+                    getattr(report, f'srnNo{suffix}'),
+                    report.companyID.companyName,
+                    report.companyID.groupID.groupName,
+                    "Approved",
+                    form_no,
+                    getattr(report, f'amt{suffix}'),
+                ]
+
+
+def trademark_rows(sub_admin_id, archived):
+    if archived:
+        trademarks = ArchivedTrademark.objects.filter(subAdminID=sub_admin_id)
+    else:
+        trademarks = Trademark.objects.filter(subAdminID=sub_admin_id, isArchived=False)
+    trademarks = trademarks.select_related('groupID')
+
+    for tm in trademarks.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            tm.indexSRN,
+            tm.nameOfTrademark,
+            tm.nameOfApplicant,
+            tm.groupID.groupName,
+            tm.applicationNo,
+            tm.classNo,
+            tm.dateOfApp,
+            tm.status1,
+            tm.status2,
+            tm.remark,
+            tm.oppDate,
+            tm.lastDate,
+            tm.fees,
+            tm.hearingDate,
+            tm.expiryDate,
+            tm.feesStatus,
+        ]
+
+
+def export_sheets(sub_admin_id):
+    """(title, columns, rows) for each sheet of the export, in workbook order."""
+    return [
+        ("DSCs", DSC_COLUMNS, dsc_rows(sub_admin_id)),
+        ("Pending Work", PENDING_WORK_COLUMNS, pending_work_rows(sub_admin_id, False)),
+        ("Pending Work Archived", PENDING_WORK_COLUMNS, pending_work_rows(sub_admin_id, True)),
+        ("Annual Filing", ANNUAL_FILING_COLUMNS, annual_filing_rows(sub_admin_id, False)),
+        ("Annual Filing Archived", ANNUAL_FILING_COLUMNS, annual_filing_rows(sub_admin_id, True)),
+        ("Pending Work Report", REPORT_COLUMNS, pending_work_report_rows(sub_admin_id)),
+        ("Annual Filing Report", REPORT_COLUMNS, annual_filing_report_rows(sub_admin_id)),
+        ("Trademark", TRADEMARK_COLUMNS, trademark_rows(sub_admin_id, False)),
+        ("Trademark Archived", TRADEMARK_COLUMNS, trademark_rows(sub_admin_id, True)),
+    ]
+
+
+def write_export(sub_admin_id, fileobj, progress=None):
+    """Write the sub-admin's nine-sheet export workbook to fileobj.
+
+    The workbook is opened in write-only mode and every sheet is fed from a
+    queryset iterator, so memory stays flat however many rows are exported.
+    progress, if given, is called with the number of sheets written so far.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+
+    for done, (title, columns, rows) in enumerate(export_sheets(sub_admin_id), start=1):
+        write_sheet(wb, title, columns, rows)
+        if progress:
+            progress(done)
+
+    wb.save(fileobj)
+
+
+# Every table the export reads from, with its last-modified column
+EXPORT_SOURCES = [
+    (UpdatedDSC, 'modifiedDate'),
+    (UpdatedClient, 'clientModifiedDate'),
+    (UpdatedCompany, 'companyModifiedDate'),
+    (UpdatedGroup, 'groupModifiedDate'),
+    (UpdatedUser, 'userModifiedDate'),
+    (Work, 'modifiedDate'),
+    (PendingWork, 'modifiedDate'),
+    (AnnualFiling, 'modifiedDate'),
+    (Trademark, 'modifiedDate'),
+    (ArchivedPendingWork, 'modifiedDate'),
+    (ArchivedAnnualFiling, 'modifiedDate'),
+    (ArchivedTrademark, 'modifiedDate'),
+]
+
+
+def export_fingerprint(sub_admin_id):
+    """Fingerprint of the tenant's exported data: row count and latest edit per table.
+
+    Adds and edits move the latest modified date, deletes change the count,
+    so an unchanged fingerprint means a previous export is still current.
+    """
+    parts = []
+    for model, modified in EXPORT_SOURCES:
+        stats = model.objects.filter(subAdminID=sub_admin_id).aggregate(n=Count('pk'), last=Max(modified))
+        parts.append(f"{model.__name__}:{stats['n']}:{stats['last'].isoformat() if stats['last'] else ''}")
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+def request_export(sub_admin_id):
+    """Return the export job for the tenant's current data, queueing one if needed.
+
+    A finished or in-flight job for the same fingerprint is reused, so repeat
+    clicks do not rebuild an identical workbook.
+    """
+    ExportJob.objects.filter(
+        subAdminID=sub_admin_id, status='Running', startedDate__lt=timezone.now() - STALE_AFTER
+    ).update(status='Failed', error='The export worker stopped before finishing.')
+
+    dataVersion = export_fingerprint(sub_admin_id)
+    job = ExportJob.objects.filter(
+        subAdminID=sub_admin_id, dataVersion=dataVersion, status__in=['Pending', 'Running', 'Completed']
+    ).order_by('-exportID').first()
+    if job:
+        return job
+    return ExportJob.objects.create(subAdminID_id=sub_admin_id, dataVersion=dataVersion)
+
+
+def claim_next_job():
+    """Mark the oldest pending job as running and return it, or None if the queue is empty."""
+    while True:
+        job = ExportJob.objects.filter(status='Pending').order_by('createdDate', 'exportID').first()
+        if job is None:
+            return None
+        # Only one worker wins the Pending -> Running transition
+        started = timezone.now()
+        if ExportJob.objects.filter(pk=job.pk, status='Pending').update(status='Running', startedDate=started):
+            job.status, job.startedDate = 'Running', started
+            return job
+
+
+def run_export_job(job):
+    """Build the job's workbook into EXPORT_ROOT and mark it Completed (or Failed)."""
+    def progress(done):
+        ExportJob.objects.filter(pk=job.pk).update(sheetsDone=done)
+
+    try:
+        with tempfile.TemporaryFile() as export_file:
+            write_export(job.subAdminID_id, export_file, progress)
+            export_file.seek(0)
+            # export_path gives the file a random name
+            job.file.save('export.xlsx', File(export_file), save=False)
+        job.status = 'Completed'
+        job.sheetsDone = job.sheetsTotal
+    except Exception as e:
+        job.status = 'Failed'
+        job.error = str(e)
+    job.finishedDate = timezone.now()
+    job.save()
+
+    # Older artifacts for the tenant are superseded by this one
+    if job.status == 'Completed':
+        for old in ExportJob.objects.filter(subAdminID=job.subAdminID_id, status='Completed', exportID__lt=job.exportID):
+            if old.file:
+                old.file.delete(save=False)
+            old.delete()
+    return job
@@ -0,0 +1,116 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Emails claimed and sent over one SMTP connection
+OUTBOX_BATCH_SIZE = 50
+# After this many failed attempts an email is marked Failed and left alone
+MAX_ATTEMPTS = 8
+# Retry delays double from RETRY_BASE up to RETRY_MAX
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=6)
+# A batch still Sending after this long belonged to a worker that died; it is sent again
+STALE_CLAIM = timedelta(minutes=15)
+# Sent emails are kept this long for reference
+KEEP_SENT = timedelta(days=30)
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """Queue an email for the send_outbox worker; a drop-in for send_mail inside views.
+
+    The row is written in the caller's transaction, so nothing is sent for
+    work that is rolled back.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject[:255],
+        body=message,
+        fromEmail=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def claim_batch(size=OUTBOX_BATCH_SIZE):
+    """Mark up to size due emails as Sending for this worker and return them."""
+    now = timezone.now()
+    OutboxEmail.objects.filter(status='Sending', claimedDate__lt=now - STALE_CLAIM).update(status='Pending', claimToken='')
+
+    ids = list(OutboxEmail.objects.filter(status='Pending', nextAttemptDate__lte=now)
+               .order_by('nextAttemptDate', 'emailID').values_list('emailID', flat=True)[:size])
+    if not ids:
+        return []
+    # Rows another worker claimed in the meantime keep its token
+    token = uuid.uuid4().hex
+    OutboxEmail.objects.filter(pk__in=ids, status='Pending').update(status='Sending', claimToken=token, claimedDate=now)
+    return list(OutboxEmail.objects.filter(claimToken=token, status='Sending').order_by('emailID'))
+
+
+def _failed(email, error, metrics):
+    email.attempts += 1
+    email.lastError = error
+    email.claimToken = ''
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'Failed'
+        metrics['failed'] += 1
+        logger.error("send_outbox: email %s failed %d times, giving up: %s", email.pk, email.attempts, error)
+    else:
+        email.status = 'Pending'
+        email.nextAttemptDate = timezone.now() + retry_delay(email.attempts)
+        metrics['retried'] += 1
+    email.save(update_fields=['attempts', 'lastError', 'claimToken', 'status', 'nextAttemptDate'])
+
+
+def send_batch(emails, metrics):
+    """Send claimed emails over a single connection, recording each outcome."""
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _failed(email, f'Could not connect: {e}', metrics)
+        return
+
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, email.fromEmail or None, email.recipients,
+                                   connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                _failed(email, str(e), metrics)
+                continue
+            OutboxEmail.objects.filter(pk=email.pk).update(status='Sent', sentDate=timezone.now(), claimToken='')
+            metrics['sent'] += 1
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def deliver_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Send every due email, one connection per batch, and drop old sent ones."""
+    start = time.monotonic()
+    metrics = {'sent': 0, 'retried': 0, 'failed': 0}
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        send_batch(emails, metrics)
+
+    OutboxEmail.objects.filter(status='Sent', sentDate__lt=timezone.now() - KEEP_SENT).delete()
+
+    metrics['seconds'] = round(time.monotonic() - start, 3)
+    if metrics['sent'] or metrics['retried'] or metrics['failed']:
+        logger.info("send_outbox: %(sent)d sent, %(retried)d to retry, %(failed)d failed in %(seconds).3fs", metrics)
+    return metrics
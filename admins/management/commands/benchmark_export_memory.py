@@ -0,0 +1,88 @@
+import resource
+import tempfile
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from admins.export import write_export
+from user.models import (
+    AnnualFiling, PendingWork, SignUP, Trademark, UpdatedCompany, UpdatedDSC, UpdatedGroup, UpdatedUser, Work,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+# AnnualFiling's SRN dates default to '', which a DateField cannot store
+NO_SRN_DATES = {f'srnDate{form}': None for form in ('DPT3', 'MGT14', 'AOC4', 'MGT7', 'Form11', 'Form8')}
+
+
+class Command(BaseCommand):
+    help = ("Measure write_export's memory at growing row counts: the peak of Python allocations per run and "
+            "the process's peak RSS so far. A flat memory profile shows both staying level as rows grow. "
+            "The generated rows are rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('subAdminID', type=int,
+                            help="Tenant to generate rows for; it needs at least one group, company, form and user.")
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000],
+                            help="Rows per exported table for each run, in increasing order.")
+
+    def _generate(self, subAdmin, group, company, form, user, start, end):
+        today = timezone.localdate()
+        common = {'subAdminID': subAdmin, 'companyID': company, 'groupID': group}
+        UpdatedDSC.objects.bulk_create([
+            UpdatedDSC(clientName=f'Client {i}', status='IN', location='Office', clientPhone='0', userID=user,
+                       renewalDate=None, **common)
+            for i in range(start, end)
+        ], batch_size=1000)
+        PendingWork.objects.bulk_create([
+            PendingWork(formID=form, eventDate=today, internalDueDate=today, actualDueDate=today, userID=user,
+                        status='Pending', billing='Pending', modifiedBy=user.userName, remark=f'Remark {i}', **common)
+            for i in range(start, end)
+        ], batch_size=1000)
+        AnnualFiling.objects.bulk_create([
+            AnnualFiling(financialYear='2024-25', modifiedBy=user, **NO_SRN_DATES, **common)
+            for i in range(start, end)
+        ], batch_size=1000)
+        Trademark.objects.bulk_create([
+            Trademark(subAdminID=subAdmin, nameOfTrademark=f'Mark {i}', nameOfApplicant='Applicant', groupID=group,
+                      modifiedBy=user, status1='Objected')
+            for i in range(start, end)
+        ], batch_size=1000)
+
+    def handle(self, *args, **options):
+        subAdmin = SignUP.objects.filter(pk=options['subAdminID']).first()
+        group = UpdatedGroup.objects.filter(subAdminID=subAdmin).first()
+        company = UpdatedCompany.objects.filter(subAdminID=subAdmin, groupID=group).first()
+        form = Work.objects.filter(subAdminID=subAdmin).first()
+        user = UpdatedUser.objects.filter(subAdminID=subAdmin).first()
+        if not (subAdmin and group and company and form and user):
+            raise CommandError("The tenant needs at least one group, company, form and user.")
+
+        self.stdout.write("rows/table   seconds   peak traced MB   peak RSS MB   file MB")
+        try:
+            with transaction.atomic():
+                generated = 0
+                for rows in sorted(options['rows']):
+                    self._generate(subAdmin, group, company, form, user, generated, rows)
+                    generated = rows
+
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    with tempfile.TemporaryFile() as export_file:
+                        write_export(subAdmin.pk, export_file)
+                        size = export_file.tell()
+                    seconds = time.perf_counter() - start
+                    traced = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+
+                    # ru_maxrss is in kilobytes on Linux
+                    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                    self.stdout.write(f"{rows:>10}   {seconds:7.1f}   {traced / 2**20:14.1f}   {rss:11.1f}   "
+                                      f"{size / 2**20:7.1f}")
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from admins.cron import deactivate_expire_account
+
+
+class Command(BaseCommand):
+    help = "Deactivate expired subscriptions, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Seconds between runs; 0 (default) runs once and exits.")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            metrics = deactivate_expire_account()
+            if metrics['skipped']:
+                self.stdout.write("Another run holds the lock, skipped.")
+            else:
+                self.stdout.write(
+                    f"{metrics['subscriptions']} subscriptions, {metrics['subAdmins']} sub-admins "
+                    f"deactivated in {metrics['seconds']}s"
+                )
+            if interval <= 0:
+                break
+            time.sleep(interval)
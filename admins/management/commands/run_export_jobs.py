@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from admins.export import claim_next_job, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Work through queued Excel export jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--interval', type=int, default=5, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            job = run_export_job(job)
+            self.stdout.write(f"Export {job.exportID} for subAdmin {job.subAdminID_id}: {job.status}")
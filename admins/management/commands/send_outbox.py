@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from admins.mail import OUTBOX_BATCH_SIZE, deliver_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the outbox has no due emails.")
+        parser.add_argument('--interval', type=int, default=5, help="Seconds to wait when nothing is due.")
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE,
+                            help="Emails sent per SMTP connection.")
+
+    def handle(self, *args, **options):
+        while True:
+            metrics = deliver_outbox(options['batch_size'])
+            if metrics['sent'] or metrics['retried'] or metrics['failed']:
+                self.stdout.write(f"{metrics['sent']} sent, {metrics['retried']} to retry, "
+                                  f"{metrics['failed']} failed in {metrics['seconds']}s")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
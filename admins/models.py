@@ -1,3 +1,83 @@
+import secrets
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+
+def export_storage():
+    # Outside MEDIA_ROOT and without a URL: exports are served only by downloadExport
+    return FileSystemStorage(location=settings.EXPORT_ROOT, base_url=None)
+
+
+def export_path(instance, filename):
+    return f'{secrets.token_hex(16)}.xlsx'
+
+
+# Background export of a sub-admin's data, picked up by the run_export_jobs worker
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Completed', 'Completed'),
+        ('Failed', 'Failed'),
+    ]
+
+    exportID = models.AutoField(primary_key=True)
+    subAdminID = models.ForeignKey('user.SignUP', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    sheetsDone = models.IntegerField(default=0)
+    sheetsTotal = models.IntegerField(default=9)
+    dataVersion = models.CharField(max_length=64)  # fingerprint of the tenant's data when requested
+    file = models.FileField(upload_to=export_path, storage=export_storage, null=True, blank=True)
+    error = models.TextField(default='', blank=True)
+    createdDate = models.DateTimeField(auto_now_add=True)
+    startedDate = models.DateTimeField(null=True, blank=True)  # when a worker claimed it
+    finishedDate = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', 'dataVersion'], name='export_sa_version_idx'),
+            models.Index(fields=['status', 'createdDate'], name='export_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'Export {self.exportID} ({self.status})'
+
+    @property
+    def progress(self):
+        return int(self.sheetsDone * 100 / self.sheetsTotal) if self.sheetsTotal else 0
+
+
+# Outgoing email, queued by the views and sent by the send_outbox worker (see admins/mail.py)
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sending', 'Sending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    emailID = models.AutoField(primary_key=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    fromEmail = models.CharField(max_length=255, default='', blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.IntegerField(default=0)
+    nextAttemptDate = models.DateTimeField(default=timezone.now)
+    claimToken = models.CharField(max_length=32, default='', blank=True)  # the worker batch sending it
+    claimedDate = models.DateTimeField(null=True, blank=True)
+    lastError = models.TextField(default='', blank=True)
+    createdDate = models.DateTimeField(auto_now_add=True)
+    sentDate = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'nextAttemptDate'], name='outbox_status_next_idx'),
+            models.Index(fields=['claimToken'], name='outbox_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} to {", ".join(self.recipients)} ({self.status})'
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import tempfile
+from contextlib import nullcontext
+from datetime import timedelta
+from io import BytesIO
+from smtplib import SMTPException
+from unittest import mock
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from user.models import PendingWork, SignUP, SubAdminSubscription, UpdatedCompany
+from user.tests import LOCMEM_CACHES, add_rows, login_subAdmin, make_tenant
+from user.versioning import save_with_history
+from . import mail as outbox
+from .cron import deactivate_expire_account
+from .export import claim_next_job, export_fingerprint, run_export_job, write_export
+from .models import ExportJob, OutboxEmail
 
-# Create your tests here.
+
+class RefusingBackend(EmailBackend):
+    """A locmem backend whose server rejects every message."""
+
+    def send_messages(self, messages):
+        raise SMTPException('Recipient refused')
+
+
+class WriteExportQueryCountTests(TestCase):
+    # The client map, then one query per table each sheet reads (the reports read live and archived rows)
+    EXPORT_QUERIES = 12
+
+    def test_query_count_is_pinned(self):
+        small = make_tenant(1)
+        add_rows(small, 1)
+        large = make_tenant(2)
+        add_rows(large, 60)
+
+        for subAdmin in (small, large):
+            with self.subTest(subAdmin=subAdmin.subAdminName), self.assertNumQueries(self.EXPORT_QUERIES):
+                write_export(subAdmin.pk, BytesIO())
+
+
+class OutboxTests(TestCase):
+    """The send_outbox worker's delivery, retry and reclaim rules, against the locmem backend."""
+
+    def queue(self, count=1):
+        return [outbox.queue_mail(f'Subject {i}', 'Body', [f'user{i}@example.com']) for i in range(count)]
+
+    def test_nothing_is_queued_for_rolled_back_work(self):
+        try:
+            with transaction.atomic():
+                self.queue()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(OutboxEmail.objects.exists())
+
+        with transaction.atomic():
+            self.queue()
+        # Queuing only writes the row; the worker sends it
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(outbox.deliver_outbox()['sent'], 1)
+        self.assertEqual(mail.outbox[0].to, ['user0@example.com'])
+        self.assertEqual(OutboxEmail.objects.get().status, 'Sent')
+
+    def test_one_connection_per_batch(self):
+        self.queue(5)
+        with mock.patch('admins.mail.get_connection', wraps=outbox.get_connection) as get_connection:
+            metrics = outbox.deliver_outbox(batch_size=2)
+        self.assertEqual(metrics['sent'], 5)
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_BACKEND='admins.tests.RefusingBackend')
+    def test_retries_back_off_until_failed(self):
+        self.assertEqual([outbox.retry_delay(n) for n in (1, 2, 3)],
+                         [outbox.RETRY_BASE, 2 * outbox.RETRY_BASE, 4 * outbox.RETRY_BASE])
+        self.assertEqual(outbox.retry_delay(30), outbox.RETRY_MAX)
+
+        email, = self.queue()
+        for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+            before = timezone.now()
+            with self.assertLogs('admins.mail', 'ERROR') if attempt == outbox.MAX_ATTEMPTS else nullcontext():
+                outbox.deliver_outbox()
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, attempt)
+            self.assertEqual(email.lastError, 'Recipient refused')
+            if attempt < outbox.MAX_ATTEMPTS:
+                self.assertEqual(email.status, 'Pending')
+                delay = outbox.retry_delay(attempt)
+                self.assertGreaterEqual(email.nextAttemptDate, before + delay)
+                self.assertLessEqual(email.nextAttemptDate, timezone.now() + delay)
+                # Not due yet, so a run now leaves it alone
+                self.assertEqual(outbox.deliver_outbox()['retried'], 0)
+                OutboxEmail.objects.filter(pk=email.pk).update(nextAttemptDate=timezone.now())
+        self.assertEqual(email.status, 'Failed')
+
+        OutboxEmail.objects.filter(pk=email.pk).update(nextAttemptDate=timezone.now())
+        self.assertEqual(outbox.deliver_outbox(), {'sent': 0, 'retried': 0, 'failed': 0, 'seconds': mock.ANY})
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, outbox.MAX_ATTEMPTS)
+
+    def test_stale_claim_is_sent_again(self):
+        stale, fresh = self.queue(2)
+        now = timezone.now()
+        OutboxEmail.objects.filter(pk=stale.pk).update(
+            status='Sending', claimToken='dead', claimedDate=now - outbox.STALE_CLAIM - timedelta(minutes=1))
+        OutboxEmail.objects.filter(pk=fresh.pk).update(status='Sending', claimToken='live', claimedDate=now)
+
+        self.assertEqual(outbox.deliver_outbox()['sent'], 1)
+        self.assertEqual([message.subject for message in mail.outbox], ['Subject 0'])
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, stale.claimToken), ('Sent', ''))
+        self.assertEqual((fresh.status, fresh.claimToken), ('Sending', 'live'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DeactivateExpiredAccountTests(TestCase):
+    """The cron closes lapsed subscriptions and sends their sub-admins back to plan selection at once."""
+
+    def setUp(self):
+        self.expired, self.current, self.open_ended = make_tenant(1), make_tenant(2), make_tenant(3)
+        now = timezone.now()
+        SubAdminSubscription.objects.filter(subAdminID=self.expired).update(endDate=now - timedelta(days=1))
+        SubAdminSubscription.objects.filter(subAdminID=self.current).update(endDate=now + timedelta(days=1))
+
+    def get(self, subAdmin):
+        client = self.client_class()
+        login_subAdmin(client, subAdmin)
+        return client.get('/user/listDSC', secure=True)
+
+    def test_expired_subscriptions_are_closed(self):
+        for subAdmin in (self.expired, self.current, self.open_ended):
+            self.assertEqual(self.get(subAdmin).status_code, 200)  # caches the account with its plan
+
+        with self.captureOnCommitCallbacks(execute=True):
+            metrics = deactivate_expire_account()
+        self.assertEqual((metrics['subscriptions'], metrics['subAdmins']), (1, 1))
+
+        self.assertEqual(dict(SubAdminSubscription.objects.values_list('subAdminID', 'isActive')),
+                         {self.expired.pk: False, self.current.pk: True, self.open_ended.pk: True})
+        self.assertEqual(dict(SignUP.objects.values_list('pk', 'hasChosenPlan')),
+                         {self.expired.pk: False, self.current.pk: True, self.open_ended.pk: True})
+        self.assertRedirects(self.get(self.expired), '/plan/selectPlan', fetch_redirect_response=False)
+        for subAdmin in (self.current, self.open_ended):
+            self.assertEqual(self.get(subAdmin).status_code, 200)
+
+        # A second run finds nothing left to close
+        self.assertEqual(deactivate_expire_account()['subscriptions'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportDedupeTests(TestCase):
+    """Repeat exports of unchanged data reuse the last workbook; any write makes the next one fresh."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        add_rows(self.subAdmin, 2)
+        login_subAdmin(self.client, self.subAdmin)
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        patcher = mock.patch.object(ExportJob._meta.get_field('file').storage, 'location', export_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def export(self):
+        response = self.client.get('/admin/exportToExcel', secure=True)
+        self.assertRedirects(response, '/admin/exportData', fetch_redirect_response=False)
+        return ExportJob.objects.filter(subAdminID=self.subAdmin).latest('exportID')
+
+    def run_jobs(self):
+        while (job := claim_next_job()) is not None:
+            run_export_job(job)
+
+    def test_unchanged_data_reuses_the_artifact(self):
+        first = self.export()
+        self.assertEqual(first.status, 'Pending')
+        self.assertEqual(self.export(), first)  # an in-flight job is reused too
+        self.run_jobs()
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'Completed')
+
+        for _ in range(2):
+            self.assertEqual(self.export(), first)
+        self.assertEqual(ExportJob.objects.count(), 1)
+        download = self.client.get(f'/admin/downloadExport/{first.pk}/', secure=True)
+        self.assertEqual(download.status_code, 200)
+        download.close()
+
+    def test_writes_change_the_fingerprint(self):
+        company = UpdatedCompany.objects.filter(subAdminID=self.subAdmin).first()
+        writes = [
+            lambda: save_with_history(company),  # an edit moves the latest modified date
+            lambda: add_rows(self.subAdmin, 1, start=2),
+            lambda: PendingWork.objects.filter(subAdminID=self.subAdmin).first().delete(),  # a delete changes a count
+        ]
+        self.export()
+        self.run_jobs()
+        previous = ExportJob.objects.get()
+        for write in writes:
+            fingerprint = export_fingerprint(self.subAdmin.pk)
+            write()
+            self.assertNotEqual(export_fingerprint(self.subAdmin.pk), fingerprint)
+
+            job = self.export()
+            self.assertNotEqual(job, previous)
+            self.run_jobs()
+            # The new workbook supersedes the old one, file and all
+            self.assertEqual(list(ExportJob.objects.values_list('pk', flat=True)), [job.pk])
+            self.assertTrue(job.file.storage.exists(ExportJob.objects.get().file.name))
+            self.assertFalse(previous.file.storage.exists(previous.file.name))
+            previous = ExportJob.objects.get()
@@ -6,6 +6,7 @@ urlpatterns = [
     path('listUser', views.listUser, name='listUser'),
     path('addUser', views.addUser, name='addUser'),
     path('updateUser/<int:userID>/', views.updateUser, name='updateUser'),
+    path('userHistoryData/<int:userID>/', views.userHistoryData, name='userHistoryData'),
     path('deleteUser', views.deleteUser, name='deleteUser'),
     path('updateProfile', views.updateProfile, name='updateProfile'),
     path('subscriptionDetails', views.subscriptionDetails, name='subscriptionDetails'),
@@ -16,6 +17,8 @@ urlpatterns = [
     path('listFeedback', views.listFeedback, name='listFeedback'),
     path('action', views.action, name='action'),
     path('exportData', views.exportData, name='exportData'),
-    path('exportToExcel', views.exportToExcel, name='exportToExcel')
+    path('exportToExcel', views.exportToExcel, name='exportToExcel'),
+    path('exportStatus/<int:exportID>/', views.exportStatus, name='exportStatus'),
+    path('downloadExport/<int:exportID>/', views.downloadExport, name='downloadExport'),
 ]
 
@@ -3,7 +3,7 @@ from user.models import *
 from django.contrib import messages
 import os, re
 from django.conf import settings
-from django.http import JsonResponse, HttpResponseRedirect, HttpResponse
+from django.http import JsonResponse, HttpResponseRedirect, HttpResponse, FileResponse
 from django.urls import reverse
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
@@ -11,9 +11,12 @@ from django.db.models import Count, Q
 from django.contrib.auth.hashers import check_password, make_password
 from django.utils import timezone
 from datetime import timedelta
-import openpyxl
-from openpyxl.utils import get_column_letter
 from user.views import allow_only_client_users, getUser
+from user.principal import invalidate_principals
+from user.listing import history_json
+from user.versioning import save_with_history, HistoryTimeline
+from .export import request_export
+from .models import ExportJob
 
 # User All Function are here for SubAdmin
 @allow_only_client_users
@@ -174,26 +177,7 @@ def addUser(request):
                 accessToAnnual=accessToAnnual,
                 accessToTrademark=accessToTrademark,
             )
-            new_user.save()
-
-            # Save to history
-            userHistory = HistoryUser(
-                subAdminID=user.subAdminID,
-                userID=new_user,
-                userName=userName,
-                userPhone=userPhone,
-                userUsername=userUsername,
-                userPassword=new_user.userPassword,
-                userModifiedDate=new_user.userModifiedDate,
-                groupID=new_user.groupID,
-                isClientUser=user.isClientUser,
-                canReadOnly=user.canReadOnly,
-                canReadWrite=user.canReadWrite,
-                accessToPendingWork=user.accessToPendingWork,
-                accessToAnnual=user.accessToAnnual,
-                accessToTrademark=user.accessToTrademark
-            )
-            userHistory.save()
+            save_with_history(new_user)
 
             messages.success(request, "User added successfully.")
             return redirect('listUser')
@@ -217,13 +201,12 @@ def updateUser(request, userID):
             messages.error(request, "User not found.")
             return redirect('adminSignIn')
 
-        userHistory = HistoryUser.objects.filter(subAdminID=subAdmin.subAdminID, userID=userID).order_by('-userModifiedDate')
         groups = UpdatedGroup.objects.filter(subAdminID=user.subAdminID).all()
 
         context = {
             'base': 'base/subAdminBase.html',
             'user': user,
-            'userHistory': userHistory,
+            'historyUrl': reverse('userHistoryData', args=[user.userID]),
             'subAdmin': subAdmin,
             'groups': groups
         }
@@ -313,26 +296,7 @@ def updateUser(request, userID):
             user.accessToPendingWork = accessToPendingWork
             user.accessToAnnual = accessToAnnual
             user.accessToTrademark = accessToTrademark
-            user.save()
-
-            # Add history
-            userHistory = HistoryUser(
-                subAdminID=user.subAdminID,
-                userID=user,
-                userName=user.userName,
-                userPhone=user.userPhone,
-                userUsername=user.userUsername,
-                userPassword=user.userPassword,
-                userModifiedDate=user.userModifiedDate,
-                groupID=user.groupID,
-                isClientUser=user.isClientUser,
-                canReadOnly=user.canReadOnly,
-                canReadWrite=user.canReadWrite,
-                accessToPendingWork=user.accessToPendingWork,
-                accessToAnnual=user.accessToAnnual,
-                accessToTrademark=user.accessToTrademark
-            )
-            userHistory.save()
+            save_with_history(user)
 
             messages.success(request, "User updated successfully.")
             return redirect(request.path)
@@ -355,7 +319,9 @@ def deleteUser(request):
                 
                 if users_to_deactivate.exists():
                     # Deactivating users and setting the deactivatedBy field to 'subAdmin'
+                    subAdminIDs = list(users_to_deactivate.values_list('subAdminID', flat=True).distinct())
                     users_to_deactivate.update(isActive=False, deactivatedBy='subAdmin')
+                    invalidate_principals(*subAdminIDs)
                     messages.success(request, "Selected users have been deactivated successfully.")
                 else:
                     messages.error(request, "No active users were found to deactivate.")
@@ -523,290 +489,71 @@ def exportToExcel(request):
         messages.error(request, "Only Admins have permission.")
         return redirect('adminSignIn')
 
-    subAdmin = SignUP.objects.get(subAdminID=sub_admin_id)
-    filename = f"{subAdmin.subAdminName} data.xlsx"
-
-    # Create an Excel workbook
-    wb = openpyxl.Workbook()
-    
-    # ================================
-    # 1 **DSC SHEET**
-    # ================================
-    ws1 = wb.active
-    ws1.title = "DSCs"
-    
-    # Define headers for DSC data
-    headers = [
-        'Group Name', 'Company Name', 'Client Name', 'Status', 'Location', 
-        'Renewal Date', 'Contact Person', 'Phone Number', 'Last Modified Date', 
-        'Last Received By', 'Last Received From', 'Last Delivered By', 'Last Delivery To'
-    ]
-    ws1.append(headers)
-
-    dsc_data = UpdatedDSC.objects.filter(subAdminID=sub_admin_id).select_related('companyID__groupID', 'userID')
-
-    for dsc in dsc_data:
-        company = dsc.companyID
-        group = company.groupID if company else None
-        client = UpdatedClient.objects.filter(companyID=company).first() if company else None
-
-        ws1.append([
-            group.groupName if group else '',
-            company.companyName if company else '',
-            dsc.clientName,
-            dsc.status,
-            dsc.location,
-            dsc.renewalDate.strftime('%d-%m-%Y') if dsc.renewalDate else '',
-            client.clientName if client else '',
-            client.clientPhone if client else '',
-            dsc.modifiedDate.strftime('%d-%m-%Y %H:%M:%S'),
-            dsc.receivedBy,
-            dsc.receivedFrom,
-            dsc.deliveredBy,
-            dsc.deliveredTo
-        ])
-
-    # ================================
-    # 2 **Pending Work SHEET**
-    # ================================
-    ws2 = wb.create_sheet(title="Pending Work")
-    ws2.append(['Company Name', 'Group Name', 'Form No.', 'Event Date', 'Status', 'Internal Due Date', 'Due Date', 'Remarks', 'SRN No.','SRN Date','SRN Amount', 'Responsible Person', 'Fees', 'Billing'])
-
-    pending_works = PendingWork.objects.filter(subAdminID=sub_admin_id, isArchived=False).all()
-    for task in pending_works:
-        ws2.append([
-            task.companyID.companyName,
-            task.companyID.groupID.groupName,
-            task.formID.formNo,
-            task.eventDate,
-            task.status,
-            task.internalDueDate,
-            task.actualDueDate,
-            task.remark,
-            task.srnNo,
-            task.srnDate,
-            task.amt,
-            task.userID.userName,
-            task.fees,
-            task.billing,
-        ])
-
-    # ================================
-    # 3 **Pending Work Archived SHEET**
-    # ================================
-    ws3 = wb.create_sheet(title="Pending Work Archived")
-    ws3.append(['Company Name', 'Group Name', 'Form No.', 'Event Date', 'Status', 'Internal Due Date', 'Due Date', 'Remarks', 'SRN No.','SRN Date','SRN Amount', 'Responsible Person', 'Fees', 'Billing'])
-
-    pending_works = PendingWork.objects.filter(subAdminID=sub_admin_id, isArchived=True).all()
-    for task in pending_works:
-        ws3.append([
-            task.companyID.companyName,
-            task.companyID.groupID.groupName,
-            task.formID.formNo,
-            task.eventDate,
-            task.status,
-            task.internalDueDate,
-            task.actualDueDate,
-            task.remark,
-            task.srnNo,
-            task.srnDate,
-            task.amt,
-            task.userID.userName,
-            task.fees,
-            task.billing,
-        ])
-
-    # ================================
-    # 4 **Annual Filing SHEET**
-    # ================================
-    ws4 = wb.create_sheet(title="Annual Filing")
-    ws4.append(['Company Name', 'Group Name', 'DPT-3', 'MGT-14', 'AOC-4', 'MGT-7', 'Form-11', 'Form-8', 'Financial Year'])
-
-    annual_filings = AnnualFiling.objects.filter(subAdminID=sub_admin_id, isArchived=False).all()
-    for filing in annual_filings:
-        ws4.append([
-            filing.companyID.companyName,
-            filing.companyID.groupID.groupName,
-            filing.statusDPT3,
-            filing.statusMGT14,
-            filing.statusAOC4,
-            filing.statusMGT7,
-            filing.statusForm11,
-            filing.statusForm8,
-            filing.financialYear,
-        ])
-
-    # ================================
-    # 5 **Annual Filing Archived SHEET**
-    # ================================
-    ws5 = wb.create_sheet(title="Annual Filing Archived")
-    ws5.append(['Company Name', 'Group Name', 'DPT-3', 'MGT-14', 'AOC-4', 'MGT-7', 'Form-11', 'Form-8', 'Financial Year'])
-
-    annual_filings = AnnualFiling.objects.filter(subAdminID=sub_admin_id, isArchived=True).all()
-    for filing in annual_filings:
-        ws5.append([
-            filing.companyID.companyName,
-            filing.companyID.groupID.groupName,
-            filing.statusDPT3,
-            filing.statusMGT14,
-            filing.statusAOC4,
-            filing.statusMGT7,
-            filing.statusForm11,
-            filing.statusForm8,
-            filing.financialYear,
-        ])
-
-    # ================================
-    # 6 **Pending Work Report SHEET**
-    # ================================
-    ws6 = wb.create_sheet(title="Pending Work Report")
-    ws6.append(['SRN Date', 'SRN No.', 'Company Name', 'Group Name', 'Status', 'Form No.', 'SRN Challan Amt'])
-
-    pwReports = PendingWork.objects.filter(subAdminID=sub_admin_id).all()
-    for report in pwReports:
-        ws6.append([
-            report.srnDate,
-            report.srnNo,
-            report.companyID.companyName,
-            report.companyID.groupID.groupName,
-            report.status,
-            report.formID.formNo,
-            report.amt,
-        ])
-
-    # ================================
-    # 7 **Annual Filing Report SHEET**
-    # ================================
-    ws7 = wb.create_sheet(title="Annual Filing Report")
-    ws7.append(['SRN Date', 'SRN No.', 'Company Name', 'Group Name', 'Status', 'Form No.', 'SRN Challan Amt'])
-
-    afReports = AnnualFiling.objects.filter(subAdminID=sub_admin_id).all()
-
-    for report in afReports:
-        approved_forms = []  # List to store approved form details
-        
-        if report.statusDPT3 == "Approved":
-            approved_forms.append((report.srnDateDPT3, report.srnNoDPT3, "DPT3", report.amtDPT3))
-
-        if report.statusMGT14 == "Approved":
-            approved_forms.append((report.srnDateMGT14, report.srnNoMGT14, "MGT14", report.amtMGT14))
-
-        if report.statusAOC4 == "Approved":
-            approved_forms.append((report.srnDateAOC4, report.srnNoAOC4, "AOC4", report.amtAOC4))
-
-        if report.statusMGT7 == "Approved":
-            approved_forms.append((report.srnDateMGT7, report.srnNoMGT7, "MGT7", report.amtMGT7))
-
-        if report.statusForm11 == "Approved":
-            approved_forms.append((report.srnDateForm11, report.srnNoForm11, "Form 11", report.amtForm11))
-
-        if report.statusForm8 == "Approved":
-            approved_forms.append((report.srnDateForm8, report.srnNoForm8, "Form 8", report.amtForm8))
-
-        # Append only approved forms to the sheet
-        for srn_date, srn_no, form_no, amt in approved_forms:
-            ws7.append([
-                srn_date,
-                srn_no,
-                report.companyID.companyName,
-                report.companyID.groupID.groupName,
-                "Approved",
-                form_no,
-                amt,
-            ])
-
-    # ================================
-    # 8 **Trademark SHEET**
-    # ================================
-    ws8 = wb.create_sheet(title="Trademark")
-    ws8.append(['SRN No.', 'Name of Trademark', 'Name of Applicant', 'Group', 'Application No.', 'Class ', 'Date of Application', 'Current Status 1', 'Current Status 2', 'Remarks', 'Notice Receive / Serve Date', 'Reply Due Date', 'Fees Amt.', 'Hearing Date', 'Renewal Date', 'Fees Received'])
-
-    trademarks = Trademark.objects.filter(subAdminID=sub_admin_id, isArchived=False).all()
-    for tm in trademarks:
-        ws8.append([
-            tm.indexSRN,
-            tm.nameOfTrademark,
-            tm.nameOfApplicant,
-            tm.groupID.groupName,
-            tm.applicationNo,
-            tm.classNo,
-            tm.dateOfApp,
-            tm.status1,
-            tm.status2,
-            tm.remark,
-            tm.oppDate,
-            tm.lastDate,
-            tm.fees,
-            tm.hearingDate,
-            tm.expiryDate,
-            tm.feesStatus,
-        ])
-
-
-
-    # ================================
-    # 9 **Trademark Archived SHEET**
-    # ================================
-    ws9 = wb.create_sheet(title="Trademark Archived")
-    ws9.append(['SRN No.', 'Name of Trademark', 'Name of Applicant', 'Group', 'Application No.', 'Class ', 'Date of Application', 'Current Status 1', 'Current Status 2', 'Remarks', 'Notice Receive / Serve Date', 'Reply Due Date', 'Fees Amt.', 'Hearing Date', 'Renewal Date', 'Fees Received'])
-
-    trademarks = Trademark.objects.filter(subAdminID=sub_admin_id, isArchived=True).all()
-    for tm in trademarks:
-        ws9.append([
-            tm.indexSRN,
-            tm.nameOfTrademark,
-            tm.nameOfApplicant,
-            tm.groupID.groupName,
-            tm.applicationNo,
-            tm.classNo,
-            tm.dateOfApp,
-            tm.status1,
-            tm.status2,
-            tm.remark,
-            tm.oppDate,
-            tm.lastDate,
-            tm.fees,
-            tm.hearingDate,
-            tm.expiryDate,
-            tm.feesStatus,
-        ])
-
-    
-
-    # Auto-adjust column width for better readability
-    for sheet in wb.worksheets:
-        for col in sheet.columns:
-            max_length = 0
-            col_letter = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            sheet.column_dimensions[col_letter].width = max_length + 2
-
-    # ================================
-    # ✅ **Prepare and return response**
-    # ================================
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    wb.save(response)
-
-    return response
+    # The workbook is built by the run_export_jobs worker; an unchanged tenant reuses its last export
+    job = request_export(sub_admin_id)
+    if job.status == 'Completed':
+        messages.success(request, "Your data has not changed since the last export, it is ready to download.")
+    else:
+        messages.success(request, "Export started. The download link will appear here when it is ready.")
+    return redirect('exportData')
 
 @allow_only_client_users            
 def exportData(request):
     if request.session.get('subAdminID'):
         
         context = {
-            'base': 'base/subAdminBase.html'
+            'base': 'base/subAdminBase.html',
+            'exportJob': ExportJob.objects.filter(subAdminID=request.session['subAdminID']).order_by('-exportID').first(),
         }
     else:
         messages.error(request, "Only Admin have the permission.")
         return redirect('adminSignIn')
     return render(request, 'adminDetails/exportData.html', context)
 
+@allow_only_client_users
+def userHistoryData(request, userID):
+    subAdminID = request.session.get('subAdminID')
+    if not subAdminID or not UpdatedUser.objects.filter(subAdminID=subAdminID, userID=userID).exists():
+        return JsonResponse({'status': 'error', 'message': 'User not found.'}, status=404)
+    return history_json(request, HistoryTimeline(UpdatedUser, userID, newest_first=True))
+
+@allow_only_client_users
+def exportStatus(request, exportID):
+    sub_admin_id = request.session.get('subAdminID')
+    job = ExportJob.objects.filter(exportID=exportID, subAdminID=sub_admin_id).first()
+    if not job:
+        return JsonResponse({'status': 'error', 'message': 'Export not found.'}, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'jobStatus': job.status,
+        'progress': job.progress,
+        'downloadUrl': reverse('downloadExport', args=[job.exportID]) if job.status == 'Completed' else None,
+    })
+
+@allow_only_client_users
+def downloadExport(request, exportID):
+    sub_admin_id = request.session.get('subAdminID')
+
+    if not sub_admin_id:
+        messages.error(request, "Only Admins have permission.")
+        return redirect('adminSignIn')
+
+    job = ExportJob.objects.filter(exportID=exportID, subAdminID=sub_admin_id, status='Completed').first()
+    if not job or not job.file:
+        messages.error(request, "This export is no longer available, please export again.")
+        return redirect('exportData')
+
+    subAdmin = SignUP.objects.get(subAdminID=sub_admin_id)
+    filename = f"{subAdmin.subAdminName} data.xlsx"
+
+    return FileResponse(
+        job.file.open('rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
 
 # All Function are here for the superAdmin
 def listSubAdmin(request):
@@ -849,6 +596,7 @@ def action(request):
                     # Deactivate users of the subAdmins
                     users_to_deactivate = UpdatedUser.objects.filter(subAdminID__in=subAdminIDs, isActive=True)
                     users_to_deactivate.update(isActive=False, deactivatedBy='superAdmin')  # Deactivating users and marking who deactivated them
+                    invalidate_principals(*subAdminIDs)
 
                     messages.success(request, "Selected subAdmins and their users have been deactivated successfully.")
                 else:
@@ -863,6 +611,7 @@ def action(request):
                     # Activate users of the subAdmins, excluding those deactivated by subAdmin
                     users_to_activate = UpdatedUser.objects.filter(subAdminID__in=subAdminIDs, isActive=False, deactivatedBy='superAdmin')
                     users_to_activate.update(isActive=True, deactivatedBy=None)  # Activating users and clearing the deactivation marker
+                    invalidate_principals(*subAdminIDs)
 
                     messages.success(request, "Selected subAdmins and their eligible users have been activated successfully.")
                 else:
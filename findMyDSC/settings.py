@@ -109,6 +109,30 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # For production use
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Data exports hold a tenant's full records, so they live outside MEDIA_ROOT
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', os.path.join(BASE_DIR, 'private', 'exports'))
+
+# Cache shared by all workers: Redis when REDIS_URL is set, otherwise a file cache
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+            'KEY_PREFIX': 'findMyDSC',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+            'KEY_PREFIX': 'findMyDSC',
+        }
+    }
+
 # Security configurations for production
 SECURE_SSL_REDIRECT = True  # Redirect all HTTP requests to HTTPS
 SESSION_COOKIE_SECURE = True  # Ensure session cookies are sent over HTTPS
@@ -140,8 +164,32 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
+# Only the send_outbox worker talks to SMTP (see admins/mail.py); don't let it hang on a slow server
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 30))
+
+# Edit history (user/compaction.py): full History* rows older than this are
+# compacted to field-level diffs, and anything older than the retention window
+# (per tenant via SignUP.historyRetentionDays) is deleted
+HISTORY_COMPACT_AFTER_DAYS = int(os.getenv('HISTORY_COMPACT_AFTER_DAYS', 90))
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', 730))
+
+# Alerts (user/alerts.py): passed due dates stay alerted this many days, and
+# new alerts are mailed to each sub-admin as one digest a day unless disabled
+ALERT_EXPIRED_DAYS = int(os.getenv('ALERT_EXPIRED_DAYS', 30))
+ALERT_DIGEST_EMAILS = os.getenv('ALERT_DIGEST_EMAILS', 'true').lower() == 'true'
 
 # Cron jobs
 CRONJOBS = [
     ('* * * * *', 'admins.cron.deactivate_expire_account'),
+    # Drains the export queue; a dedicated `manage.py run_export_jobs` process can replace this
+    ('* * * * *', 'django.core.management.call_command', ['run_export_jobs'], {'once': True}),
+    # Sends queued email; a dedicated `manage.py send_outbox` process can replace this
+    ('* * * * *', 'django.core.management.call_command', ['send_outbox'], {'once': True}),
+    # Moves rows archived outside the update forms into the archive tables
+    ('*/10 * * * *', 'django.core.management.call_command', ['archive_records']),
+    # Nightly history compaction and retention
+    ('30 2 * * *', 'django.core.management.call_command', ['compact_history']),
+    # Refreshes the alerts table; the morning run also mails the digests
+    ('*/15 * * * *', 'django.core.management.call_command', ['scan_alerts']),
+    ('0 8 * * *', 'django.core.management.call_command', ['scan_alerts'], {'digest': True}),
 ]
@@ -1,5 +1,6 @@
 from django.shortcuts import render, redirect
 from user.models import *
+from user.versioning import save_with_history
 import re
 from django.contrib.auth import logout
 from django.contrib import messages
@@ -7,7 +8,7 @@ from django.contrib.auth.hashers import check_password, make_password
 import razorpay
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.core.mail import send_mail
+from admins.mail import queue_mail
 from django.core.cache import cache
 import uuid
 
@@ -72,13 +73,10 @@ def signUp(request):
             user.save()
 
             group = UpdatedGroup(groupName='None', userID=user, subAdminID=subAdmin)
-            group.save()
+            save_with_history(group)
 
-            groupHistory = HistoryGroup(groupID=group, groupName=group.groupName, userID=user, subAdminID=subAdmin, groupModifiedDate=group.groupModifiedDate)
-            groupHistory.save()
-
-            # Send welcome email
-            send_mail(
+            # Queue the welcome email; the send_outbox worker delivers it
+            queue_mail(
                 subject="Welcome to FIND MY DSC",
                 message='''Dear Subscriber, 
 
@@ -93,7 +91,6 @@ findmydsc@gmail.com
 Regard''',
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[subAdminEmail],
-                fail_silently=False,
             )
 
             messages.success(request, "Account created successfully. Please sign in.")
@@ -300,12 +297,11 @@ def forgotPassword(request):
             cache.set(token, user.subAdminID, timeout=3600)  # Token valid for 1 hour
 
             reset_link = f'www.findmydsc.in/resetPassword/{token}'
-            send_mail(
+            queue_mail(
                 'Password Reset Request',
                 f'Click the link below to reset your password:\n{reset_link}',
-                settings.DEFAULT_FROM_EMAIL,
                 [email],
-                fail_silently=False,
+                settings.DEFAULT_FROM_EMAIL,
             )
             messages.success(request, 'A password reset link has been sent to your email.')
         except SignUP.DoesNotExist:
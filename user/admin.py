@@ -123,4 +123,30 @@ class PendingWorkAdmin(admin.ModelAdmin):
 class AnnualFilingAdmin(admin.ModelAdmin):
     list_display = ('annualFilingID', 'companyID', 'financialYear', 'isArchived', 'isPinned')
     search_fields = ('companyID__companyName', 'financialYear')
-    list_filter = ('isArchived', 'isPinned')
\ No newline at end of file
+    list_filter = ('isArchived', 'isPinned')
+
+@admin.register(ArchivedPendingWork)
+class ArchivedPendingWorkAdmin(admin.ModelAdmin):
+    list_display = ('pendingWorkID', 'formID', 'companyID', 'eventDate', 'status', 'srnNo', 'archivedDate')
+    search_fields = ('formID__formNo', 'companyID__companyName', 'status')
+
+@admin.register(ArchivedAnnualFiling)
+class ArchivedAnnualFilingAdmin(admin.ModelAdmin):
+    list_display = ('annualFilingID', 'companyID', 'financialYear', 'archivedDate')
+    search_fields = ('companyID__companyName', 'financialYear')
+
+@admin.register(ArchivedTrademark)
+class ArchivedTrademarkAdmin(admin.ModelAdmin):
+    list_display = ('trademarkID', 'nameOfTrademark', 'applicationNo', 'groupID', 'archivedDate')
+    search_fields = ('nameOfTrademark', 'applicationNo')
+
+@admin.register(CompactedHistory)
+class CompactedHistoryAdmin(admin.ModelAdmin):
+    list_display = ('historyModel', 'objectID', 'historyID', 'modifiedDate', 'subAdminID')
+    list_filter = ('historyModel',)
+
+@admin.register(Alert)
+class AlertAdmin(admin.ModelAdmin):
+    list_display = ('title', 'dateField', 'dueDate', 'state', 'userID', 'isRead', 'emailedDate')
+    list_filter = ('state', 'sourceModel', 'isRead')
+    search_fields = ('title',)
@@ -0,0 +1,199 @@
+import logging
+import time as clock
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import groupby
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from admins.cron import advisory_lock
+from admins.mail import queue_mail
+from .models import DUE_SOON_DAYS, Alert, PendingWork, SignUP, Trademark, UpdatedDSC, UpdatedUser
+
+logger = logging.getLogger(__name__)
+
+# Watched date columns per model, each scanned with one range query on its index
+ALERT_FIELDS = {
+    PendingWork: ['internalDueDate', 'actualDueDate'],
+    Trademark: ['hearingDate', 'lastDate', 'expiryDate'],
+    UpdatedDSC: ['renewalDate'],
+}
+
+DATE_LABELS = {
+    'internalDueDate': 'Internal due date',
+    'actualDueDate': 'Due date',
+    'hearingDate': 'Hearing date',
+    'lastDate': 'Last date',
+    'expiryDate': 'Expiry date',
+    'renewalDate': 'Renewal date',
+}
+
+# Tenants refreshed together; a batch loads only its own rows, staff and alerts
+TENANT_BATCH_SIZE = 100
+
+# sourceModel -> update view the alert links to
+ALERT_URLS = {
+    'PendingWork': 'updatePendingWork',
+    'Trademark': 'updateTrademark',
+    'UpdatedDSC': 'updateDSC',
+}
+
+
+def _rows(model, field, start, end):
+    if model is PendingWork:
+        # Approved work has been filed; its dates need no more attention
+        qs = PendingWork.objects.select_related('companyID', 'formID').filter(isArchived=False).exclude(status='Approved')
+    elif model is Trademark:
+        qs = Trademark.objects.filter(isArchived=False)
+    else:
+        qs = UpdatedDSC.objects.select_related('companyID')
+        # renewalDate is a datetime; compare against local midnights
+        start, end = (timezone.make_aware(datetime.combine(day, time.min)) for day in (start, end))
+    return qs.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+
+
+def _describe(row):
+    """(title, groupID, assigned userID or None) of a watched row."""
+    if isinstance(row, PendingWork):
+        return f'{row.companyID.companyName} - {row.formID.formNo}', row.groupID_id, row.userID_id
+    if isinstance(row, Trademark):
+        title = f'{row.nameOfTrademark} ({row.applicationNo})' if row.applicationNo else row.nameOfTrademark
+        return title, row.groupID_id, None
+    return f'{row.clientName} ({row.companyID.companyName})', row.groupID_id, None
+
+
+def _staff(subAdminIDs):
+    """{subAdminID: [(userID, groupID, isAdmin)]} for everyone alerts go to.
+
+    That is each tenant's active staff plus the Admin user the sub-admin acts
+    through; client users get no alerts.
+    """
+    staff = defaultdict(list)
+    users = UpdatedUser.objects.filter(
+        subAdminID__in=subAdminIDs, isClientUser=False, subAdminID__isActive=True
+    ).annotate(
+        isAdmin=Q(isActive=False, userPhone=F('subAdminID__subAdminPhone'))
+    ).filter(Q(isActive=True) | Q(isAdmin=True))
+    for userID, subAdminID, groupID, isAdmin in users.values_list('userID', 'subAdminID', 'groupID', 'isAdmin'):
+        staff[subAdminID].append((userID, groupID, isAdmin))
+    return staff
+
+
+def _recipients(staff, groupID, assignee):
+    if assignee is not None:
+        # Assigned work alerts the assignee and the sub-admin
+        return [userID for userID, _, isAdmin in staff if isAdmin or userID == assignee]
+    # Otherwise everyone who can see the row's group
+    return [userID for userID, userGroupID, _ in staff if userGroupID is None or userGroupID == groupID]
+
+
+def _refresh_tenants(subAdminIDs, today, metrics):
+    """Bring the alerts of these tenants in line with their dates as they stand today."""
+    start = today - timedelta(days=settings.ALERT_EXPIRED_DAYS)
+    end = today + timedelta(days=DUE_SOON_DAYS)
+    staff = _staff(subAdminIDs)
+
+    desired = {}
+    for model, fields in ALERT_FIELDS.items():
+        for field in fields:
+            rows = _rows(model, field, start, end).filter(subAdminID__in=subAdminIDs)
+            for row in rows.iterator(chunk_size=2000):
+                value = getattr(row, field)
+                due = timezone.localtime(value).date() if isinstance(value, datetime) else value
+                state = 'expired' if due < today else 'dueSoon'
+                title, groupID, assignee = _describe(row)
+                for userID in _recipients(staff.get(row.subAdminID_id, []), groupID, assignee):
+                    desired[(userID, model.__name__, field, row.pk)] = (row.subAdminID_id, title[:255], due, state)
+
+    existing = {
+        (alert.userID_id, alert.sourceModel, alert.dateField, alert.objectID): alert
+        for alert in Alert.objects.filter(subAdminID__in=subAdminIDs).only(
+            'userID', 'sourceModel', 'dateField', 'objectID', 'title', 'dueDate', 'state'
+        ).iterator()
+    }
+    creates, updates = [], []
+    for key, (subAdminID, title, due, state) in desired.items():
+        alert = existing.pop(key, None)
+        if alert is None:
+            userID, sourceModel, dateField, objectID = key
+            creates.append(Alert(
+                subAdminID_id=subAdminID, userID_id=userID, sourceModel=sourceModel, dateField=dateField,
+                objectID=objectID, title=title, dueDate=due, state=state,
+            ))
+        elif (alert.title, alert.dueDate, alert.state) != (title, due, state):
+            if (alert.dueDate, alert.state) != (due, state):
+                # A new date or a due date that has now passed is news again
+                alert.isRead, alert.emailedDate = False, None
+            alert.title, alert.dueDate, alert.state = title, due, state
+            updates.append(alert)
+    stale = [alert.pk for alert in existing.values()]
+
+    with transaction.atomic():
+        Alert.objects.bulk_create(creates, batch_size=1000)
+        Alert.objects.bulk_update(updates, ['title', 'dueDate', 'state', 'isRead', 'emailedDate'], batch_size=1000)
+        for i in range(0, len(stale), 1000):
+            Alert.objects.filter(pk__in=stale[i:i + 1000]).delete()
+
+    metrics['created'] += len(creates)
+    metrics['updated'] += len(updates)
+    metrics['removed'] += len(stale)
+
+
+def refresh_alerts(today, metrics):
+    """Bring the alerts table in line with the dates as they stand today, TENANT_BATCH_SIZE tenants at a time."""
+    subAdminIDs = list(SignUP.objects.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(subAdminIDs), TENANT_BATCH_SIZE):
+        _refresh_tenants(subAdminIDs[i:i + TENANT_BATCH_SIZE], today, metrics)
+
+
+def send_digests(metrics):
+    """Queue one digest per sub-admin of the alerts not mailed yet."""
+    alerts = Alert.objects.filter(emailedDate__isnull=True).select_related('subAdminID').order_by(
+        'subAdminID', 'state', 'dueDate', 'title'
+    )
+    for subAdmin, tenant_alerts in groupby(alerts.iterator(), key=lambda alert: alert.subAdminID):
+        ids, items, seen = [], [], set()
+        for alert in tenant_alerts:
+            ids.append(alert.pk)
+            # Staff share alerts on the same row; the sub-admin hears about it once
+            source = (alert.sourceModel, alert.dateField, alert.objectID)
+            if source not in seen:
+                seen.add(source)
+                alert.label = DATE_LABELS.get(alert.dateField, alert.dateField)
+                items.append(alert)
+
+        message = render_to_string('alerts/digestEmail.txt', {
+            'subAdmin': subAdmin,
+            'expired': [alert for alert in items if alert.state == 'expired'],
+            'dueSoon': [alert for alert in items if alert.state == 'dueSoon'],
+        })
+        with transaction.atomic():
+            queue_mail(
+                subject=f"FIND MY DSC: {len(items)} due date{'s' if len(items) != 1 else ''} need attention",
+                message=message,
+                recipient_list=[subAdmin.subAdminEmail],
+            )
+            Alert.objects.filter(pk__in=ids).update(emailedDate=timezone.now())
+        metrics['emails'] += 1
+
+
+def scan_alerts(digest=False):
+    """Refresh every user's alerts and, with digest, mail the new ones."""
+    start = clock.monotonic()
+
+    with advisory_lock('findMyDSC.scan_alerts') as acquired:
+        if not acquired:
+            logger.info("scan_alerts: previous run still holds the lock, skipping")
+            return {'skipped': True}
+
+        metrics = {'created': 0, 'updated': 0, 'removed': 0, 'emails': 0}
+        refresh_alerts(timezone.localdate(), metrics)
+        if digest and settings.ALERT_DIGEST_EMAILS:
+            send_digests(metrics)
+
+    metrics.update({'skipped': False, 'seconds': round(clock.monotonic() - start, 3)})
+    logger.info("scan_alerts: %(created)d alerts created, %(updated)d updated, %(removed)d removed, "
+                "%(emails)d digests queued in %(seconds).3fs", metrics)
+    return metrics
@@ -0,0 +1,175 @@
+import logging
+import time
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from admins.cron import advisory_lock
+from .models import PendingWork, ArchivedPendingWork, AnnualFiling, ArchivedAnnualFiling, Trademark, ArchivedTrademark
+from .versioning import HISTORY_MODELS, save_with_history
+
+logger = logging.getLogger(__name__)
+
+# Rows moved per transaction by the background sweep
+ARCHIVE_BATCH_SIZE = 500
+
+# Live model -> the cold table its archived rows are moved to
+ARCHIVE_MODELS = {
+    PendingWork: ArchivedPendingWork,
+    AnnualFiling: ArchivedAnnualFiling,
+    Trademark: ArchivedTrademark,
+}
+LIVE_MODELS = {archive: live for live, archive in ARCHIVE_MODELS.items()}
+
+
+def copy_row(instance, target_model):
+    """Unsaved target_model instance holding every column the two tables share."""
+    names = {field.attname for field in type(instance)._meta.concrete_fields}
+    return target_model(**{
+        field.attname: getattr(instance, field.attname)
+        for field in target_model._meta.concrete_fields if field.attname in names
+    })
+
+
+def _delete_live(model, ids):
+    # Plain DELETE: the ORM would cascade to the History* rows, which must stay
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN "
+            f"({', '.join(['%s'] * len(ids))})",
+            ids,
+        )
+
+
+def raise_next_id(model):
+    """Make the live table's next auto id larger than every id in its archive.
+
+    Archived rows keep their live primary key, so the live table must never
+    issue one of those ids again. Its counter can fall behind them once the
+    newest rows are archived: MySQL before 8.0 recomputes AUTO_INCREMENT as
+    max(id) + 1 on restart, and TRUNCATE or a restore without the table
+    options resets it the same way. ALTER TABLE commits on MySQL, so this
+    runs outside transactions, from the sweep.
+    """
+    last = ARCHIVE_MODELS[model].objects.aggregate(last=Max('pk'))['last']
+    if last is None:
+        return
+    qn = connection.ops.quote_name
+    table, column = model._meta.db_table, model._meta.pk.column
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT AUTO_INCREMENT FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+            if (cursor.fetchone()[0] or 1) <= last:
+                cursor.execute(f"ALTER TABLE {qn(table)} AUTO_INCREMENT = {int(last) + 1}")
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, %s), GREATEST(nextval(pg_get_serial_sequence(%s, %s)), %s))",
+                [table, column, table, column, last],
+            )
+        elif connection.vendor == 'sqlite':
+            # AUTOINCREMENT tables never issue an id at or below their sqlite_sequence entry
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s", [last, table, last])
+
+
+def move_to_archive(model, ids, replace=False):
+    """Move the archived rows among ids from the live table to its archive; returns how many moved.
+
+    An archive row already holding one of the ids belongs to another record
+    and raises IntegrityError, unless replace is set because the row being
+    moved is that archived record, edited (see save_record).
+    """
+    archive_model = ARCHIVE_MODELS[model]
+    with transaction.atomic():
+        rows = list(model.objects.select_for_update().filter(pk__in=ids, isArchived=True))
+        if not rows:
+            return 0
+        pks = [row.pk for row in rows]
+        if replace:
+            archive_model.objects.filter(pk__in=pks).delete()
+        else:
+            taken = list(archive_model.objects.filter(pk__in=pks).values_list('pk', flat=True))
+            if taken:
+                raise IntegrityError(f"{archive_model.__name__} already holds ids {sorted(taken)}")
+        archive_model.objects.bulk_create([copy_row(row, archive_model) for row in rows])
+        _delete_live(model, pks)
+    return len(rows)
+
+
+def get_record(live_qs, archive_qs, pk):
+    """Fetch a row by primary key from the live table, falling back to the archive.
+
+    An archived row comes back as an unsaved live instance with its original
+    primary key and fromArchive set, so the update views can edit it like any
+    other; save_record puts it back where it belongs. Raises the live model's
+    DoesNotExist.
+    """
+    try:
+        return live_qs.get(pk=pk)
+    except live_qs.model.DoesNotExist:
+        try:
+            record = copy_row(archive_qs.get(pk=pk), live_qs.model)
+        except archive_qs.model.DoesNotExist:
+            raise live_qs.model.DoesNotExist
+        record.fromArchive = True
+        return record
+
+
+def save_record(instance):
+    """save_with_history for archivable models, keeping the row in the right table.
+
+    Archived rows end up in the archive, everything else in the live table.
+    Only a record read from the archive by get_record has an archive row to
+    replace or drop.
+    """
+    model = type(instance)
+    fromArchive = getattr(instance, 'fromArchive', False)
+    with transaction.atomic():
+        history = save_with_history(instance)
+        if instance.isArchived:
+            move_to_archive(model, [instance.pk], replace=fromArchive)
+        elif fromArchive:
+            ARCHIVE_MODELS[model].objects.filter(pk=instance.pk).delete()
+    instance.fromArchive = False
+    return history
+
+
+def delete_archived(archive_qs):
+    """Delete archived rows and their history; returns the number of rows deleted."""
+    live_model = LIVE_MODELS[archive_qs.model]
+    ids = list(archive_qs.values_list('pk', flat=True))
+    if not ids:
+        return 0
+    with transaction.atomic():
+        HISTORY_MODELS[live_model].objects.filter(**{f'{live_model._meta.pk.name}__in': ids}).delete()
+        count, _ = archive_qs.model.objects.filter(pk__in=ids).delete()
+    return count
+
+
+def archive_sweep(batch_size=ARCHIVE_BATCH_SIZE):
+    """Move every live row flagged isArchived into its archive table.
+
+    The update views already move rows as they are archived; this picks up
+    rows flagged any other way (the Django admin, existing data) in batches.
+    """
+    start = time.monotonic()
+
+    with advisory_lock('findMyDSC.archive_sweep') as acquired:
+        if not acquired:
+            logger.info("archive_sweep: previous run still holds the lock, skipping")
+            return {'skipped': True}
+
+        moved = {}
+        for model in ARCHIVE_MODELS:
+            raise_next_id(model)
+            moved[model.__name__] = 0
+            while True:
+                ids = list(model.objects.filter(isArchived=True).values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                moved[model.__name__] += move_to_archive(model, ids)
+
+    metrics = {'skipped': False, 'moved': moved, 'seconds': round(time.monotonic() - start, 3)}
+    logger.info("archive_sweep: moved %s in %.3fs", moved, metrics['seconds'])
+    return metrics
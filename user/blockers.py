@@ -0,0 +1,45 @@
+from collections import defaultdict
+from django.db.models import Count
+from .models import (
+    UpdatedCompany, UpdatedClient, UpdatedDSC, PendingWork, AnnualFiling, Trademark,
+    ArchivedPendingWork, ArchivedAnnualFiling, ArchivedTrademark,
+)
+
+# Tables whose rows keep their parent from being deleted, with the name the
+# UI uses for them. History* rows cascade with their parent and users are only
+# unlinked (SET_NULL), so neither blocks a delete.
+BLOCKING_MODELS = {
+    UpdatedCompany: 'Company',
+    UpdatedClient: 'Phone Book',
+    UpdatedDSC: 'DSC',
+    PendingWork: 'Pending Work',
+    AnnualFiling: 'Annual Filing',
+    Trademark: 'Trademark',
+    ArchivedPendingWork: 'Archived Pending Work',
+    ArchivedAnnualFiling: 'Archived Annual Filing',
+    ArchivedTrademark: 'Archived Trademark',
+}
+
+
+def find_blockers(model, ids):
+    """Return {id: ['Phone Book (2)', 'DSC (1)', ...]} for the ids of model that have dependents.
+
+    The relations are read from the model metadata and each one is checked for
+    the whole id set with a single grouped COUNT, so the number of queries does
+    not depend on how many ids are passed in.
+    """
+    ids = list(ids)
+    blockers = defaultdict(list)
+    if not ids:
+        return blockers
+
+    for relation in model._meta.related_objects:
+        label = BLOCKING_MODELS.get(relation.related_model)
+        if label is None or not relation.one_to_many:
+            continue
+        fk = relation.field.name
+        counts = (relation.related_model.objects.filter(**{f'{fk}__in': ids})
+                  .values(fk).annotate(n=Count('pk')).order_by())
+        for row in counts:
+            blockers[row[fk]].append(f"{label} ({row['n']})")
+    return blockers
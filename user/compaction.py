@@ -0,0 +1,142 @@
+import json
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from admins.cron import advisory_lock
+from .archive import ARCHIVE_MODELS
+from .models import SignUP, CompactedHistory
+from .versioning import HISTORY_MODELS, history_date_field, history_values
+
+logger = logging.getLogger(__name__)
+
+# Live rows whose history is compacted per transaction
+COMPACT_BATCH_SIZE = 200
+
+
+def _size(values):
+    return len(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def _folded_states(history_model, object_ids):
+    """{objectID: column state after its newest compacted entry} for the given live rows."""
+    states = {}
+    entries = CompactedHistory.objects.filter(
+        historyModel=history_model.__name__, objectID__in=object_ids
+    ).order_by('objectID', 'modifiedDate', 'historyID')
+    for entry in entries:
+        states.setdefault(entry.objectID, {}).update(entry.changes)
+    return states
+
+
+def compact_model(live_model, cutoff, metrics):
+    """Replace the History* rows of live_model older than cutoff with field-level diffs."""
+    history_model = HISTORY_MODELS[live_model]
+    live_fk = live_model._meta.pk.name
+    live_fk_attname = history_model._meta.get_field(live_fk).attname
+    date_field = history_date_field(history_model)
+    old_rows = history_model.objects.filter(**{f'{date_field}__lt': cutoff})
+
+    object_ids = list(old_rows.values_list(live_fk, flat=True).distinct().order_by())
+    for start in range(0, len(object_ids), COMPACT_BATCH_SIZE):
+        batch = object_ids[start:start + COMPACT_BATCH_SIZE]
+        with transaction.atomic():
+            states = _folded_states(history_model, batch)
+            rows = old_rows.filter(**{f'{live_fk}__in': batch}).order_by(live_fk, date_field, 'pk')
+            entries, compacted = [], []
+            for row in rows:
+                object_id = getattr(row, live_fk_attname)
+                values = history_values(row)
+                state = states.setdefault(object_id, {})
+                changes = {name: value for name, value in values.items() if name not in state or state[name] != value}
+                state.update(changes)
+                entries.append(CompactedHistory(
+                    subAdminID_id=row.subAdminID_id, historyModel=history_model.__name__, objectID=object_id,
+                    historyID=row.pk, modifiedDate=getattr(row, date_field), changes=changes,
+                ))
+                compacted.append(row.pk)
+                metrics['bytes'] += _size(values) - _size(changes)
+            CompactedHistory.objects.bulk_create(entries, batch_size=500)
+            history_model.objects.filter(pk__in=compacted).delete()
+        metrics['compacted'] += len(compacted)
+
+
+def prune_tenant(subAdminID, cutoff, metrics):
+    """Delete one tenant's history older than cutoff, full rows and compacted entries alike.
+
+    An object's oldest remaining entry must stay a full snapshot, so the
+    entries being dropped are folded into it first.
+    """
+    for history_model in HISTORY_MODELS.values():
+        date_field = history_date_field(history_model)
+        stored = history_model.objects.filter(subAdminID=subAdminID, **{f'{date_field}__lt': cutoff})
+        metrics['bytes'] += sum(_size(history_values(row)) for row in stored.iterator())
+        metrics['pruned'] += stored.delete()[0]
+
+        expired = CompactedHistory.objects.filter(
+            subAdminID=subAdminID, historyModel=history_model.__name__, modifiedDate__lt=cutoff
+        )
+        object_ids = list(expired.values_list('objectID', flat=True).distinct().order_by())
+        for start in range(0, len(object_ids), COMPACT_BATCH_SIZE):
+            batch = object_ids[start:start + COMPACT_BATCH_SIZE]
+            with transaction.atomic():
+                entries = CompactedHistory.objects.filter(
+                    historyModel=history_model.__name__, objectID__in=batch
+                ).order_by('objectID', 'modifiedDate', 'historyID')
+                states, dropped, rebased = {}, [], {}
+                for entry in entries:
+                    state = states.setdefault(entry.objectID, {})
+                    state.update(entry.changes)
+                    if entry.modifiedDate < cutoff:
+                        dropped.append(entry.pk)
+                        metrics['bytes'] += _size(entry.changes)
+                    elif entry.objectID not in rebased:
+                        entry.changes = dict(state)
+                        rebased[entry.objectID] = entry
+                CompactedHistory.objects.bulk_update(list(rebased.values()), ['changes'], batch_size=500)
+                metrics['pruned'] += CompactedHistory.objects.filter(pk__in=dropped).delete()[0]
+
+
+def drop_orphans(metrics):
+    """Compacted entries outlive their live row (nothing cascades to them); remove those."""
+    for live_model, history_model in HISTORY_MODELS.items():
+        orphans = CompactedHistory.objects.filter(historyModel=history_model.__name__).exclude(
+            objectID__in=live_model.objects.values('pk')
+        )
+        if live_model in ARCHIVE_MODELS:
+            orphans = orphans.exclude(objectID__in=ARCHIVE_MODELS[live_model].objects.values('pk'))
+        metrics['orphans'] += orphans.delete()[0]
+
+
+def compact_history(compact_after_days=None):
+    """Compact old history, apply each tenant's retention window and report what was reclaimed.
+
+    bytes is estimated from the serialized size of the rows removed less the
+    diffs written in their place; the database frees the pages on its own schedule.
+    """
+    start = time.monotonic()
+    if compact_after_days is None:
+        compact_after_days = settings.HISTORY_COMPACT_AFTER_DAYS
+    now = timezone.now()
+
+    with advisory_lock('findMyDSC.compact_history') as acquired:
+        if not acquired:
+            logger.info("compact_history: previous run still holds the lock, skipping")
+            return {'skipped': True}
+
+        metrics = {'compacted': 0, 'pruned': 0, 'orphans': 0, 'bytes': 0}
+        for live_model in HISTORY_MODELS:
+            compact_model(live_model, now - timedelta(days=compact_after_days), metrics)
+
+        for subAdminID, days in SignUP.objects.values_list('subAdminID', 'historyRetentionDays'):
+            prune_tenant(subAdminID, now - timedelta(days=days or settings.HISTORY_RETENTION_DAYS), metrics)
+
+        drop_orphans(metrics)
+
+    metrics.update({'skipped': False, 'seconds': round(time.monotonic() - start, 3)})
+    logger.info("compact_history: %(compacted)d rows compacted, %(pruned)d pruned, %(orphans)d orphans removed, "
+                "~%(bytes)d bytes reclaimed in %(seconds).3fs", metrics)
+    return metrics
@@ -0,0 +1,349 @@
+import csv
+import io
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import openpyxl
+from django.db import IntegrityError
+from .models import UpdatedGroup, UpdatedCompany, UpdatedClient, UpdatedDSC, UpdatedUser, Work, PendingWork, name_key, phone_key
+from .plans import remaining_dsc_allowance
+from .sequences import reserve_srn_block
+from .versioning import bulk_create_with_history, save_with_history
+
+# Valid rows are written in batches of this size
+BATCH_SIZE = 1000
+
+# Column header (as in the export workbook) -> row key, per import type
+IMPORT_COLUMNS = {
+    'company': {
+        'Group Name': 'groupName',
+        'Company Name': 'companyName',
+        'Company Type': 'companyType',
+    },
+    'client': {
+        'Client Name': 'clientName',
+        'Company Name': 'companyName',
+        'Phone Number': 'clientPhone',
+    },
+    'dsc': {
+        'Company Name': 'companyName',
+        'Client Name': 'clientName',
+        'Status': 'status',
+        'Location': 'location',
+        'Renewal Date': 'renewalDate',
+        'Phone Number': 'clientPhone',
+        'Last Received By': 'receivedBy',
+        'Last Received From': 'receivedFrom',
+        'Last Delivered By': 'deliveredBy',
+        'Last Delivery To': 'deliveredTo',
+    },
+    'pendingWork': {
+        'Company Name': 'companyName',
+        'Form No.': 'formNo',
+        'Event Date': 'eventDate',
+        'Cut Off Time': 'cutOffTime',
+        'Internal Due Date': 'internalDueDate',
+        'Due Date': 'actualDueDate',
+        'Responsible Person': 'userName',
+        'Status': 'status',
+        'SRN No.': 'srnNo',
+        'SRN Date': 'srnDate',
+        'SRN Amount': 'amt',
+        'Fees': 'fees',
+        'Remarks': 'remark',
+        'Billing': 'billing',
+    },
+}
+
+IMPORT_LABELS = {
+    'company': 'Companies',
+    'client': 'Phone Book',
+    'dsc': 'DSCs',
+    'pendingWork': 'Pending Work',
+}
+
+
+class ImportFileError(Exception):
+    """The uploaded file cannot be read at all (as opposed to a bad row)."""
+
+
+class RowError(Exception):
+    pass
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # phone numbers typed into Excel come back as floats
+    return str(value).strip()
+
+
+def _date(value, label, required=False):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    if not text:
+        if required:
+            raise RowError(f"{label} is required.")
+        return None
+    # The forms post ISO dates, the export writes dd-mm-yyyy
+    for fmt in ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise RowError(f"{label} '{text}' is not a valid date.")
+
+
+def _amount(value, label):
+    text = _text(value)
+    if not text:
+        return Decimal('0')
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise RowError(f"{label} '{text}' is not a valid amount.")
+
+
+def read_rows(upload, import_type):
+    """Yield (row number, {key: value}) for each non-empty row of an uploaded CSV or XLSX file."""
+    columns = {header.lower(): key for header, key in IMPORT_COLUMNS[import_type].items()}
+
+    if upload.name.lower().endswith('.xlsx'):
+        try:
+            wb = openpyxl.load_workbook(upload, read_only=True, data_only=True)
+        except Exception:
+            raise ImportFileError("The file is not a valid .xlsx workbook.")
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+    elif upload.name.lower().endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+    else:
+        raise ImportFileError("Please upload a .csv or .xlsx file.")
+
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ImportFileError("The file is empty.")
+    keys = [columns.get(_text(cell).lower()) for cell in header]
+    missing = set(columns.values()) - set(keys)
+    if missing:
+        names = [h for h, key in IMPORT_COLUMNS[import_type].items() if key in missing]
+        raise ImportFileError(f"Missing columns: {', '.join(names)}.")
+
+    for number, row in enumerate(rows, start=2):
+        values = {key: value for key, value in zip(keys, row) if key}
+        if any(_text(value) for value in values.values()):
+            yield number, values
+
+
+def _name_map(qs, column):
+    """{name_key: row} of qs; None where several rows share the name, as in nameIDs."""
+    rows = {}
+    for row in qs:
+        key = name_key(getattr(row, column))
+        rows[key] = None if key in rows else row
+    return rows
+
+
+class Importer:
+    """Validate rows of one import type and write the valid ones in batches.
+
+    Every name a row refers to is resolved against maps built once up front,
+    so validation costs no queries per row. Rows with problems are skipped and
+    reported; the rest are inserted with bulk_create_with_history.
+    """
+
+    def __init__(self, user, import_type):
+        self.user = user
+        self.subAdmin = user.subAdminID
+        self.import_type = import_type
+        self.created = 0
+        self.errors = []  # (row number, message)
+        self.batch = []
+        self._build_maps()
+
+    def _scoped(self, model):
+        qs = model.objects.filter(subAdminID=self.subAdmin)
+        # Users tied to a group only see (and import into) that group
+        if self.user.groupID_id:
+            qs = qs.filter(groupID=self.user.groupID_id)
+        return qs
+
+    def _build_maps(self):
+        self.groups = {name_key(g.groupName): g for g in self._scoped(UpdatedGroup)}
+        self.companies = {name_key(c.companyName): c for c in self._scoped(UpdatedCompany)}
+        if self.import_type == 'company':
+            self.all_company_names = {
+                name_key(name) for name in
+                UpdatedCompany.objects.filter(subAdminID=self.subAdmin).values_list('companyName', flat=True)
+            }
+        if self.import_type == 'client':
+            self.phones = set()  # phones seen in this file; stored ones are checked per batch
+        if self.import_type == 'dsc':
+            self.dsc_allowance = remaining_dsc_allowance(self.subAdmin)
+        if self.import_type == 'pendingWork':
+            self.forms = _name_map(Work.objects.filter(subAdminID=self.subAdmin), 'formNo')
+            self.users = _name_map(
+                UpdatedUser.objects.filter(subAdminID=self.subAdmin, isActive=True, isClientUser=False), 'userName'
+            )
+
+    def _company(self, row):
+        name = _text(row.get('companyName'))
+        if not name:
+            raise RowError("Company Name is required.")
+        company = self.companies.get(name_key(name))
+        if not company:
+            raise RowError(f"Company '{name}' not found.")
+        return company
+
+    def _named(self, names, value, label):
+        name = _text(value)
+        key = name_key(name)
+        if key not in names:
+            raise RowError(f"{label} '{name}' not found.")
+        if names[key] is None:
+            raise RowError(f"{label} '{name}' matches more than one record.")
+        return names[key]
+
+    def _required(self, row, *keys):
+        labels = {key: header for header, key in IMPORT_COLUMNS[self.import_type].items()}
+        empty = [labels[key] for key in keys if not _text(row.get(key))]
+        if empty:
+            raise RowError(f"Please fill {', '.join(empty)}.")
+
+    # One builder per import type: validate a row and return the unsaved instance
+    def build_company(self, row):
+        self._required(row, 'groupName', 'companyName', 'companyType')
+        group = self.groups.get(name_key(_text(row['groupName'])))
+        if not group:
+            raise RowError(f"Group '{_text(row['groupName'])}' not found.")
+        name = _text(row['companyName'])
+        if name_key(name) in self.all_company_names:
+            raise RowError(f"Company '{name}' already exists.")
+        self.all_company_names.add(name_key(name))
+        return UpdatedCompany(
+            companyName=name, companyType=_text(row['companyType']), groupID=group,
+            userID=self.user, subAdminID=self.subAdmin
+        )
+
+    def build_client(self, row):
+        self._required(row, 'clientName', 'companyName', 'clientPhone')
+        clientName, clientPhone = _text(row['clientName']), _text(row['clientPhone'])
+        if not re.match(r'^[A-Za-z\s]+$', clientName):
+            raise RowError("Client name can only contain letters and spaces.")
+        if not re.match(r'^\d{10}$', clientPhone):
+            raise RowError("Phone number must be exactly 10 digits.")
+        company = self._company(row)
+        if clientPhone in self.phones:
+            raise RowError(f"Phone number {clientPhone} appears more than once in the file.")
+        self.phones.add(clientPhone)
+        return UpdatedClient(
+            clientName=clientName, companyID=company, clientPhone=clientPhone,
+            userID=self.user, subAdminID=self.subAdmin
+        )
+
+    def build_dsc(self, row):
+        status = _text(row.get('status')).upper()
+        if status == 'IN':
+            self._required(row, 'clientName', 'companyName', 'location', 'receivedBy', 'receivedFrom', 'clientPhone')
+        elif status == 'OUT':
+            self._required(row, 'clientName', 'companyName', 'location', 'deliveredTo', 'deliveredBy', 'clientPhone')
+        else:
+            raise RowError("Status must be IN or OUT.")
+        company = self._company(row)
+        renewalDate = _date(row.get('renewalDate'), 'Renewal Date')
+        if self.dsc_allowance <= 0:
+            raise RowError("DSC limit of your subscription plan reached.")
+        self.dsc_allowance -= 1
+        return UpdatedDSC(
+            clientName=_text(row['clientName']), companyID=company, status=status,
+            location=_text(row['location']), renewalDate=renewalDate, clientPhone=_text(row['clientPhone']),
+            receivedBy=_text(row.get('receivedBy')) if status == 'IN' else '',
+            receivedFrom=_text(row.get('receivedFrom')) if status == 'IN' else '',
+            deliveredTo=_text(row.get('deliveredTo')) if status == 'OUT' else '',
+            deliveredBy=_text(row.get('deliveredBy')) if status == 'OUT' else '',
+            userID=self.user, subAdminID=self.subAdmin
+        )
+
+    def build_pendingWork(self, row):
+        self._required(row, 'formNo', 'companyName', 'eventDate', 'actualDueDate', 'cutOffTime', 'userName', 'status', 'billing')
+        company = self._company(row)
+        work = self._named(self.forms, row['formNo'], 'Form No.')
+        responsible = self._named(self.users, row['userName'], 'User')
+        return PendingWork(
+            subAdminID=self.subAdmin, formID=work, companyID=company, userID=responsible,
+            eventDate=_date(row['eventDate'], 'Event Date', required=True),
+            actualDueDate=_date(row['actualDueDate'], 'Due Date', required=True),
+            internalDueDate=_date(row.get('internalDueDate'), 'Internal Due Date', required=True),
+            cutOffTime=_text(row['cutOffTime']), status=_text(row['status']),
+            srnNo=_text(row.get('srnNo')), srnDate=_date(row.get('srnDate'), 'SRN Date'),
+            amt=_amount(row.get('amt'), 'SRN Amount'), fees=_amount(row.get('fees'), 'Fees'),
+            remark=_text(row.get('remark')), billing=_text(row['billing']),
+            modifiedBy=self.user.userName,
+        )
+
+    def add(self, number, row):
+        try:
+            instance = getattr(self, f'build_{self.import_type}')(row)
+        except RowError as e:
+            self.errors.append((number, str(e)))
+            return
+        self.batch.append((number, instance))
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.import_type == 'client' and self.batch:
+            # Phone numbers are unique per sub-admin (client_sa_phone_uniq), as in addClient
+            taken = set(UpdatedClient.objects.filter(
+                subAdminID=self.subAdmin, clientPhoneKey__in=[phone_key(client.clientPhone) for number, client in self.batch]
+            ).values_list('clientPhoneKey', flat=True))
+            for number, client in self.batch:
+                if phone_key(client.clientPhone) in taken:
+                    self.errors.append((number, f"Phone number {client.clientPhone} already exists."))
+            self.batch = [(number, client) for number, client in self.batch if phone_key(client.clientPhone) not in taken]
+
+        batch, self.batch = self.batch, []
+        instances = [instance for number, instance in batch]
+        if not instances:
+            return
+        if self.import_type == 'pendingWork':
+            # One counter update numbers the whole batch
+            first = reserve_srn_block(self.subAdmin, PendingWork, len(instances))
+            for offset, instance in enumerate(instances):
+                instance.indexSRN = first + offset
+        try:
+            bulk_create_with_history(instances, batch_size=BATCH_SIZE)
+        except IntegrityError:
+            # A name or phone added since the checks above; find the rows it affects one by one
+            self._save_rows(batch)
+            return
+        self.created += len(instances)
+
+    def _save_rows(self, batch):
+        for number, instance in batch:
+            instance.pk = None  # bulk_create may have set it before rolling back
+            instance._state.adding = True
+            try:
+                save_with_history(instance)
+            except IntegrityError:
+                self.errors.append((number, self._conflict(instance)))
+                continue
+            self.created += 1
+
+    def _conflict(self, instance):
+        if self.import_type == 'company':
+            return f"Company '{instance.companyName}' already exists."
+        if self.import_type == 'client':
+            return f"Phone number {instance.clientPhone} already exists."
+        return "Row conflicts with a record saved meanwhile."
+
+    def run(self, rows):
+        for number, row in rows:
+            self.add(number, row)
+        self.flush()
+        self.errors.sort()  # duplicate phones are only found at flush time
+        return self
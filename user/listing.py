@@ -0,0 +1,526 @@
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import or_
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.utils.dateformat import format as format_date
+from django.utils.timezone import localtime
+from .models import (
+    UpdatedDSC, UpdatedCompany, UpdatedClient, Work, PendingWork, AnnualFiling, Trademark,
+    ArchivedPendingWork, ArchivedAnnualFiling, ArchivedTrademark,
+    HistoryDSC, HistoryCompany, HistoryGroup, HistoryClient, HistoryUser, HistoryWork,
+    HistoryPendingWork, HistoryAnnualFiling, HistoryTrademark,
+)
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Per-list configuration for server-side paging, sorting and searching.
+#   ordering: default order (the primary key is always appended as a tie-breaker)
+#   sortable: ?sort= key -> field path (non-null fields only, so the keyset stays exact)
+#   search:   field paths matched with icontains for ?q=
+#   columns:  JSON key -> field path returned by the data endpoints, including
+#             the date-dependent flags annotated by the model's with_flags()
+LIST_SPECS = {
+    'listDSC': {
+        'ordering': ['-modifiedDate'],
+        'sortable': {
+            'clientName': 'clientName',
+            'companyName': 'companyID__companyName',
+            'status': 'status',
+            'location': 'location',
+            'groupName': 'companyID__groupID__groupName',
+            'modifiedDate': 'modifiedDate',
+        },
+        'search': ['clientName', 'companyID__companyName', 'status', 'location', 'companyID__groupID__groupName'],
+        'columns': {
+            'dscID': 'dscID',
+            'clientName': 'clientName',
+            'companyName': 'companyID__companyName',
+            'status': 'status',
+            'location': 'location',
+            'groupName': 'companyID__groupID__groupName',
+            'renewalDate': 'renewalDate',
+            'modifiedDate': 'modifiedDate',
+            'isExpired': 'is_expired',
+        },
+    },
+    'listCompany': {
+        'ordering': ['-companyModifiedDate'],
+        'sortable': {
+            'companyName': 'companyName',
+            'companyType': 'companyType',
+            'groupName': 'groupID__groupName',
+            'modifiedDate': 'companyModifiedDate',
+        },
+        'search': ['companyName', 'companyType', 'groupID__groupName'],
+        'columns': {
+            'companyID': 'companyID',
+            'companyName': 'companyName',
+            'companyType': 'companyType',
+            'groupName': 'groupID__groupName',
+        },
+    },
+    'listClient': {
+        'ordering': ['-clientModifiedDate'],
+        'sortable': {
+            'clientName': 'clientName',
+            'companyName': 'companyID__companyName',
+            'clientPhone': 'clientPhone',
+            'modifiedDate': 'clientModifiedDate',
+        },
+        'search': ['clientName', 'companyID__companyName', 'clientPhone'],
+        'columns': {
+            'clientID': 'clientID',
+            'clientName': 'clientName',
+            'companyName': 'companyID__companyName',
+            'clientPhone': 'clientPhone',
+        },
+    },
+    'listWork': {
+        'ordering': ['-modifiedDate'],
+        'sortable': {
+            'formNo': 'formNo',
+            'matter': 'matter',
+            'filingDays': 'filingDays',
+            'modifiedDate': 'modifiedDate',
+        },
+        'search': ['formNo', 'matter'],
+        'columns': {
+            'formID': 'formID',
+            'formNo': 'formNo',
+            'matter': 'matter',
+            'filingDays': 'filingDays',
+        },
+    },
+    'listPendingWork': {
+        'ordering': ['-isPinned', '-modifiedDate'],
+        'sortable': {
+            'companyName': 'companyID__companyName',
+            'groupName': 'companyID__groupID__groupName',
+            'formNo': 'formID__formNo',
+            'eventDate': 'eventDate',
+            'status': 'status',
+            'internalDueDate': 'internalDueDate',
+            'actualDueDate': 'actualDueDate',
+            'remark': 'remark',
+            'userName': 'userID__userName',
+            'billing': 'billing',
+            'modifiedDate': 'modifiedDate',
+        },
+        'search': ['companyID__companyName', 'companyID__groupID__groupName', 'formID__formNo', 'status', 'remark', 'srnNo', 'userID__userName', 'billing'],
+        'columns': {
+            'pendingWorkID': 'pendingWorkID',
+            'indexSRN': 'indexSRN',
+            'companyName': 'companyID__companyName',
+            'groupName': 'companyID__groupID__groupName',
+            'formNo': 'formID__formNo',
+            'eventDate': 'eventDate',
+            'status': 'status',
+            'internalDueDate': 'internalDueDate',
+            'actualDueDate': 'actualDueDate',
+            'remark': 'remark',
+            'srnNo': 'srnNo',
+            'userName': 'userID__userName',
+            'billing': 'billing',
+            'isPinned': 'isPinned',
+            'isInternalExpired': 'is_internal_expired',
+            'isInternalDueSoon': 'is_internal_due_soon',
+            'isActualExpired': 'is_actual_expired',
+            'isActualDueSoon': 'is_actual_due_soon',
+        },
+    },
+    'listAnnual': {
+        'ordering': ['-isPinned', '-modifiedDate'],
+        'sortable': {
+            'companyName': 'companyID__companyName',
+            'groupName': 'companyID__groupID__groupName',
+            'modifiedDate': 'modifiedDate',
+        },
+        'search': ['companyID__companyName', 'companyID__groupID__groupName', 'financialYear',
+                   'statusDPT3', 'statusMGT14', 'statusAOC4', 'statusMGT7', 'statusForm11', 'statusForm8'],
+        'columns': {
+            'annualFilingID': 'annualFilingID',
+            'indexSRN': 'indexSRN',
+            'companyName': 'companyID__companyName',
+            'groupName': 'companyID__groupID__groupName',
+            'financialYear': 'financialYear',
+            'statusDPT3': 'statusDPT3',
+            'statusMGT14': 'statusMGT14',
+            'statusAOC4': 'statusAOC4',
+            'statusMGT7': 'statusMGT7',
+            'statusForm11': 'statusForm11',
+            'statusForm8': 'statusForm8',
+            'isPinned': 'isPinned',
+        },
+    },
+    'listTrademark': {
+        'ordering': ['-modifiedDate'],
+        'sortable': {
+            'nameOfTrademark': 'nameOfTrademark',
+            'applicationNo': 'applicationNo',
+            'status1': 'status1',
+            'status2': 'status2',
+            'groupName': 'groupID__groupName',
+            'modifiedDate': 'modifiedDate',
+        },
+        'search': ['nameOfTrademark', 'applicationNo', 'nameOfApplicant', 'status1', 'status2', 'groupID__groupName'],
+        'columns': {
+            'trademarkID': 'trademarkID',
+            'indexSRN': 'indexSRN',
+            'nameOfTrademark': 'nameOfTrademark',
+            'applicationNo': 'applicationNo',
+            'status1': 'status1',
+            'status2': 'status2',
+            'lastDate': 'lastDate',
+            'hearingDate': 'hearingDate',
+            'groupName': 'groupID__groupName',
+            'expiryDate': 'expiryDate',
+        },
+    },
+}
+
+
+# Per-model column sets for list pages: the relations each list template
+# dereferences are joined up front and only the rendered columns are loaded,
+# so a page costs a fixed number of queries whatever its row count.
+LIST_PROJECTIONS = {
+    UpdatedDSC: {
+        'select_related': ['companyID__groupID'],
+        'only': ['dscID', 'clientName', 'status', 'location', 'renewalDate', 'modifiedDate',
+                 'companyID__companyName', 'companyID__groupID__groupName'],
+    },
+    UpdatedCompany: {
+        'select_related': ['groupID'],
+        'only': ['companyID', 'companyName', 'companyType', 'companyModifiedDate', 'groupID__groupName'],
+    },
+    UpdatedClient: {
+        'select_related': ['companyID'],
+        'only': ['clientID', 'clientName', 'clientPhone', 'clientModifiedDate', 'companyID__companyName'],
+    },
+    Work: {
+        'select_related': [],
+        'only': ['formID', 'formNo', 'matter', 'filingDays', 'modifiedDate'],
+    },
+    # Shared by listPendingWork and listPendingWorkReport
+    PendingWork: {
+        'select_related': ['companyID__groupID', 'formID', 'userID'],
+        'only': ['pendingWorkID', 'indexSRN', 'eventDate', 'status', 'internalDueDate', 'actualDueDate',
+                 'remark', 'srnNo', 'srnDate', 'amt', 'billing', 'isPinned', 'isArchived', 'modifiedDate',
+                 'companyID__companyName', 'companyID__groupID__groupName', 'formID__formNo', 'userID__userName'],
+    },
+    # Shared by listAnnual and listAnnualReport
+    AnnualFiling: {
+        'select_related': ['companyID__groupID'],
+        'only': ['annualFilingID', 'indexSRN', 'financialYear', 'isPinned', 'isArchived', 'modifiedDate',
+                 'statusDPT3', 'srnNoDPT3', 'srnDateDPT3', 'amtDPT3',
+                 'statusMGT14', 'srnNoMGT14', 'srnDateMGT14', 'amtMGT14',
+                 'statusAOC4', 'srnNoAOC4', 'srnDateAOC4', 'amtAOC4',
+                 'statusMGT7', 'srnNoMGT7', 'srnDateMGT7', 'amtMGT7',
+                 'statusForm11', 'srnNoForm11', 'srnDateForm11', 'amtForm11',
+                 'statusForm8', 'srnNoForm8', 'srnDateForm8', 'amtForm8',
+                 'companyID__companyName', 'companyID__groupID__groupName'],
+    },
+    Trademark: {
+        'select_related': ['groupID'],
+        'only': ['trademarkID', 'indexSRN', 'nameOfTrademark', 'applicationNo', 'status1', 'status2',
+                 'lastDate', 'hearingDate', 'expiryDate', 'isArchived', 'modifiedDate', 'groupID__groupName'],
+    },
+}
+
+# The ?archived=true lists read the archive tables, which have the same columns
+LIST_PROJECTIONS[ArchivedPendingWork] = LIST_PROJECTIONS[PendingWork]
+LIST_PROJECTIONS[ArchivedAnnualFiling] = LIST_PROJECTIONS[AnnualFiling]
+LIST_PROJECTIONS[ArchivedTrademark] = LIST_PROJECTIONS[Trademark]
+
+
+def list_projection(qs):
+    """Apply the model's list projection, if it has one."""
+    projection = LIST_PROJECTIONS.get(qs.model)
+    if projection:
+        qs = qs.select_related(*projection['select_related']).only(*projection['only'])
+    return qs
+
+class Page:
+    """One keyset page of a list plus the query strings for its pager links."""
+
+    def __init__(self, rows, cursor, next_cursor, q, sort, params):
+        self.rows = rows
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.q = q
+        self.sort = sort
+        self._params = params
+
+    def _query(self, cursor):
+        params = self._params.copy()
+        params.pop('cursor', None)
+        if cursor:
+            params['cursor'] = cursor
+        return params.urlencode()
+
+    @property
+    def first_query(self):
+        return self._query(None)
+
+    @property
+    def next_query(self):
+        return self._query(self.next_cursor)
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder trims datetimes to milliseconds; cursors need the exact value
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_filter(keys, values):
+    """Rows strictly after `values` for the (possibly mixed-direction) ordering `keys`."""
+    clauses = []
+    for i, (name, descending) in enumerate(keys):
+        clause = {keys[j][0]: values[j] for j in range(i)}
+        clause[f"{name}__{'lt' if descending else 'gt'}"] = values[i]
+        clauses.append(Q(**clause))
+    return reduce(or_, clauses)
+
+
+def paginate(qs, ordering, cursor=None, size=PAGE_SIZE, values=None):
+    """Return (rows, next_cursor) for one keyset page of `qs`.
+
+    Each ordering field is annotated as _k<n> so the cursor can be read from
+    the last row even when the field lives on a related model. Pass `values`
+    (field paths) to get dicts instead of model instances.
+    """
+    pk_name = qs.model._meta.pk.name
+    ordering = [f for f in ordering if f.lstrip('-') != pk_name]
+    ordering.append('-' + pk_name)
+
+    keys = []
+    annotations = {}
+    for n, field in enumerate(ordering):
+        name = f'_k{n}'
+        annotations[name] = F(field.lstrip('-'))
+        keys.append((name, field.startswith('-')))
+
+    qs = qs.annotate(**annotations)
+    if cursor:
+        cursor_values = decode_cursor(cursor)
+        if cursor_values is not None and len(cursor_values) == len(keys):
+            # A tampered cursor of the wrong types is ignored like an undecodable one
+            try:
+                cursor_values = [
+                    qs.query.annotations[name].output_field.to_python(value)
+                    for (name, _), value in zip(keys, cursor_values)
+                ]
+                qs = qs.filter(keyset_filter(keys, cursor_values))
+            except (ValidationError, TypeError, ValueError):
+                pass
+    qs = qs.order_by(*[('-' if desc else '') + name for name, desc in keys])
+    if values is not None:
+        qs = qs.values(*values, *[name for name, _ in keys])
+
+    rows = list(qs[:size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        if values is not None:
+            next_cursor = encode_cursor([last[name] for name, _ in keys])
+        else:
+            next_cursor = encode_cursor([getattr(last, name) for name, _ in keys])
+    return rows, next_cursor
+
+
+def _apply_search_and_sort(request, spec, qs):
+    q = request.GET.get('q', '').strip()
+    if q:
+        qs = qs.filter(reduce(or_, [Q(**{f'{path}__icontains': q}) for path in spec['search']]))
+
+    sort = request.GET.get('sort', '')
+    field = spec['sortable'].get(sort.lstrip('-'))
+    if field:
+        ordering = [('-' if sort.startswith('-') else '') + field]
+    else:
+        sort = ''
+        ordering = list(spec['ordering'])
+    return qs, q, sort, ordering
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('size', PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate_list(request, list_name, qs):
+    """Keyset page of model instances for an HTML list view."""
+    spec = LIST_SPECS[list_name]
+    qs, q, sort, ordering = _apply_search_and_sort(request, spec, qs)
+    cursor = request.GET.get('cursor')
+    rows, next_cursor = paginate(qs, ordering, cursor, _page_size(request))
+    return Page(rows, cursor, next_cursor, q, sort, request.GET)
+
+
+def list_json(request, list_name, qs):
+    """Keyset page of plain column values for a list's JSON data endpoint."""
+    spec = LIST_SPECS[list_name]
+    qs, q, sort, ordering = _apply_search_and_sort(request, spec, qs)
+    columns = spec['columns']
+    rows, next_cursor = paginate(qs, ordering, request.GET.get('cursor'), _page_size(request), values=list(columns.values()))
+    data = [{key: row[path] for key, path in columns.items()} for row in rows]
+    return JsonResponse({'status': 'success', 'rows': data, 'next': next_cursor, 'q': q, 'sort': sort})
+
+
+# Columns of each update page's history panel: JSON key -> attribute path,
+# or (path, date format) for a datetime shown as a date
+HISTORY_COLUMNS = {
+    HistoryDSC: {
+        'clientName': 'clientName',
+        'status': 'status',
+        'location': 'location',
+        'renewalDate': ('renewalDate', 'd-m-Y'),
+        'clientPhone': 'clientPhone',
+        'receivedBy': 'receivedBy',
+        'receivedFrom': 'receivedFrom',
+        'deliveredBy': 'deliveredBy',
+        'deliveredTo': 'deliveredTo',
+        'modifiedBy': 'userID__userName',
+        'modifiedDate': 'modifiedDate',
+    },
+    HistoryCompany: {
+        'companyName': 'companyName',
+        'companyType': 'companyType',
+        'groupName': 'groupID__groupName',
+        'modifiedBy': 'userID__userName',
+        'modifiedDate': 'companyModifiedDate',
+    },
+    HistoryGroup: {
+        'groupName': 'groupName',
+        'modifiedBy': 'userID__userName',
+        'modifiedDate': 'groupModifiedDate',
+    },
+    HistoryClient: {
+        'clientName': 'clientName',
+        'companyName': 'companyID__companyName',
+        'clientPhone': 'clientPhone',
+        'modifiedBy': 'userID__userName',
+        'modifiedDate': 'clientModifiedDate',
+    },
+    HistoryUser: {
+        'userName': 'userName',
+        'userPhone': 'userPhone',
+        'userUsername': 'userUsername',
+        'modifiedDate': 'userModifiedDate',
+    },
+    HistoryWork: {
+        'formNo': 'formNo',
+        'matter': 'matter',
+        'filingDays': 'filingDays',
+        'modifiedBy': 'modifiedBy__userName',
+        'modifiedDate': 'modifiedDate',
+    },
+    HistoryPendingWork: {
+        'companyName': 'companyID__companyName',
+        'groupName': 'companyID__groupID__groupName',
+        'formNo': 'formID__formNo',
+        'eventDate': 'eventDate',
+        'status': 'status',
+        'internalDueDate': 'internalDueDate',
+        'actualDueDate': 'actualDueDate',
+        'remark': 'remark',
+        'srnNo': 'srnNo',
+        'userName': 'userID__userName',
+        'billing': 'billing',
+        'modifiedBy': 'modifiedBy',
+        'modifiedDate': 'modifiedDate',
+    },
+    HistoryAnnualFiling: {
+        'companyName': 'companyID__companyName',
+        'groupName': 'companyID__groupID__groupName',
+        'financialYear': 'financialYear',
+        'statusDPT3': 'statusDPT3',
+        'statusMGT14': 'statusMGT14',
+        'statusAOC4': 'statusAOC4',
+        'statusMGT7': 'statusMGT7',
+        'statusForm11': 'statusForm11',
+        'statusForm8': 'statusForm8',
+        'modifiedBy': 'modifiedBy__userName',
+        'modifiedDate': 'modifiedDate',
+    },
+    HistoryTrademark: {
+        'nameOfTrademark': 'nameOfTrademark',
+        'applicationNo': 'applicationNo',
+        'classNo': 'classNo',
+        'nameOfApplicant': 'nameOfApplicant',
+        'dateOfApp': 'dateOfApp',
+        'status1': 'status1',
+        'status2': 'status2',
+        'hearingDate': 'hearingDate',
+        'remark': 'remark',
+        'groupName': 'groupID__groupName',
+        'oppDate': 'oppDate',
+        'lastDate': 'lastDate',
+        'fees': 'fees',
+        'feesStatus': 'feesStatus',
+        'expiryDate': 'expiryDate',
+        'modifiedBy': 'modifiedBy__userName',
+        'modifiedDate': 'modifiedDate',
+    },
+}
+
+
+def _history_value(row, column):
+    path, date_format = column if isinstance(column, tuple) else (column, None)
+    value = row
+    for name in path.split('__'):
+        try:
+            value = getattr(value, name)
+        except ObjectDoesNotExist:
+            value = None  # rebuilt versions can point at rows deleted since
+        if value is None:
+            return ''
+    # Same formats the update pages used when they rendered history themselves
+    if isinstance(value, datetime.datetime):
+        return format_date(localtime(value), date_format or 'd-m-Y H:i:s')
+    if isinstance(value, datetime.date):
+        return format_date(value, date_format or 'd-m-Y')
+    return str(value)
+
+
+def history_json(request, timeline):
+    """One page (?offset=, ?size=) of a history timeline for an update page's history panel."""
+    columns = HISTORY_COLUMNS[timeline.history_model]
+    paths = [column[0] if isinstance(column, tuple) else column for column in columns.values()]
+    related = sorted({path.rsplit('__', 1)[0] for path in paths if '__' in path})
+    try:
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        offset = 0
+    size = _page_size(request)
+
+    rows, total = timeline.page(offset, size, related=related)
+    data = [{key: _history_value(row, column) for key, column in columns.items()} for row in rows]
+    next_offset = offset + size if offset + size < total else None
+    return JsonResponse({'status': 'success', 'rows': data, 'next': next_offset, 'total': total})
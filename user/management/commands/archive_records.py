@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from user.archive import ARCHIVE_BATCH_SIZE, archive_sweep
+
+
+class Command(BaseCommand):
+    help = "Move archived pending work, annual filings and trademarks to their archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help="Rows moved per transaction.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Seconds between runs; 0 (default) runs once and exits.")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            metrics = archive_sweep(options['batch_size'])
+            if metrics['skipped']:
+                self.stdout.write("Another run holds the lock, skipped.")
+            else:
+                moved = ', '.join(f"{count} {name}" for name, count in metrics['moved'].items())
+                self.stdout.write(f"Moved {moved} in {metrics['seconds']}s")
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Subquery
+from user.models import COMPANY_GROUP_MODELS, UpdatedCompany
+
+
+class Command(BaseCommand):
+    help = "Copy each company's group onto the rows that keep a groupID of their own (run once after migrating)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report rows whose groupID differs from their company's.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Primary key range updated per statement.")
+
+    def handle(self, *args, **options):
+        companyGroup = Subquery(UpdatedCompany.objects.filter(companyID=OuterRef('companyID')).values('groupID')[:1])
+        for model in COMPANY_GROUP_MODELS:
+            stale = model.objects.exclude(groupID=F('companyID__groupID'))
+            if options['check']:
+                self.stdout.write(f"{model.__name__}: {stale.count()} rows out of step")
+                continue
+
+            # Short primary key ranges keep each UPDATE's locks brief on a live table
+            pk = model._meta.pk.name
+            last = model.objects.order_by(f'-{pk}').values_list(pk, flat=True).first() or 0
+            fixed = 0
+            for start in range(0, last + 1, options['batch_size']):
+                batch = stale.filter(**{f'{pk}__gte': start, f'{pk}__lt': start + options['batch_size']})
+                fixed += model.objects.filter(pk__in=list(batch.values_list(pk, flat=True))).update(groupID=companyGroup)
+            self.stdout.write(f"{model.__name__}: {fixed} rows updated")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from user.models import UpdatedClient, UpdatedCompany, UpdatedGroup
+
+
+class Command(BaseCommand):
+    help = ("Fill the normalized key columns behind the per-sub-admin unique constraints. Rows duplicating an "
+            "earlier row's key are left without one and reported for merging. The key columns are nullable and "
+            "rows without a key never collide, so until this has run the add and update views accept duplicates "
+            "of legacy names and phones. Deploy in this order: migrate; run with --check and merge the reported "
+            "duplicates; run it before the new views take traffic; run it again once no old process is left, "
+            "since those save rows without keys or with stale ones. Rerunning only writes keys that changed.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report duplicates; write nothing.")
+
+    def handle(self, *args, **options):
+        for model in (UpdatedGroup, UpdatedCompany, UpdatedClient):
+            (key, (source, normalize)), = model.KEY_FIELDS.items()
+            pk = model._meta.pk.name
+            filled = duplicates = 0
+            for subAdminID in model.objects.values_list('subAdminID', flat=True).distinct():
+                with transaction.atomic():
+                    rows = list(model.objects.select_for_update().filter(subAdminID=subAdminID)
+                                .order_by(pk).values_list(pk, source, key))
+                    # Keys already in place win, then the oldest row
+                    seen = {stored: rowID for rowID, value, stored in rows if stored is not None}
+                    for rowID, value, stored in rows:
+                        wanted = normalize(value)
+                        if stored == wanted:
+                            continue
+                        if seen.get(wanted, rowID) != rowID:
+                            duplicates += 1
+                            self.stdout.write(f"{model.__name__} {rowID} ({value!r}) duplicates "
+                                              f"{model.__name__} {seen[wanted]} for subAdmin {subAdminID}")
+                            continue
+                        seen[wanted] = rowID
+                        if not options['check']:
+                            model.objects.filter(pk=rowID).update(**{key: wanted})
+                        filled += 1
+            verb = 'to fill' if options['check'] else 'filled'
+            self.stdout.write(f"{model.__name__}: {filled} keys {verb}, {duplicates} duplicates")
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from user.models import SRNSequence
+from user.sequences import SRN_ENTITIES, current_max_srn
+
+
+class Command(BaseCommand):
+    help = "Number rows missing an indexSRN and align the SRN counters with the stored values."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report duplicate indexSRN values.")
+
+    def handle(self, *args, **options):
+        for model, entity in SRN_ENTITIES.items():
+            if options['check']:
+                self.report_duplicates(model, entity)
+                continue
+
+            subAdminIDs = model.objects.values_list('subAdminID', flat=True).distinct()
+            for subAdminID in subAdminIDs:
+                with transaction.atomic():
+                    # Lock the counter row (if any) so live adds wait for the backfill
+                    sequence = SRNSequence.objects.select_for_update().filter(
+                        subAdminID=subAdminID, entity=entity
+                    ).first()
+                    last = max(current_max_srn(subAdminID, model), sequence.lastValue if sequence else 0)
+
+                    # Rows created before indexSRN existed get numbers in creation order
+                    missing = model.objects.filter(subAdminID=subAdminID, indexSRN__isnull=True).order_by('pk')
+                    filled = 0
+                    for pk in missing.values_list('pk', flat=True):
+                        last += 1
+                        model.objects.filter(pk=pk).update(indexSRN=last)
+                        filled += 1
+
+                    SRNSequence.objects.update_or_create(
+                        subAdminID_id=subAdminID, entity=entity, defaults={'lastValue': last}
+                    )
+                self.stdout.write(f"{entity} subAdmin {subAdminID}: counter at {last}, {filled} rows numbered")
+
+    def report_duplicates(self, model, entity):
+        duplicates = (model.objects.exclude(indexSRN__isnull=True)
+                      .values('subAdminID', 'indexSRN').annotate(n=Count('pk')).filter(n__gt=1))
+        for row in duplicates:
+            self.stdout.write(f"{entity} subAdmin {row['subAdminID']}: indexSRN {row['indexSRN']} used {row['n']} times")
+        if not duplicates:
+            self.stdout.write(self.style.SUCCESS(f"{entity}: no duplicate indexSRN values"))
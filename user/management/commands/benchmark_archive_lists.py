@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from user.archive import ARCHIVE_BATCH_SIZE, move_to_archive
+from user.listing import LIST_SPECS, PAGE_SIZE, list_projection
+from user.models import PendingWork, SignUP, UpdatedCompany, UpdatedGroup, UpdatedUser, Work
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Time the first page of the active pending work list while archived rows grow to multiples of the "
+            "active ones, once with the archived rows flagged in the live table and once after moving them to "
+            "the archive table. The generated rows are rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('subAdminID', type=int,
+                            help="Tenant to generate rows for; it needs at least one group, company, form and user.")
+        parser.add_argument('--active', type=int, default=2000, help="Active pending work rows to generate.")
+        parser.add_argument('--factors', type=int, nargs='+', default=[1, 10],
+                            help="Archived rows to generate, as multiples of the active rows.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the best one is reported.")
+
+    def _best(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def _generate(self, subAdmin, group, company, form, user, count, isArchived):
+        today = timezone.localdate()
+        PendingWork.objects.bulk_create([
+            PendingWork(subAdminID=subAdmin, companyID=company, groupID=group, formID=form, userID=user,
+                        eventDate=today, internalDueDate=today, actualDueDate=today + timedelta(days=i % 30),
+                        status='Pending', billing='Pending', modifiedBy=user.userName, isArchived=isArchived)
+            for i in range(count)
+        ], batch_size=1000)
+
+    def _analyze(self):
+        if connection.vendor == 'sqlite':
+            # SQLite plans without statistics until ANALYZE; MySQL's ANALYZE TABLE would commit
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def handle(self, *args, **options):
+        subAdmin = SignUP.objects.filter(pk=options['subAdminID']).first()
+        group = UpdatedGroup.objects.filter(subAdminID=subAdmin).first()
+        company = UpdatedCompany.objects.filter(subAdminID=subAdmin, groupID=group).first()
+        form = Work.objects.filter(subAdminID=subAdmin).first()
+        user = UpdatedUser.objects.filter(subAdminID=subAdmin).first()
+        if not (subAdmin and group and company and form and user):
+            raise CommandError("The tenant needs at least one group, company, form and user.")
+
+        qs = list_projection(PendingWork.objects.filter(subAdminID=subAdmin, isArchived=False))
+        page = qs.order_by(*LIST_SPECS['listPendingWork']['ordering'], '-pk')[:PAGE_SIZE + 1]
+        repeat = options['repeat']
+        try:
+            with transaction.atomic():
+                self._generate(subAdmin, group, company, form, user, options['active'], False)
+                self._analyze()
+                self.stdout.write(f"{options['active']} active rows, best of {repeat}")
+                self.stdout.write(f"  no archived rows: {self._best(repeat, lambda: list(page.all())):.1f} ms")
+                for factor in sorted(options['factors']):
+                    try:
+                        # Each factor starts from the active rows alone
+                        with transaction.atomic():
+                            archived = options['active'] * factor
+                            self._generate(subAdmin, group, company, form, user, archived, True)
+                            self._analyze()
+                            live_ms = self._best(repeat, lambda: list(page.all()))
+
+                            flagged = PendingWork.objects.filter(subAdminID=subAdmin, isArchived=True)
+                            while True:
+                                ids = list(flagged.values_list('pk', flat=True)[:ARCHIVE_BATCH_SIZE])
+                                if not ids:
+                                    break
+                                move_to_archive(PendingWork, ids)
+                            self._analyze()
+                            archive_ms = self._best(repeat, lambda: list(page.all()))
+
+                            self.stdout.write(f"  {archived} archived rows ({factor}x): {live_ms:.1f} ms in the live "
+                                              f"table, {archive_ms:.1f} ms moved to the archive")
+                            raise Rollback
+                    except Rollback:
+                        pass
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,99 @@
+import time
+import tracemalloc
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from user.listing import LIST_SPECS, PAGE_SIZE, list_projection, paginate
+from user.models import PendingWork, SignUP, UpdatedCompany, UpdatedUser, Work
+
+
+class Rollback(Exception):
+    pass
+
+
+def python_flags(rows, today):
+    """The per-row loop listPendingWork ran before the flags were annotated."""
+    rows = list(rows)
+    for work in rows:
+        if work.internalDueDate:
+            work.is_internal_expired = work.internalDueDate < today
+            work.is_internal_due_soon = today <= work.internalDueDate < (today + timedelta(days=4))
+        if work.actualDueDate:
+            work.is_actual_expired = work.actualDueDate < today
+            work.is_actual_due_soon = today <= work.actualDueDate < (today + timedelta(days=4))
+        work.is_approved = (work.status == "Approved")
+        work.is_marked_for_resubmission = (work.status == "Sent For Resubmission")
+        work.is_pending_for_approval = (work.status == "Pending For Approval")
+        work.is_rejected = (work.status == "Rejected")
+    return rows
+
+
+class Command(BaseCommand):
+    help = ("Time the old pending work list, which loaded every row to set its flags in Python, against "
+            "PendingWork.objects.with_flags() read one page at a time or streamed with iterator(), and report "
+            "each one's peak Python allocations. The generated rows are rolled back afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('subAdminID', type=int,
+                            help="Tenant to generate rows for; it needs at least one company, form and user.")
+        parser.add_argument('--rows', type=int, default=10000, help="Pending work rows to generate.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per approach; the best one is reported.")
+
+    def _best(self, repeat, func):
+        """Best time of `repeat` runs in ms, and the peak traced memory of one more run in MB."""
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        # Timed apart from the runs above, which tracing would slow down
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return best * 1000, peak / 2**20
+
+    def _stream(self, qs):
+        for work in qs.iterator(chunk_size=2000):
+            pass
+
+    def handle(self, *args, **options):
+        subAdmin = SignUP.objects.filter(pk=options['subAdminID']).first()
+        company = UpdatedCompany.objects.filter(subAdminID=subAdmin).first()
+        form = Work.objects.filter(subAdminID=subAdmin).first()
+        user = UpdatedUser.objects.filter(subAdminID=subAdmin).first()
+        if not (subAdmin and company and form and user):
+            raise CommandError("The tenant needs at least one company, form and user.")
+
+        today = timezone.localdate()
+        statuses = ['Approved', 'Sent For Resubmission', 'Pending For Approval', 'Rejected', 'Pending']
+        try:
+            with transaction.atomic():
+                PendingWork.objects.bulk_create([
+                    PendingWork(
+                        subAdminID=subAdmin, formID=form, companyID=company, userID=user,
+                        eventDate=today, internalDueDate=today + timedelta(days=i % 15 - 7),
+                        actualDueDate=today + timedelta(days=i % 20 - 10),
+                        status=statuses[i % len(statuses)], billing='Pending', modifiedBy=user.userName,
+                    )
+                    for i in range(options['rows'])
+                ], batch_size=1000)
+
+                qs = list_projection(PendingWork.objects.filter(subAdminID=subAdmin, isArchived=False))
+                count = qs.count()
+                ordering = LIST_SPECS['listPendingWork']['ordering']
+                runs = [
+                    ("python loop, all rows", lambda: python_flags(qs.all(), today)),
+                    ("with_flags(), all rows", lambda: list(qs.with_flags())),
+                    ("with_flags(), first page", lambda: paginate(qs.with_flags(), ordering, size=PAGE_SIZE)),
+                    ("with_flags(), streamed", lambda: self._stream(qs.with_flags())),
+                ]
+                self.stdout.write(f"{count} rows, best of {options['repeat']}:")
+                for label, func in runs:
+                    ms, mb = self._best(options['repeat'], func)
+                    self.stdout.write(f"  {label:<26} {ms:8.1f} ms   peak {mb:6.1f} MB")
+                raise Rollback
+        except Rollback:
+            pass
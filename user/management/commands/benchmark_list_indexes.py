@@ -0,0 +1,117 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from user.archive import ARCHIVE_MODELS, copy_row
+from user.listing import LIST_SPECS, PAGE_SIZE, list_projection
+from user.models import (
+    AnnualFiling, PendingWork, SignUP, Trademark, UpdatedClient, UpdatedCompany, UpdatedDSC, UpdatedGroup,
+    UpdatedUser, Work,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+# AnnualFiling's SRN dates default to '', which a DateField cannot store
+NO_SRN_DATES = {f'srnDate{form}': None for form in ('DPT3', 'MGT14', 'AOC4', 'MGT7', 'Form11', 'Form8')}
+
+
+# (list, model, extra filter) for the first page of every list view
+LIST_QUERIES = [
+    ('listDSC', UpdatedDSC, {}),
+    ('listCompany', UpdatedCompany, {}),
+    ('listClient', UpdatedClient, {}),
+    ('listPendingWork', PendingWork, {'isArchived': False}),
+    ('listPendingWork', ARCHIVE_MODELS[PendingWork], {}),
+    ('listAnnual', AnnualFiling, {'isArchived': False}),
+    ('listAnnual', ARCHIVE_MODELS[AnnualFiling], {}),
+    ('listTrademark', Trademark, {'isArchived': False}),
+    ('listTrademark', ARCHIVE_MODELS[Trademark], {}),
+]
+
+
+class Command(BaseCommand):
+    help = ("Generate rows for a tenant and print the EXPLAIN plan and timing of the first page of each list, "
+            "for the sub-admin's ungrouped list and for a group member's. The generated rows are rolled back "
+            "afterwards. Run it before and after migrating the list indexes to compare the plans.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('subAdminID', type=int,
+                            help="Tenant to generate rows for; it needs at least one group, company, form and user.")
+        parser.add_argument('--rows', type=int, default=100000, help="Rows to generate per table.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the best one is reported.")
+
+    def _best(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000
+
+    def _generate(self, subAdmin, group, company, form, user, rows):
+        now = timezone.now()
+        today = timezone.localdate()
+        common = {'subAdminID': subAdmin, 'companyID': company, 'groupID': group}
+        batches = {
+            UpdatedCompany: lambda i: UpdatedCompany(subAdminID=subAdmin, companyName=f'Benchmark {i}', companyType='Pvt',
+                                                     groupID=group, userID=user),
+            UpdatedClient: lambda i: UpdatedClient(clientName=f'Client {i}', clientPhone=f'{i:010d}', userID=user, **common),
+            UpdatedDSC: lambda i: UpdatedDSC(clientName=f'Client {i}', status='IN', location='Office', clientPhone='0',
+                                             userID=user, renewalDate=None, **common),
+            PendingWork: lambda i: PendingWork(
+                formID=form, eventDate=today, internalDueDate=today, actualDueDate=today + timedelta(days=i % 30),
+                userID=user, status='Pending', billing='Pending', modifiedBy=user.userName, isArchived=i % 2 == 0,
+                **common,
+            ),
+            AnnualFiling: lambda i: AnnualFiling(financialYear='2024-25', modifiedBy=user, isArchived=i % 2 == 0,
+                                                 **NO_SRN_DATES, **common),
+            Trademark: lambda i: Trademark(subAdminID=subAdmin, nameOfTrademark=f'Mark {i}', nameOfApplicant='Applicant',
+                                           groupID=group, modifiedBy=user, status1='Objected', isArchived=i % 2 == 0),
+        }
+        for model, make in batches.items():
+            model.objects.bulk_create([make(i) for i in range(rows)], batch_size=1000)
+            archive_model = ARCHIVE_MODELS.get(model)
+            if archive_model:
+                # Archived rows keep a primary key beyond any live one
+                start = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+                archived = []
+                for i in range(rows):
+                    row = copy_row(make(i), archive_model)
+                    row.pk = start + i
+                    row.modifiedDate = now - timedelta(minutes=i)  # set by the archiver, not auto_now
+                    archived.append(row)
+                archive_model.objects.bulk_create(archived, batch_size=1000)
+
+    def handle(self, *args, **options):
+        subAdmin = SignUP.objects.filter(pk=options['subAdminID']).first()
+        group = UpdatedGroup.objects.filter(subAdminID=subAdmin).first()
+        company = UpdatedCompany.objects.filter(subAdminID=subAdmin, groupID=group).first()
+        form = Work.objects.filter(subAdminID=subAdmin).first()
+        user = UpdatedUser.objects.filter(subAdminID=subAdmin).first()
+        if not (subAdmin and group and company and form and user):
+            raise CommandError("The tenant needs at least one group, company, form and user.")
+
+        try:
+            with transaction.atomic():
+                self._generate(subAdmin, group, company, form, user, options['rows'])
+                if connection.vendor == 'sqlite':
+                    # SQLite plans without statistics until ANALYZE; MySQL's ANALYZE TABLE would commit
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE')
+                self.stdout.write(f"{options['rows']} generated rows per table, best of {options['repeat']}:")
+                for name, model, extra in LIST_QUERIES:
+                    for scope, groupFilter in (('sub-admin', {}), ('group', {'groupID': group})):
+                        qs = list_projection(model.objects.filter(subAdminID=subAdmin, **extra, **groupFilter))
+                        page = qs.order_by(*LIST_SPECS[name]['ordering'], '-pk')[:PAGE_SIZE + 1]
+                        ms = self._best(options['repeat'], lambda: list(page.all()))
+                        self.stdout.write(f"\n{model.__name__} ({scope}): {ms:.1f} ms")
+                        self.stdout.write(page.explain())
+                raise Rollback
+        except Rollback:
+            pass
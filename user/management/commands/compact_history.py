@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from user.compaction import compact_history
+
+
+class Command(BaseCommand):
+    help = "Compact old edit history to field-level diffs and delete history past each tenant's retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compact-after-days', type=int, default=None,
+                            help="Compact History* rows older than this (default: settings.HISTORY_COMPACT_AFTER_DAYS).")
+
+    def handle(self, *args, **options):
+        metrics = compact_history(options['compact_after_days'])
+        if metrics['skipped']:
+            self.stdout.write("Another run holds the lock, skipped.")
+            return
+        self.stdout.write(
+            f"{metrics['compacted']} rows compacted, {metrics['pruned']} pruned, {metrics['orphans']} orphans removed, "
+            f"~{metrics['bytes'] / 1024:.1f} KB reclaimed in {metrics['seconds']}s"
+        )
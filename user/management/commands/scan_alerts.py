@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from user.alerts import scan_alerts
+
+
+class Command(BaseCommand):
+    help = "Refresh the due date and renewal alerts of every user, optionally mailing the digests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--digest', action='store_true',
+                            help="Also queue each sub-admin a digest of the alerts not mailed yet.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Seconds between runs; 0 (default) runs once and exits.")
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            metrics = scan_alerts(options['digest'])
+            if metrics['skipped']:
+                self.stdout.write("Another run holds the lock, skipped.")
+            else:
+                self.stdout.write(
+                    f"{metrics['created']} alerts created, {metrics['updated']} updated, {metrics['removed']} removed, "
+                    f"{metrics['emails']} digests queued in {metrics['seconds']}s"
+                )
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -2,7 +2,7 @@ from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth import logout
-from .models import SignUP, UpdatedUser, SuperAdmin
+from .principal import resolve_principal
 
 class LoginRequiredMiddleware:
     def __init__(self, get_response):
@@ -33,77 +33,71 @@ class LoginRequiredMiddleware:
         if request.path.startswith('/adminadmin/') or request.path in exempt_paths:
             return self.get_response(request)
 
-        # Retrieve the session data
-        user = request.session.get('userID')
-        subAdmin = request.session.get('subAdminID')
-        superAdmin = request.session.get('superAdminID')
+        # Resolve the logged-in account once; views read it from request.principal
+        principal = resolve_principal(request)
 
         # Redirect to the appropriate sign-in page if no user is logged in
-        if not user and not subAdmin and not superAdmin:
+        if principal.role is None:
             return redirect('adminSignIn')  # Redirect to adminSignIn ('/')
 
         # Check if the logged-in user (subAdmin/user/superAdmin) is active and has a subscription
-        if subAdmin:
-            try:
-                logged_in_user = SignUP.objects.get(subAdminID=subAdmin)
-
-                if not logged_in_user.isActive:
-                    # If the account is deactivated
-                    logout(request)
-                    messages.error(request, "Your account has been deactivated. Please contact the admin.")
-                    return redirect('adminSignIn')
-
-                if logged_in_user.freeUser:
-                    # Allow access to free users
-                    return self.get_response(request)
-
-                if not logged_in_user.hasChosenPlan:
-                    # Allow access only to `selectPlan` and `paymentSuccess` pages
-                    if request.path not in accessible_without_subscription:
-                        messages.error(request, "Your subscription plan is expired. Please select a subscription plan to continue.")
-                        return redirect('selectPlan')
-
-            except SignUP.DoesNotExist:
+        if principal.role == 'subAdmin':
+            logged_in_user = principal.subAdmin
+            if logged_in_user is None:
                 # If the subAdmin record is not found, log them out
                 logout(request)
                 messages.error(request, "Account does not exist.")
                 return redirect('adminSignIn')
 
-        elif user:
-            try:
-                logged_in_user = UpdatedUser.objects.get(userID=user)
-                if not logged_in_user.isActive:
-                    # If the account is deactivated
-                    logout(request)
-                    messages.error(request, "Your account has been deactivated. Please contact the admin.")
-                    return redirect('userSignIn')
-                
-                if not logged_in_user.subAdminID.hasChosenPlan:
-                    if request.path not in accessible_without_subscription:
-                        messages.error(request, "Your subscription plan is expired. Please contact the admin.")
-                        return redirect('userSignIn')
+            if not logged_in_user.isActive:
+                # If the account is deactivated
+                logout(request)
+                messages.error(request, "Your account has been deactivated. Please contact the admin.")
+                return redirect('adminSignIn')
 
-            except UpdatedUser.DoesNotExist:
+            if logged_in_user.freeUser:
+                # Allow access to free users
+                return self.get_response(request)
+
+            if not logged_in_user.hasChosenPlan:
+                # Allow access only to `selectPlan` and `paymentSuccess` pages
+                if request.path not in accessible_without_subscription:
+                    messages.error(request, "Your subscription plan is expired. Please select a subscription plan to continue.")
+                    return redirect('selectPlan')
+
+        elif principal.role == 'user':
+            logged_in_user = principal.user
+            if logged_in_user is None:
                 # If the user record is not found, log them out
                 logout(request)
                 messages.error(request, "User does not exist.")
                 return redirect('userSignIn')
 
-        elif superAdmin:
-            try:
-                logged_in_user = SuperAdmin.objects.get(superAdminID=superAdmin)
-                if not logged_in_user.isActive:
-                    # If the account is deactivated
-                    logout(request)
-                    messages.error(request, "Your account has been deactivated. Please contact the admin.")
-                    return redirect('adminSignIn')
+            if not logged_in_user.isActive:
+                # If the account is deactivated
+                logout(request)
+                messages.error(request, "Your account has been deactivated. Please contact the admin.")
+                return redirect('userSignIn')
+
+            if not logged_in_user.subAdminID.hasChosenPlan:
+                if request.path not in accessible_without_subscription:
+                    messages.error(request, "Your subscription plan is expired. Please contact the admin.")
+                    return redirect('userSignIn')
 
-            except SuperAdmin.DoesNotExist:
+        elif principal.role == 'superAdmin':
+            logged_in_user = principal.superAdmin
+            if logged_in_user is None:
                 # If the superAdmin record is not found, log them out
                 logout(request)
                 messages.error(request, "Super admin does not exist.")
                 return redirect('adminSignIn')
 
+            if not logged_in_user.isActive:
+                # If the account is deactivated
+                logout(request)
+                messages.error(request, "Your account has been deactivated. Please contact the admin.")
+                return redirect('adminSignIn')
+
         # If the subAdmin has a subscription, continue processing the request
         response = self.get_response(request)
         return response
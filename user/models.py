@@ -1,6 +1,115 @@
+import re
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import BooleanField, Case, Q, Value, When
 from django.utils import timezone
 
+
+# The row highlights of the list pages, computed by the database so a page can
+# be sliced or streamed without touching every row in Python first.
+def _flag(condition):
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+# Days before a due date from which a pending work row is shown as due soon
+DUE_SOON_DAYS = 4
+
+ANNUAL_FORMS = ['DPT3', 'MGT14', 'AOC4', 'MGT7', 'Form11', 'Form8']
+
+TRADEMARK_STATUSES = {
+    'is_objected': 'Objected',
+    'is_accepted': 'Accepted',
+    'is_registered': 'Registered',
+    'is_abandoned': 'Abandoned',
+    'is_opposed': 'Opposed',
+}
+
+
+def name_key(name):
+    """Form of a name uniqueness is judged on: 'ACME  Pvt Ltd ' -> 'acme pvt ltd'."""
+    return ' '.join((name or '').split()).casefold()
+
+
+def phone_key(phone):
+    """Digits of a phone number only: '+91 98765-43210' -> '919876543210'."""
+    return re.sub(r'\D', '', phone or '')
+
+
+class NormalizedKeyMixin:
+    """Fills the KEY_FIELDS columns from their source before every save, so the
+    composite unique constraints on them catch duplicates in the INSERT itself."""
+
+    KEY_FIELDS = {}  # key column -> (source field, normalizer)
+
+    def normalize_keys(self):
+        for key, (source, normalize) in self.KEY_FIELDS.items():
+            setattr(self, key, normalize(getattr(self, source)))
+
+    def save(self, *args, **kwargs):
+        self.normalize_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.KEY_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class CompanyGroupMixin:
+    """For rows that belong to a company: keeps groupID a copy of the company's
+    group, so group-scoped reads filter on it without joining UpdatedCompany."""
+
+    def sync_company_group(self):
+        self.groupID_id = self.companyID.groupID_id
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'companyID' in update_fields:
+            self.sync_company_group()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'groupID'}
+        super().save(*args, **kwargs)
+
+
+class DSCQuerySet(models.QuerySet):
+    def with_flags(self, today=None):
+        """is_expired: the renewal date is before today."""
+        today = today or timezone.localdate()
+        midnight = timezone.make_aware(datetime.combine(today, time.min))
+        return self.annotate(is_expired=_flag(Q(renewalDate__lt=midnight)))
+
+
+class PendingWorkQuerySet(models.QuerySet):
+    def with_flags(self, today=None):
+        """Due-date flags for both due dates plus one flag per highlighted status."""
+        today = today or timezone.localdate()
+        soon = today + timedelta(days=DUE_SOON_DAYS)
+        return self.annotate(
+            is_internal_expired=_flag(Q(internalDueDate__lt=today)),
+            is_internal_due_soon=_flag(Q(internalDueDate__gte=today, internalDueDate__lt=soon)),
+            is_actual_expired=_flag(Q(actualDueDate__lt=today)),
+            is_actual_due_soon=_flag(Q(actualDueDate__gte=today, actualDueDate__lt=soon)),
+            is_approved=_flag(Q(status='Approved')),
+            is_marked_for_resubmission=_flag(Q(status='Sent For Resubmission')),
+            is_pending_for_approval=_flag(Q(status='Pending For Approval')),
+            is_rejected=_flag(Q(status='Rejected')),
+        )
+
+
+class AnnualFilingQuerySet(models.QuerySet):
+    def with_flags(self):
+        """is_approved_<form> and is_pending_<form> for each of the six forms."""
+        flags = {}
+        for form in ANNUAL_FORMS:
+            flags[f'is_approved_{form}'] = _flag(Q(**{f'status{form}': 'Approved'}))
+            flags[f'is_pending_{form}'] = _flag(Q(**{f'status{form}': 'Pending'}))
+        return self.annotate(**flags)
+
+
+class TrademarkQuerySet(models.QuerySet):
+    def with_flags(self):
+        """One flag per highlighted status1 value."""
+        return self.annotate(**{name: _flag(Q(status1=status)) for name, status in TRADEMARK_STATUSES.items()})
+
+
 # SubAdmin model for handling sub-admins
 class SignUP(models.Model):
     subAdminID = models.AutoField(primary_key=True)
@@ -23,6 +132,9 @@ class SignUP(models.Model):
     isFirstLogin = models.BooleanField(default=True)  # Tracks if this is the user's first login
     hasUsedFreePlan = models.BooleanField(default=False)  # Tracks if the user has used the free plan
 
+    # Days of edit history kept; None uses settings.HISTORY_RETENTION_DAYS (see user/compaction.py)
+    historyRetentionDays = models.PositiveIntegerField(null=True, blank=True)
+
     def __str__(self):
         return f'{self.subAdminName} ({self.subAdminID})'
 
@@ -106,6 +218,12 @@ class UpdatedUser(models.Model):
     canReadOnly = models.BooleanField(default=False)
     canReadWrite = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', 'userUsername'], name='user_sa_username_idx'),
+            models.Index(fields=['userPhone'], name='user_phone_idx'),
+        ]
+
     def __str__(self):
         return f'{self.userID}'
 
@@ -128,16 +246,29 @@ class HistoryUser(models.Model):
     canReadOnly = models.BooleanField(default=False)
     canReadWrite = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['userID', '-userModifiedDate'], name='huser_user_mod_idx'),
+        ]
+
     def __str__(self):
         return f'{self.userID}'
 
-class UpdatedGroup(models.Model):
+class UpdatedGroup(NormalizedKeyMixin, models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     groupID = models.AutoField(primary_key=True)
     groupName = models.CharField(max_length=255)
+    groupKey = models.CharField(max_length=255, null=True, editable=False)  # name_key(groupName)
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
     groupModifiedDate = models.DateTimeField(auto_now=True)
 
+    KEY_FIELDS = {'groupKey': ('groupName', name_key)}
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subAdminID', 'groupKey'], name='group_sa_key_uniq'),
+        ]
+
     def __str__(self):
         return f'{self.groupID}'
 
@@ -148,21 +279,44 @@ class HistoryGroup(models.Model):
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
     groupModifiedDate = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['groupID', '-groupModifiedDate'], name='hgroup_group_mod_idx'),
+        ]
+
     def __str__(self):
         return f'{self.groupID}'
 
-class UpdatedCompany(models.Model):
+class UpdatedCompany(NormalizedKeyMixin, models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     companyID = models.AutoField(primary_key=True)
     companyName = models.CharField(max_length=255)
+    companyKey = models.CharField(max_length=255, null=True, editable=False)  # name_key(companyName)
     companyType = models.CharField(max_length=255, default='')
     groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE)
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
     companyModifiedDate = models.DateTimeField(auto_now=True)
 
+    KEY_FIELDS = {'companyKey': ('companyName', name_key)}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', '-companyModifiedDate'], name='company_sa_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID', '-companyModifiedDate'], name='company_sa_grp_mod_idx'),
+            models.Index(fields=['subAdminID', 'companyName'], name='company_sa_name_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['subAdminID', 'companyKey'], name='company_sa_key_uniq'),
+        ]
+
     def __str__(self):
         return f'{self.companyID}'
 
+    def sync_row_groups(self):
+        """Copy the company's current group onto every row that keeps one (COMPANY_GROUP_MODELS)."""
+        for model in COMPANY_GROUP_MODELS:
+            model.objects.filter(companyID=self).exclude(groupID=self.groupID_id).update(groupID=self.groupID_id)
+
 class HistoryCompany(models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
@@ -172,18 +326,36 @@ class HistoryCompany(models.Model):
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
     companyModifiedDate = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['companyID', '-companyModifiedDate'], name='hcompany_company_mod_idx'),
+        ]
+
     def __str__(self):
         return f'{self.companyID}'
 
-class UpdatedClient(models.Model):
+class UpdatedClient(NormalizedKeyMixin, CompanyGroupMixin, models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     clientID = models.AutoField(primary_key=True)
     clientName = models.CharField(max_length=255)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
     clientPhone = models.CharField(max_length=15)
+    clientPhoneKey = models.CharField(max_length=15, null=True, editable=False)  # phone_key(clientPhone)
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
     clientModifiedDate = models.DateTimeField(auto_now=True)
 
+    KEY_FIELDS = {'clientPhoneKey': ('clientPhone', phone_key)}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', '-clientModifiedDate'], name='client_sa_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID', '-clientModifiedDate'], name='client_sa_grp_mod_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['subAdminID', 'clientPhoneKey'], name='client_sa_phone_uniq'),
+        ]
+
     def __str__(self):
         return f'{self.clientID}'
 
@@ -192,18 +364,26 @@ class HistoryClient(models.Model):
     clientID = models.ForeignKey('UpdatedClient', on_delete=models.CASCADE)
     clientName = models.CharField(max_length=255)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
     clientPhone = models.CharField(max_length=15)
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
     clientModifiedDate = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['clientID', '-clientModifiedDate'], name='hclient_client_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID'], name='hclient_sa_grp_idx'),
+        ]
+
     def __str__(self):
         return f'{self.clientID}'
 
-class UpdatedDSC(models.Model):
+class UpdatedDSC(CompanyGroupMixin, models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     dscID = models.AutoField(primary_key=True)
     clientName = models.CharField(max_length=255)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
     receivedBy = models.CharField(max_length=255, default='')
     receivedFrom = models.CharField(max_length=255, default='')
     deliveredTo = models.CharField(max_length=255, default='')
@@ -215,6 +395,16 @@ class UpdatedDSC(models.Model):
     modifiedDate = models.DateTimeField(auto_now=True)
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
 
+    objects = DSCQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', '-modifiedDate'], name='dsc_sa_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID', '-modifiedDate'], name='dsc_sa_grp_mod_idx'),
+            # Range scans of the alert engine (user/alerts.py)
+            models.Index(fields=['renewalDate'], name='dsc_renewal_idx'),
+        ]
+
     def __str__(self):
         return f'{self.dscID}'
 
@@ -224,6 +414,7 @@ class HistoryDSC(models.Model):
     dscID = models.ForeignKey('UpdatedDSC', on_delete=models.CASCADE)
     clientName = models.CharField(max_length=255)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
     receivedBy = models.CharField(max_length=255, default='')
     receivedFrom = models.CharField(max_length=255, default='')
     deliveredTo = models.CharField(max_length=255, default='')
@@ -235,6 +426,12 @@ class HistoryDSC(models.Model):
     modifiedDate = models.DateTimeField()
     userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['dscID', '-modifiedDate'], name='hdsc_dsc_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID'], name='hdsc_sa_grp_idx'),
+        ]
+
     def __str__(self):
         return f'{self.dscID}'
 
@@ -268,15 +465,21 @@ class Work(models.Model):
     modifiedBy = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE, null=True, blank=True, default=1)
     modifiedDate = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', 'formNo'], name='work_sa_formno_idx'),
+        ]
+
     def __str__(self):
         return f"{self.formNo} ({self.formID})"
 
 
-class PendingWork(models.Model):
+class PendingWork(CompanyGroupMixin, models.Model):
     pendingWorkID = models.AutoField(primary_key=True)
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     formID = models.ForeignKey('Work', on_delete=models.CASCADE)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
     eventDate = models.DateField()
     cutOffTime = models.CharField(max_length=50, default='')
     actualDueDate = models.DateField()
@@ -296,14 +499,25 @@ class PendingWork(models.Model):
     # New field for auto-incremented SRN index per subAdmin
     indexSRN = models.IntegerField(null=True, blank=True)
 
+    objects = PendingWorkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', 'isArchived', '-isPinned', '-modifiedDate'], name='pw_sa_arch_pin_mod_idx'),
+            models.Index(fields=['subAdminID', 'isArchived', 'groupID', '-isPinned', '-modifiedDate'], name='pw_sa_arch_grp_pin_idx'),
+            models.Index(fields=['actualDueDate'], name='pw_actual_due_idx'),
+            models.Index(fields=['internalDueDate'], name='pw_internal_due_idx'),
+        ]
+
     def __str__(self):
         return f"PendingWork {self.pendingWorkID}"
 
 
-class AnnualFiling(models.Model):
+class AnnualFiling(CompanyGroupMixin, models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     annualFilingID = models.AutoField(primary_key=True)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
     financialYear = models.CharField(max_length=50, blank=True, null=True)
     
     statusDPT3 = models.CharField(max_length=50, blank=True, null=True)
@@ -343,6 +557,14 @@ class AnnualFiling(models.Model):
     # New field for auto-incremented SRN index per subAdmin
     indexSRN = models.IntegerField(null=True, blank=True)
 
+    objects = AnnualFilingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', 'isArchived', '-isPinned', '-modifiedDate'], name='af_sa_arch_pin_mod_idx'),
+            models.Index(fields=['subAdminID', 'isArchived', 'groupID', '-isPinned', '-modifiedDate'], name='af_sa_arch_grp_pin_idx'),
+        ]
+
     def __str__(self):
         return f"AnnualFiling {self.annualFilingID}"
 
@@ -357,13 +579,19 @@ class HistoryWork(models.Model):
     modifiedBy = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE, null=True, blank=True, default=1)
     modifiedDate = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['formID', '-modifiedDate'], name='hwork_form_mod_idx'),
+        ]
+
     def __str__(self):
         return f"{self.formNo} ({self.formID})"
 
 
 class HistoryPendingWork(models.Model):
     historyPendingWorkID = models.AutoField(primary_key=True)
-    pendingWorkID = models.ForeignKey('PendingWork', on_delete=models.CASCADE)
+    # No DB constraint: the row may have moved to its Archived* table (user/archive.py)
+    pendingWorkID = models.ForeignKey('PendingWork', on_delete=models.CASCADE, db_constraint=False)
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     formID = models.ForeignKey('Work', on_delete=models.CASCADE)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
@@ -386,6 +614,11 @@ class HistoryPendingWork(models.Model):
     # New field for auto-incremented SRN index per subAdmin
     indexSRN = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['pendingWorkID', '-modifiedDate'], name='hpw_pw_mod_idx'),
+        ]
+
     def __str__(self):
         return f"PendingWork {self.pendingWorkID}"
 
@@ -393,7 +626,8 @@ class HistoryPendingWork(models.Model):
 class HistoryAnnualFiling(models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
     historyAnnualFilingID = models.AutoField(primary_key=True)
-    annualFilingID = models.ForeignKey('AnnualFiling', on_delete=models.CASCADE)
+    # No DB constraint: the row may have moved to its Archived* table (user/archive.py)
+    annualFilingID = models.ForeignKey('AnnualFiling', on_delete=models.CASCADE, db_constraint=False)
     companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
     financialYear = models.CharField(max_length=50, blank=True, null=True)
     
@@ -434,6 +668,11 @@ class HistoryAnnualFiling(models.Model):
     # New field for auto-incremented SRN index per subAdmin
     indexSRN = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['annualFilingID', '-modifiedDate'], name='haf_af_mod_idx'),
+        ]
+
     def __str__(self):
         return f"AnnualFiling {self.annualFilingID}"
 
@@ -461,12 +700,24 @@ class Trademark(models.Model):
     indexSRN = models.IntegerField(null=True, blank=True)
     modifiedBy = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
 
+    objects = TrademarkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', 'isArchived', '-modifiedDate'], name='tm_sa_arch_mod_idx'),
+            models.Index(fields=['subAdminID', 'isArchived', 'groupID', '-modifiedDate'], name='tm_sa_arch_grp_mod_idx'),
+            models.Index(fields=['hearingDate'], name='tm_hearing_idx'),
+            models.Index(fields=['lastDate'], name='tm_last_date_idx'),
+            models.Index(fields=['expiryDate'], name='tm_expiry_idx'),
+        ]
+
     def __str__(self):
         return f'{self.trademarkID}'
 
 class HistoryTrademark(models.Model):
     subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
-    trademarkID = models.ForeignKey('Trademark', on_delete=models.CASCADE)
+    # No DB constraint: the row may have moved to its Archived* table (user/archive.py)
+    trademarkID = models.ForeignKey('Trademark', on_delete=models.CASCADE, db_constraint=False)
     nameOfTrademark = models.CharField(max_length=255)
     applicationNo = models.CharField(max_length=100, default='')
     classNo = models.CharField(max_length=100, default='')
@@ -487,5 +738,215 @@ class HistoryTrademark(models.Model):
     indexSRN = models.IntegerField(null=True, blank=True)
     modifiedBy = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['trademarkID', '-modifiedDate'], name='htm_tm_mod_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.trademarkID}'
+
+# Cold storage for archived rows (see user/archive.py). Each table mirrors its
+# live model and keeps the live primary key, so history and links stay valid.
+class ArchivedPendingWork(models.Model):
+    pendingWorkID = models.IntegerField(primary_key=True)
+    subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
+    formID = models.ForeignKey('Work', on_delete=models.CASCADE)
+    companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
+    eventDate = models.DateField()
+    cutOffTime = models.CharField(max_length=50, default='')
+    actualDueDate = models.DateField()
+    internalDueDate = models.DateField(default='')
+    userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
+    status = models.CharField(max_length=50)
+    srnNo = models.CharField(max_length=50, default='', blank=True, null=True)
+    srnDate = models.DateField(blank=True, null=True)
+    amt = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    fees = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    remark = models.CharField(max_length=100, default='')
+    billing = models.CharField(max_length=100)
+    isArchived = models.BooleanField(default=True)
+    isPinned = models.BooleanField(default=False)
+    modifiedDate = models.DateTimeField()
+    modifiedBy = models.CharField(max_length=100)
+    indexSRN = models.IntegerField(null=True, blank=True)
+    archivedDate = models.DateTimeField(auto_now_add=True)
+
+    objects = PendingWorkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', '-isPinned', '-modifiedDate'], name='apw_sa_pin_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID', '-isPinned', '-modifiedDate'], name='apw_sa_grp_pin_idx'),
+        ]
+
+    def __str__(self):
+        return f"PendingWork {self.pendingWorkID} (archived)"
+
+
+class ArchivedAnnualFiling(models.Model):
+    subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
+    annualFilingID = models.IntegerField(primary_key=True)
+    companyID = models.ForeignKey('UpdatedCompany', on_delete=models.CASCADE)
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE, null=True, blank=True)  # copy of companyID.groupID
+    financialYear = models.CharField(max_length=50, blank=True, null=True)
+
+    statusDPT3 = models.CharField(max_length=50, blank=True, null=True)
+    srnNoDPT3 = models.CharField(max_length=100, blank=True, null=True)
+    srnDateDPT3 = models.DateField(blank=True, null=True, default='')
+    amtDPT3 = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+
+    statusMGT14 = models.CharField(max_length=50, blank=True, null=True)
+    srnNoMGT14 = models.CharField(max_length=100, blank=True, null=True)
+    srnDateMGT14 = models.DateField(blank=True, null=True, default='')
+    amtMGT14 = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+
+    statusAOC4 = models.CharField(max_length=50, blank=True, null=True)
+    srnNoAOC4 = models.CharField(max_length=100, blank=True, null=True)
+    srnDateAOC4 = models.DateField(blank=True, null=True, default='')
+    amtAOC4 = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+
+    statusMGT7 = models.CharField(max_length=50, blank=True, null=True)
+    srnNoMGT7 = models.CharField(max_length=100, blank=True, null=True)
+    srnDateMGT7 = models.DateField(blank=True, null=True, default='')
+    amtMGT7 = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+
+    statusForm11 = models.CharField(max_length=50, blank=True, null=True)
+    srnNoForm11 = models.CharField(max_length=100, blank=True, null=True)
+    srnDateForm11 = models.DateField(blank=True, null=True, default='')
+    amtForm11 = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+
+    statusForm8 = models.CharField(max_length=50, blank=True, null=True)
+    srnNoForm8 = models.CharField(max_length=100, blank=True, null=True)
+    srnDateForm8 = models.DateField(blank=True, null=True, default='')
+    amtForm8 = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+
+    isArchived = models.BooleanField(default=True)
+    isPinned = models.BooleanField(default=False)
+    modifiedDate = models.DateTimeField()
+    modifiedBy = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE, null=True, blank=True, default=1)
+    indexSRN = models.IntegerField(null=True, blank=True)
+    archivedDate = models.DateTimeField(auto_now_add=True)
+
+    objects = AnnualFilingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', '-isPinned', '-modifiedDate'], name='aaf_sa_pin_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID', '-isPinned', '-modifiedDate'], name='aaf_sa_grp_pin_idx'),
+        ]
+
+    def __str__(self):
+        return f"AnnualFiling {self.annualFilingID} (archived)"
+
+
+class ArchivedTrademark(models.Model):
+    subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
+    trademarkID = models.IntegerField(primary_key=True)
+    nameOfTrademark = models.CharField(max_length=255)
+    applicationNo = models.CharField(max_length=100, default='')
+    classNo = models.CharField(max_length=100, default='')
+    nameOfApplicant = models.CharField(max_length=255)
+    dateOfApp = models.DateField(null=True, blank=True)
+    status1 = models.CharField(max_length=50, default='')
+    status2 = models.CharField(max_length=50, default='')
+    hearingDate = models.DateField(null=True, blank=True)
+    remark = models.CharField(max_length=100, default='')
+    groupID = models.ForeignKey('UpdatedGroup', on_delete=models.CASCADE)
+    oppDate = models.DateField(null=True, blank=True)
+    lastDate = models.DateField(null=True, blank=True)
+    fees = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    feesStatus = models.CharField(max_length=50, default='', null=True, blank=True)
+    expiryDate = models.DateField(null=True, blank=True)
+    isArchived = models.BooleanField(default=True)
+    modifiedDate = models.DateTimeField()
+    indexSRN = models.IntegerField(null=True, blank=True)
+    modifiedBy = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
+    archivedDate = models.DateTimeField(auto_now_add=True)
+
+    objects = TrademarkQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['subAdminID', '-modifiedDate'], name='atm_sa_mod_idx'),
+            models.Index(fields=['subAdminID', 'groupID', '-modifiedDate'], name='atm_sa_grp_mod_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.trademarkID} (archived)'
+
+# Per-subAdmin counters handing out indexSRN values (see user/sequences.py)
+class SRNSequence(models.Model):
+    subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
+    entity = models.CharField(max_length=50)  # 'pendingWork', 'annualFiling' or 'trademark'
+    lastValue = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subAdminID', 'entity'], name='srnsequence_sa_entity_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.entity} {self.lastValue} ({self.subAdminID_id})'
+
+
+# Old History* rows compacted to the fields that changed since the previous version (see user/compaction.py)
+class CompactedHistory(models.Model):
+    subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
+    historyModel = models.CharField(max_length=50)  # e.g. 'HistoryPendingWork'
+    objectID = models.IntegerField()  # primary key of the live row
+    historyID = models.IntegerField()  # primary key the History* row had
+    modifiedDate = models.DateTimeField()
+    # Column attname -> value; an object's oldest entry holds every column
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['historyModel', 'objectID', 'modifiedDate'], name='chist_model_obj_mod_idx'),
+            models.Index(fields=['subAdminID', 'historyModel', 'modifiedDate'], name='chist_sa_model_mod_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.historyModel} {self.objectID} @ {self.modifiedDate}'
+
+
+# Tables whose groupID copies their company's; UpdatedCompany.sync_row_groups keeps them in step
+COMPANY_GROUP_MODELS = [
+    UpdatedDSC, HistoryDSC, UpdatedClient, HistoryClient,
+    PendingWork, ArchivedPendingWork, AnnualFiling, ArchivedAnnualFiling,
+]
+
+
+# A due date or renewal coming up (or just passed) on a row one user looks after,
+# kept up to date by the scheduled scan in user/alerts.py
+class Alert(models.Model):
+    STATES = [
+        ('dueSoon', 'Due soon'),
+        ('expired', 'Expired'),
+    ]
+
+    alertID = models.AutoField(primary_key=True)
+    subAdminID = models.ForeignKey('SignUP', on_delete=models.CASCADE)
+    userID = models.ForeignKey('UpdatedUser', on_delete=models.CASCADE)
+    sourceModel = models.CharField(max_length=50)  # e.g. 'PendingWork'
+    objectID = models.IntegerField()  # primary key of the source row
+    dateField = models.CharField(max_length=50)  # e.g. 'actualDueDate'
+    title = models.CharField(max_length=255)
+    dueDate = models.DateField()
+    state = models.CharField(max_length=10, choices=STATES)
+    isRead = models.BooleanField(default=False)
+    emailedDate = models.DateTimeField(null=True, blank=True)  # set once the alert went out in a digest
+    createdDate = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['userID', 'isRead'], name='alert_user_read_idx'),
+            models.Index(fields=['subAdminID', 'emailedDate'], name='alert_sa_emailed_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['userID', 'sourceModel', 'dateField', 'objectID'], name='alert_user_source_uniq'),
+        ]
+
     def __str__(self):
-        return f'{self.trademarkID}'
\ No newline at end of file
+        return f'{self.title}: {self.dateField} {self.dueDate} ({self.state})'
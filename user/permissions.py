@@ -0,0 +1,67 @@
+from enum import IntFlag
+from types import MappingProxyType
+
+
+class Capability(IntFlag):
+    """What an account may do; each view requires one of these bits."""
+    STAFF = 1 << 0  # everything not granted to client users or free sub-admins
+    ACCOUNT = 1 << 1  # own password
+    PENDING_WORK_READ = 1 << 2
+    PENDING_WORK_WRITE = 1 << 3
+    ANNUAL_READ = 1 << 4
+    ANNUAL_WRITE = 1 << 5
+    TRADEMARK_READ = 1 << 6
+    TRADEMARK_WRITE = 1 << 7
+    FREE_PLAN = 1 << 8  # DSC, group, company and profile pages of free sub-admins
+
+
+NONE = Capability(0)
+ALL = ~NONE
+
+_VIEWS = {
+    Capability.ACCOUNT: ['updatePassword'],
+    Capability.PENDING_WORK_READ: ['listPendingWork', 'listPendingWorkData'],
+    Capability.PENDING_WORK_WRITE: ['addPendingWork', 'updatePendingWork', 'deletePendingWork', 'pendingWorkHistoryData'],
+    Capability.ANNUAL_READ: ['listAnnual', 'listAnnualData'],
+    Capability.ANNUAL_WRITE: ['addAnnual', 'updateAnnual', 'deleteAnnual', 'annualHistoryData'],
+    Capability.TRADEMARK_READ: ['listTrademark', 'listTrademarkData'],
+    Capability.TRADEMARK_WRITE: ['addTrademark', 'updateTrademark', 'deleteTrademark', 'trademarkHistoryData'],
+    Capability.FREE_PLAN: [
+        'listDSC', 'listDSCData', 'addDSC', 'updateDSC', 'deleteDSC', 'listGroup', 'addGroup', 'updateGroup',
+        'deleteGroup', 'listCompany', 'listCompanyData', 'addCompany', 'updateCompany', 'deleteCompany',
+        'feedBack', 'updateProfile', 'deleteProfile',
+    ],
+}
+
+# View name -> the capabilities that open it; unlisted views need STAFF
+VIEW_CAPABILITIES = MappingProxyType({
+    name: capability for capability, names in _VIEWS.items() for name in names
+})
+
+# Bits each page access flag of a client user grants, per permission level
+_CLIENT_ACCESS = [
+    ('accessToPendingWork', Capability.PENDING_WORK_READ, Capability.PENDING_WORK_WRITE),
+    ('accessToAnnual', Capability.ANNUAL_READ, Capability.ANNUAL_WRITE),
+    ('accessToTrademark', Capability.TRADEMARK_READ, Capability.TRADEMARK_WRITE),
+]
+
+
+def view_capability(name):
+    return VIEW_CAPABILITIES.get(name, Capability.STAFF)
+
+
+def user_capabilities(user):
+    """Capabilities of a logged-in user; NONE for a client user with no permission level."""
+    if not user.isClientUser:
+        return ALL
+    if not (user.canReadOnly or user.canReadWrite):
+        return NONE
+    capabilities = Capability.ACCOUNT
+    for flag, read, write in _CLIENT_ACCESS:
+        if getattr(user, flag):
+            capabilities |= read if user.canReadOnly else read | write
+    return capabilities
+
+
+def subAdmin_capabilities(subAdmin):
+    return Capability.FREE_PLAN | Capability.ACCOUNT if subAdmin.freeUser else ALL
@@ -0,0 +1,26 @@
+from .models import SubAdminSubscription, UpdatedDSC
+
+# DSCs a sub-admin may hold on each subscription plan (keyed by lower-case plan name)
+PLAN_DSC_LIMITS = {
+    'free trial': 100,
+    'basic': 350,
+    'standard': 700,
+    'premimum': 1500,
+    'premimum plus': float('inf'),
+}
+
+
+def dsc_limit(subAdmin):
+    """DSC limit for the sub-admin's plan; free users are unlimited.
+
+    Raises SubAdminSubscription.DoesNotExist when a paying sub-admin has no active plan.
+    """
+    if subAdmin.freeUser:
+        return float('inf')
+    subscription_plan = SubAdminSubscription.objects.select_related('planID').get(subAdminID=subAdmin, isActive=True)
+    return PLAN_DSC_LIMITS.get(subscription_plan.planID.planName.lower(), 0)  # 0 if the plan is somehow invalid
+
+
+def remaining_dsc_allowance(subAdmin):
+    """How many more DSCs the sub-admin can add under their plan."""
+    return dsc_limit(subAdmin) - UpdatedDSC.objects.filter(subAdminID=subAdmin).count()
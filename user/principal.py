@@ -0,0 +1,135 @@
+from functools import cached_property
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from .models import SignUP, UpdatedUser, SuperAdmin
+from .permissions import NONE, subAdmin_capabilities, user_capabilities
+from .tenant_cache import bump_tenant_version, tenant_cached, tenant_version
+
+# Accounts are cached across requests under the tenant's 'accounts' version (bumped by
+# any write to SignUP, UpdatedUser or SuperAdmin) and its 'groups' version, so a
+# deactivation or permission change is seen on the very next request.
+SUPER_ADMINS = 'superAdmin'
+
+
+class Principal:
+    """The logged-in account, resolved once per request and shared by the
+    middleware, the allow_only_client_users decorator and getUser."""
+
+    def __init__(self, role=None, user=None, subAdmin=None, superAdmin=None):
+        self.role = role  # 'user', 'subAdmin', 'superAdmin' or None
+        self.user = user
+        self.subAdmin = subAdmin
+        self.superAdmin = superAdmin
+
+    @property
+    def base(self):
+        if self.role == 'user' and self.user:
+            return 'base/clientBase.html' if self.user.isClientUser else 'base/userBase.html'
+        if self.role == 'subAdmin' and self.subAdmin:
+            return 'base/freeUserBase.html' if self.subAdmin.freeUser else 'base/subAdminBase.html'
+        if self.role == 'superAdmin' and self.superAdmin:
+            return 'base/superAdminBase.html'
+        return None
+
+    @cached_property
+    def capabilities(self):
+        """The account's Capability bits; superAdmins and missing accounts have none."""
+        if self.role == 'user' and self.user:
+            return user_capabilities(self.user)
+        if self.role == 'subAdmin' and self.subAdmin:
+            return subAdmin_capabilities(self.subAdmin)
+        return NONE
+
+    @classmethod
+    def from_session(cls, session):
+        userID = session.get('userID')
+        subAdminID = session.get('subAdminID')
+        superAdminID = session.get('superAdminID')
+
+        if userID:
+            return cls(role='user', user=_cached_user(userID))
+
+        if subAdminID:
+            user, subAdmin = _account_cached(subAdminID, 'subAdmin', lambda: _load_subAdmin(subAdminID)) or (None, None)
+            return cls(role='subAdmin', user=user, subAdmin=subAdmin)
+
+        if superAdminID:
+            superAdmin = tenant_cached(
+                SUPER_ADMINS, 'accounts', f'superAdmin:{superAdminID}',
+                lambda: SuperAdmin.objects.filter(superAdminID=superAdminID).first(),
+            )
+            return cls(role='superAdmin', superAdmin=superAdmin)
+
+        return cls()
+
+
+def _account_cached(subAdminID, key, load):
+    # Group renames and deletes (SET_NULL on the user) change the cached group too
+    return tenant_cached(subAdminID, 'accounts', f"{key}:g{tenant_version(subAdminID, 'groups')}", load)
+
+
+def _load_user(userID):
+    # The user row carries its subAdmin (plan flags) and group in one join
+    return UpdatedUser.objects.select_related('subAdminID', 'groupID').filter(userID=userID).first()
+
+
+def _load_subAdmin(subAdminID):
+    # A subAdmin acts through the inactive 'Admin' user created at sign up
+    user = UpdatedUser.objects.select_related('subAdminID', 'groupID').filter(
+        subAdminID=subAdminID, userPhone=F('subAdminID__subAdminPhone'), isActive=False
+    ).first()
+    subAdmin = user.subAdminID if user else SignUP.objects.filter(subAdminID=subAdminID).first()
+    return (user, subAdmin) if subAdmin else None
+
+
+def _cached_user(userID):
+    # A user never moves between tenants, so its subAdminID is cached without expiry
+    tenant_key = f'account:user:{userID}:tenant'
+    subAdminID = cache.get(tenant_key)
+    if subAdminID is None:
+        subAdminID = UpdatedUser.objects.filter(userID=userID).values_list('subAdminID', flat=True).first()
+        if subAdminID is None:
+            return None
+        cache.set(tenant_key, subAdminID, None)
+    return _account_cached(subAdminID, f'user:{userID}', lambda: _load_user(userID))
+
+
+def resolve_principal(request):
+    """Return the request's Principal, loading it on first use."""
+    principal = getattr(request, 'principal', None)
+    if principal is None:
+        principal = Principal.from_session(request.session)
+        request.principal = principal
+    return principal
+
+
+def invalidate_principals(*subAdminIDs):
+    """Drop the cached accounts of these tenants once the current transaction commits.
+
+    Saves and deletes do this through signals; queryset update() calls on SignUP
+    or UpdatedUser must call it themselves.
+    """
+    def bump():
+        for subAdminID in set(subAdminIDs):
+            bump_tenant_version(subAdminID, 'accounts')
+    transaction.on_commit(bump)
+
+
+def _invalidate_on_write(tenant):
+    def receiver(sender, instance, **kwargs):
+        invalidate_principals(tenant(instance))
+    return receiver
+
+
+_receivers = []
+for _model, _tenant in [
+    (SignUP, lambda instance: instance.pk),
+    (UpdatedUser, lambda instance: instance.subAdminID_id),
+    (SuperAdmin, lambda instance: SUPER_ADMINS),
+]:
+    _receiver = _invalidate_on_write(_tenant)
+    _receivers.append(_receiver)  # signals hold receivers weakly
+    post_save.connect(_receiver, sender=_model, dispatch_uid=f'principal_{_model.__name__}_save')
+    post_delete.connect(_receiver, sender=_model, dispatch_uid=f'principal_{_model.__name__}_delete')
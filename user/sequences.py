@@ -0,0 +1,53 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from .archive import ARCHIVE_MODELS
+from .models import SRNSequence, PendingWork, AnnualFiling, Trademark
+
+
+# Sequence name for each model numbered with indexSRN
+SRN_ENTITIES = {
+    PendingWork: 'pendingWork',
+    AnnualFiling: 'annualFiling',
+    Trademark: 'trademark',
+}
+
+
+def current_max_srn(subAdmin, model):
+    """Highest indexSRN already stored for this subAdmin, or 0; archived rows keep their numbers."""
+    return max(
+        source.objects.filter(subAdminID=subAdmin).aggregate(max_index=Max('indexSRN'))['max_index'] or 0
+        for source in (model, ARCHIVE_MODELS[model])
+    )
+
+
+def next_srn(subAdmin, model):
+    """Hand out the next indexSRN for this subAdmin and model.
+
+    The increment is a single UPDATE on the tenant's counter row, which holds
+    the row lock until the block commits, so concurrent adds never share a
+    number. Numbers are not given back if the caller's insert fails.
+    """
+    return reserve_srn_block(subAdmin, model, 1)
+
+
+def reserve_srn_block(subAdmin, model, size):
+    """Reserve size consecutive indexSRN values and return the first one.
+
+    Bulk imports take a whole batch's numbers with the same single UPDATE
+    next_srn uses for one.
+    """
+    entity = SRN_ENTITIES[model]
+    counter = SRNSequence.objects.filter(subAdminID=subAdmin, entity=entity)
+
+    with transaction.atomic():
+        if not counter.update(lastValue=F('lastValue') + size):
+            # First number for this tenant: seed the counter from existing rows
+            try:
+                with transaction.atomic():
+                    SRNSequence.objects.create(
+                        subAdminID=subAdmin, entity=entity, lastValue=current_max_srn(subAdmin, model)
+                    )
+            except IntegrityError:
+                pass  # another request created it first
+            counter.update(lastValue=F('lastValue') + size)
+        return counter.values_list('lastValue', flat=True).get() - size + 1
@@ -0,0 +1,72 @@
+import time
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from .models import UpdatedCompany, UpdatedGroup, UpdatedClient, UpdatedUser, Work
+
+# Entries are kept for an hour at most; writes invalidate them much sooner
+DEFAULT_TIMEOUT = 60 * 60
+
+# Tenant data lives under a per-(subAdmin, namespace) version number. Bumping the
+# version orphans every entry of that namespace at once; they simply expire.
+NAMESPACE_MODELS = {
+    'companies': UpdatedCompany,
+    'groups': UpdatedGroup,
+    'clients': UpdatedClient,
+    'users': UpdatedUser,
+    'forms': Work,
+}
+
+
+def _subAdminID(subAdmin):
+    return getattr(subAdmin, 'pk', subAdmin)
+
+
+def _version_key(subAdminID, namespace):
+    return f'tenant:{subAdminID}:{namespace}:version'
+
+
+def tenant_version(subAdmin, namespace):
+    key = _version_key(_subAdminID(subAdmin), namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version evicted from the cache is never reused
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_tenant_version(subAdmin, *namespaces):
+    """Invalidate everything cached for the tenant under the given namespaces."""
+    subAdminID = _subAdminID(subAdmin)
+    for namespace in namespaces:
+        key = _version_key(subAdminID, namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def tenant_cached(subAdmin, namespace, key, compute, timeout=DEFAULT_TIMEOUT):
+    """Return compute() for this tenant, served from the cache until the namespace is bumped."""
+    subAdminID = _subAdminID(subAdmin)
+    cache_key = f'tenant:{subAdminID}:{namespace}:v{tenant_version(subAdminID, namespace)}:{key}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+def _bump_on_write(namespace):
+    def receiver(sender, instance, **kwargs):
+        bump_tenant_version(instance.subAdminID_id, namespace)
+    return receiver
+
+
+# Saves and deletes of the cached models invalidate their namespace
+_receivers = []
+for _namespace, _model in NAMESPACE_MODELS.items():
+    _receiver = _bump_on_write(_namespace)
+    _receivers.append(_receiver)  # signals hold receivers weakly
+    post_save.connect(_receiver, sender=_model, dispatch_uid=f'tenant_cache_{_namespace}_save')
+    post_delete.connect(_receiver, sender=_model, dispatch_uid=f'tenant_cache_{_namespace}_delete')
@@ -1,3 +1,1012 @@
-from django.test import TestCase
+import threading
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from itertools import product
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import admins.views
+from admins.models import OutboxEmail
+import findMyDSC.views
+from . import views
+from .alerts import refresh_alerts, send_digests
+from .archive import ARCHIVE_MODELS, archive_sweep, get_record, move_to_archive, save_record
+from .importer import Importer
+from .models import (
+    SignUP, UpdatedUser, UpdatedGroup, UpdatedCompany, UpdatedClient, UpdatedDSC, Work, PendingWork, AnnualFiling,
+    Trademark, SubscriptionPlan, SubAdminSubscription, ArchivedPendingWork, HistoryCompany, HistoryPendingWork,
+    CompactedHistory, Alert, DUE_SOON_DAYS, phone_key,
+)
+from .permissions import VIEW_CAPABILITIES
+from .principal import Principal
+from .sequences import current_max_srn, next_srn, reserve_srn_block
+from .compaction import compact_history, compact_model, prune_tenant
+from .versioning import HistoryTimeline, bulk_create_with_history, history_row, history_values, save_with_history
+from .views import allow_only_client_users
 
-# Create your tests here.
+ACCESS_FLAGS = ['accessToPendingWork', 'accessToAnnual', 'accessToTrademark']
+
+# Query count tests must not see entries another run left in the shared cache
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# AnnualFiling's SRN dates default to '', which a DateField cannot store
+NO_SRN_DATES = {f'srnDate{form}': None for form in ('DPT3', 'MGT14', 'AOC4', 'MGT7', 'Form11', 'Form8')}
+
+
+def make_tenant(n=1):
+    """A sub-admin on a paid plan with its Admin user, one group and one form."""
+    subAdmin = SignUP.objects.create(
+        subAdminName=f'SubAdmin {n}', subAdminType='CA', subAdminEmail=f'subadmin{n}@example.com',
+        subAdminPhone=f'90000000{n:02d}', subAdminCity='City', subAdminState='State', subAdminPinCode='400001',
+        subAdminPassword='x', hasChosenPlan=True, isFirstLogin=False,
+    )
+    admin = UpdatedUser.objects.create(subAdminID=subAdmin, userName='Admin', userPhone=subAdmin.subAdminPhone,
+                                       userUsername=f'admin{n}', userPassword='x', isActive=False)
+    plan = SubscriptionPlan.objects.create(planName='Basic', planDescription='', planMonthlyPrice=1, planAnnualPrice=1,
+                                           planDuration=30)
+    SubAdminSubscription.objects.create(subAdminID=subAdmin, planID=plan, isActive=True)
+    group = UpdatedGroup.objects.create(subAdminID=subAdmin, groupName='Group', userID=admin)
+    Work.objects.create(subAdminID=subAdmin, formNo='Form 1', matter='Matter', filingDays=30, modifiedBy=admin)
+    return subAdmin
+
+
+def add_rows(subAdmin, count, start=0):
+    """count companies, each with a client, a DSC and live and archived work, filings and trademarks."""
+    admin = UpdatedUser.objects.get(subAdminID=subAdmin, userName='Admin')
+    group = UpdatedGroup.objects.get(subAdminID=subAdmin)
+    work = Work.objects.get(subAdminID=subAdmin)
+    for i in range(start, start + count):
+        company = UpdatedCompany.objects.create(subAdminID=subAdmin, companyName=f'Company {i}', companyType='Pvt',
+                                                groupID=group, userID=admin)
+        UpdatedClient.objects.create(subAdminID=subAdmin, clientName=f'Client {i}', companyID=company,
+                                     clientPhone=f'70000{i:05d}', userID=admin)
+        UpdatedDSC.objects.create(subAdminID=subAdmin, clientName=f'Client {i}', companyID=company, status='IN',
+                                  location='Office', clientPhone=f'70000{i:05d}', userID=admin)
+        for isArchived in (False, True):
+            PendingWork.objects.create(
+                subAdminID=subAdmin, formID=work, companyID=company, eventDate=date.today(),
+                actualDueDate=date.today() + timedelta(days=i), internalDueDate=date.today(), userID=admin,
+                status='Mailed For Sign', billing='Pending', modifiedBy='Admin', indexSRN=2 * i + isArchived + 1,
+                isArchived=isArchived,
+            )
+            AnnualFiling.objects.create(subAdminID=subAdmin, companyID=company, financialYear='2024-25', modifiedBy=admin,
+                                        indexSRN=2 * i + isArchived + 1, isArchived=isArchived, **NO_SRN_DATES)
+            Trademark.objects.create(subAdminID=subAdmin, nameOfTrademark=f'Mark {i}', nameOfApplicant='Applicant',
+                                     groupID=group, modifiedBy=admin, indexSRN=2 * i + isArchived + 1,
+                                     status1='Objected', isArchived=isArchived)
+    for model in ARCHIVE_MODELS:
+        move_to_archive(model, list(model.objects.filter(subAdminID=subAdmin, isArchived=True).values_list('pk', flat=True)))
+
+
+def login_subAdmin(client, subAdmin):
+    session = client.session
+    session['subAdminID'] = subAdmin.subAdminID
+    session['subAdminName'] = subAdmin.subAdminName
+    session.save()
+
+
+def login_user(client, user):
+    session = client.session
+    session['userID'] = user.userID
+    session['userName'] = user.userName
+    session.save()
+
+
+def legacy_outcome(principal, name):
+    """What the allowed_views lists allow_only_client_users used to build decided."""
+    if principal.role == 'subAdmin':
+        if not principal.subAdmin.freeUser:
+            return 'allowed'
+        free_views = [
+            'listDSC', 'listDSCData', 'addDSC', 'updateDSC', 'deleteDSC', 'listGroup', 'addGroup', 'updateGroup',
+            'deleteGroup', 'listCompany', 'listCompanyData', 'addCompany', 'updateCompany', 'deleteCompany',
+            'feedBack', 'updatePassword', 'updateProfile', 'deleteProfile',
+        ]
+        return 'allowed' if name in free_views else 'denied'
+
+    user = principal.user
+    if not user.isClientUser:
+        return 'allowed'
+    if not (user.canReadOnly or user.canReadWrite):
+        return 'signIn'
+    pages = {
+        'accessToPendingWork': ('PendingWork', 'pendingWorkHistoryData'),
+        'accessToAnnual': ('Annual', 'annualHistoryData'),
+        'accessToTrademark': ('Trademark', 'trademarkHistoryData'),
+    }
+    allowed = ['updatePassword']
+    for flag, (page, history) in pages.items():
+        if getattr(user, flag):
+            allowed += [f'list{page}', f'list{page}Data']
+            if not user.canReadOnly:
+                allowed += [f'add{page}', f'update{page}', f'delete{page}', history]
+    return 'allowed' if name in allowed else 'denied'
+
+
+def principals():
+    """Every combination of the flags the permission model reads."""
+    for freeUser in (False, True):
+        yield Principal(role='subAdmin', subAdmin=SignUP(subAdminID=1, freeUser=freeUser))
+    yield Principal(role='user', user=UpdatedUser(userID=1, subAdminID_id=1, isClientUser=False))
+    for readOnly, readWrite, *access in product((False, True), repeat=2 + len(ACCESS_FLAGS)):
+        user = UpdatedUser(userID=1, subAdminID_id=1, isClientUser=True, canReadOnly=readOnly, canReadWrite=readWrite,
+                           **dict(zip(ACCESS_FLAGS, access)))
+        yield Principal(role='user', user=user)
+
+
+def decorated_view_names():
+    names = set(VIEW_CAPABILITIES)
+    for module in (views, admins.views):
+        names.update(name for name, value in vars(module).items() if hasattr(value, 'capability'))
+    return sorted(names)
+
+
+class AllowOnlyClientUsersTests(SimpleTestCase):
+    def outcome(self, principal, name):
+        def view(request):
+            return 'allowed'
+        view.__name__ = name
+
+        request = RequestFactory().get('/', HTTP_REFERER='/back/')
+        request.principal = principal
+        request._messages = CookieStorage(request)
+        response = allow_only_client_users(view)(request)
+        if response == 'allowed':
+            return response
+        return 'denied' if response.url == '/back/' else 'signIn'
+
+    def test_matrix_matches_legacy_lists(self):
+        names = decorated_view_names()
+        self.assertIn('listDSC', names)
+        self.assertIn('listUser', names)
+        for principal in principals():
+            for name in names:
+                account = principal.user or principal.subAdmin
+                flags = {key: value for key, value in vars(account).items() if isinstance(value, bool)}
+                with self.subTest(role=principal.role, view=name, **flags):
+                    self.assertEqual(self.outcome(principal, name), legacy_outcome(principal, name))
+
+    def test_no_session_redirects_to_sign_in(self):
+        self.assertEqual(self.outcome(Principal(), 'listDSC'), 'signIn')
+        self.assertEqual(self.outcome(Principal(role='superAdmin'), 'listDSC'), 'signIn')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListQueryCountTests(TestCase):
+    """Each list page costs the same number of queries however many rows it shows."""
+    URLS = [
+        'listDSC', 'listCompany', 'listGroup', 'listClient', 'listWork',
+        'listPendingWork', 'listPendingWork?archived=true', 'listAnnual', 'listAnnual?archived=true',
+        'listTrademark', 'listTrademark?archived=true', 'listPendingWorkReport', 'listAnnualReport',
+        'listDSCData', 'listCompanyData', 'listClientData', 'listWorkData', 'listPendingWorkData',
+        'listAnnualData', 'listTrademarkData',
+    ]
+    ROWS = 40
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        login_subAdmin(self.client, self.subAdmin)
+
+    def get(self, url):
+        response = self.client.get(f'/user/{url}', secure=True)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def warm_count(self, url):
+        self.get(url)  # fill the account and option caches the first request loads
+        with CaptureQueriesContext(connection) as queries:
+            self.get(url)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        add_rows(self.subAdmin, 1)
+        counts = {url: self.warm_count(url) for url in self.URLS}
+
+        add_rows(self.subAdmin, self.ROWS - 1, start=1)
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.get(url)
+                with self.assertNumQueries(counts[url]):
+                    response = self.get(url)
+                if url.endswith('Data') and url != 'listWorkData':
+                    self.assertEqual(len(response.json()['rows']), self.ROWS)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class SRNSequenceConcurrencyTests(TransactionTestCase):
+    """Parallel adds and bulk imports never share an indexSRN or leave a gap."""
+    THREADS = 8
+    CALLS = 20
+    BLOCK = 5
+
+    def test_parallel_reservations_are_distinct_and_contiguous(self):
+        subAdmin = make_tenant()
+        add_rows(subAdmin, 1)  # the counter is seeded from these rows by whichever thread gets there first
+        start = current_max_srn(subAdmin, PendingWork) + 1
+        barrier = threading.Barrier(self.THREADS)
+        taken, errors = [], []
+
+        def worker(bulk):
+            try:
+                barrier.wait()
+                for _ in range(self.CALLS):
+                    if bulk:
+                        first = reserve_srn_block(subAdmin, PendingWork, self.BLOCK)
+                        taken.extend(range(first, first + self.BLOCK))
+                    else:
+                        taken.append(next_srn(subAdmin, PendingWork))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i % 2 == 1,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.THREADS // 2 * self.CALLS * (1 + self.BLOCK)
+        self.assertEqual(sorted(taken), list(range(start, start + total)))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DeleteQueryCountTests(TestCase):
+    """Deleting companies or groups costs the same queries for 1 selected row as for 200."""
+    MANY = 200
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin, userName='Admin')
+        self.group = UpdatedGroup.objects.get(subAdminID=self.subAdmin)
+        login_subAdmin(self.client, self.subAdmin)
+
+    def companies(self, count, blocked):
+        start = UpdatedCompany.objects.count()
+        companies = UpdatedCompany.objects.bulk_create([
+            UpdatedCompany(subAdminID=self.subAdmin, companyName=f'Company {i}', companyType='Pvt', groupID=self.group,
+                           userID=self.admin)
+            for i in range(start, start + count)
+        ])
+        if blocked:
+            UpdatedClient.objects.bulk_create([
+                UpdatedClient(subAdminID=self.subAdmin, clientName='Client', companyID=company, groupID=self.group,
+                              clientPhone=f'7{company.pk:09d}', userID=self.admin)
+                for company in companies
+            ])
+        return [company.pk for company in companies]
+
+    def groups(self, count, blocked):
+        start = UpdatedGroup.objects.count()
+        groups = UpdatedGroup.objects.bulk_create([
+            UpdatedGroup(subAdminID=self.subAdmin, groupName=f'Group {i}', userID=self.admin)
+            for i in range(start, start + count)
+        ])
+        if blocked:
+            Trademark.objects.bulk_create([
+                Trademark(subAdminID=self.subAdmin, nameOfTrademark='Mark', nameOfApplicant='Applicant', groupID=group,
+                          modifiedBy=self.admin, status1='Objected')
+                for group in groups
+            ])
+        return [group.pk for group in groups]
+
+    def delete(self, view, ids):
+        name = view[len('delete'):].lower()
+        return self.client.post(f'/user/{view}', {f'{name}IDs': ids, view: 'yes'}, secure=True)
+
+    def assertConstantQueries(self, view, make, blocked, model):
+        one, many = make(1, blocked), make(self.MANY, blocked)
+        self.delete(view, [])  # fill the account caches the first request loads
+        with CaptureQueriesContext(connection) as queries:
+            self.delete(view, one)
+        # Read now: the next request resets the connection's query log
+        total, lookups = len(queries), self.lookups(queries)
+        before = model.objects.count()
+        self.delete(view, [])  # a deleted group drops the cached accounts again
+        if blocked:
+            # Only the blocker check runs
+            with self.assertNumQueries(total):
+                self.delete(view, many)
+            self.assertEqual(model.objects.count(), before)
+        else:
+            # Django's delete collector issues its DELETEs in batches of 100 primary keys
+            with CaptureQueriesContext(connection) as queries:
+                self.delete(view, many)
+            self.assertEqual(self.lookups(queries), lookups)
+            self.assertEqual(model.objects.count(), before - self.MANY)
+
+    def lookups(self, queries):
+        return len([query for query in queries if not query['sql'].startswith('DELETE')])
+
+    def test_delete_company(self):
+        for blocked in (True, False):
+            with self.subTest(blocked=blocked):
+                self.assertConstantQueries('deleteCompany', self.companies, blocked, UpdatedCompany)
+
+    def test_delete_group(self):
+        for blocked in (True, False):
+            with self.subTest(blocked=blocked):
+                self.assertConstantQueries('deleteGroup', self.groups, blocked, UpdatedGroup)
+
+
+class PendingWorkImportTests(TestCase):
+    """Form and user names in an import match the way typed names do in the add forms."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin, userName='Admin')
+        UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Acme', companyType='Pvt',
+                                      groupID=UpdatedGroup.objects.get(subAdminID=self.subAdmin), userID=self.admin)
+        Work.objects.create(subAdminID=self.subAdmin, formNo='Form 2', matter='Matter', filingDays=30, modifiedBy=self.admin)
+        Work.objects.create(subAdminID=self.subAdmin, formNo='form  2', matter='Matter', filingDays=30, modifiedBy=self.admin)
+        for n, (userName, flags) in enumerate([
+            ('Asha  Rao', {}), ('Ravi', {}), ('ravi', {}), ('Former', {'isActive': False}),
+            ('Client', {'isClientUser': True}),
+        ]):
+            UpdatedUser.objects.create(subAdminID=self.subAdmin, userName=userName, userPhone=f'80000000{n:02d}',
+                                       userUsername=f'user{n}', userPassword='x', **{'isActive': True, **flags})
+
+    def run_import(self, formNo, userName):
+        row = {
+            'formNo': formNo, 'companyName': 'Acme', 'eventDate': '2024-01-01', 'actualDueDate': '2024-01-31',
+            'internalDueDate': '2024-01-20', 'cutOffTime': '10:00', 'userName': userName, 'status': 'Pending',
+            'billing': 'No',
+        }
+        return Importer(self.admin, 'pendingWork').run([(2, row)])
+
+    def test_names_match_case_and_spacing_insensitively(self):
+        importer = self.run_import(' FORM 1 ', 'asha rao')
+        self.assertEqual(importer.errors, [])
+        work = PendingWork.objects.get(subAdminID=self.subAdmin)
+        self.assertEqual((work.formID.formNo, work.userID.userName), ('Form 1', 'Asha  Rao'))
+
+    def test_ambiguous_names_are_row_errors(self):
+        self.assertEqual(self.run_import('Form 2', 'Asha Rao').errors,
+                         [(2, "Form No. 'Form 2' matches more than one record.")])
+        self.assertEqual(self.run_import('Form 1', 'RAVI').errors,
+                         [(2, "User 'RAVI' matches more than one record.")])
+        self.assertFalse(PendingWork.objects.exists())
+
+    def test_inactive_and_client_users_are_not_assignable(self):
+        for userName in ('Former', 'Client'):
+            with self.subTest(userName=userName):
+                self.assertEqual(self.run_import('Form 1', userName).errors,
+                                 [(2, f"User '{userName}' not found.")])
+        self.assertFalse(PendingWork.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class PrincipalInvalidationTests(TransactionTestCase):
+    """Account changes made through update() or save() reach the cached principal on the very next request.
+
+    Requests run in autocommit, as in production, so invalidate_principals bumps the cache version at once.
+    """
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.staff = UpdatedUser.objects.create(subAdminID=self.subAdmin, userName='Staff', userPhone='8000000001',
+                                                userUsername='staff', userPassword='x', isActive=True)
+        login_subAdmin(self.client, self.subAdmin)
+        self.staffClient = self.client_class()
+        login_user(self.staffClient, self.staff)
+
+    def staff_get(self, url):
+        return self.staffClient.get(f'/user/{url}', secure=True, HTTP_REFERER='/back/')
+
+    def test_deactivated_user_is_signed_out(self):
+        self.assertEqual(self.staff_get('listDSC').status_code, 200)  # caches the active account
+
+        invalidate = admins.views.invalidate_principals
+        responses = []
+
+        def invalidate_then_request(*subAdminIDs):
+            invalidate(*subAdminIDs)
+            # A request landing right after the bump must not cache the still active account again
+            responses.append(self.staff_get('listDSC'))
+
+        with mock.patch('admins.views.invalidate_principals', side_effect=invalidate_then_request):
+            self.client.post('/admin/deleteUser', {'userIDs': [self.staff.userID], 'deleteUser': 'yes'}, secure=True)
+
+        self.assertRedirects(responses[0], '/userSignIn/', fetch_redirect_response=False)
+        self.assertNotEqual(self.staff_get('listDSC').status_code, 200)
+
+    def test_updated_permissions_apply_at_once(self):
+        self.assertEqual(self.staff_get('listPendingWork').status_code, 200)
+
+        self.client.post(f'/admin/updateUser/{self.staff.userID}/', {
+            'userName': 'Staff', 'userPhone': '8000000001', 'userUsername': 'staff', 'groupName': 'Group',
+            'perm': 'readOnly', 'accessToAnnual': 'on',
+        }, secure=True)
+
+        self.assertRedirects(self.staff_get('listPendingWork'), '/back/', fetch_redirect_response=False)
+        self.assertEqual(self.staff_get('listAnnual').status_code, 200)
+
+    def test_paid_plan_opens_the_lists(self):
+        SignUP.objects.filter(pk=self.subAdmin.pk).update(hasChosenPlan=False)
+        SubAdminSubscription.objects.update(isActive=False, endDate=timezone.now() - timedelta(days=1))
+        session = self.client.session
+        session['planID'] = SubscriptionPlan.objects.get().planID
+        session.save()
+        self.assertRedirects(self.client.get('/user/listDSC', secure=True), '/plan/selectPlan',
+                             fetch_redirect_response=False)
+
+        payment = {'razorpay_order_id': 'order', 'razorpay_payment_id': 'pay', 'razorpay_signature': 'sig'}
+        with mock.patch.object(findMyDSC.views.razorpay_client.utility, 'verify_payment_signature'):
+            self.client.post('/plan/pay/paymentSuccess/', payment, secure=True)
+
+        self.assertEqual(self.client.get('/user/listDSC', secure=True).status_code, 200)
+
+
+class ArchiveTests(TestCase):
+    """Archived rows keep their live ids, so the live table must never issue those ids again."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        add_rows(self.subAdmin, 2)  # the newest pending work row is an archived one
+        self.archived = ArchivedPendingWork.objects.order_by('-pk').first()
+        self.live = PendingWork.objects.order_by('-pk').first()
+
+    def new_work(self, **fields):
+        return PendingWork.objects.create(
+            subAdminID=self.subAdmin, formID=self.live.formID, companyID=self.live.companyID, eventDate=date.today(),
+            actualDueDate=date.today(), internalDueDate=date.today(), userID=self.live.userID, status='Pending',
+            billing='Pending', modifiedBy='Admin', **fields,
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', "resets the SQLite id counter")
+    def test_sweep_keeps_live_ids_above_archived_ones(self):
+        self.assertGreater(self.archived.pk, self.live.pk)
+        # What a MySQL 5.7 restart does: the next id becomes max(live id) + 1
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s",
+                           [self.live.pk, PendingWork._meta.db_table])
+
+        archive_sweep()
+        self.assertGreater(self.new_work().pk, self.archived.pk)
+
+    def test_move_does_not_overwrite_another_archived_record(self):
+        clash = self.new_work(pk=self.archived.pk, isArchived=True, remark='Other record')
+        with self.assertRaises(IntegrityError):
+            move_to_archive(PendingWork, [clash.pk])
+        self.assertEqual(ArchivedPendingWork.objects.get(pk=self.archived.pk).remark, self.archived.remark)
+
+    def test_saving_a_live_row_leaves_the_archive_alone(self):
+        self.live.remark = 'Edited'
+        with CaptureQueriesContext(connection) as queries:
+            save_record(self.live)
+        table = ArchivedPendingWork._meta.db_table
+        self.assertFalse([query['sql'] for query in queries if table in query['sql']])
+
+    def test_archived_record_round_trip(self):
+        record = get_record(PendingWork.objects.all(), ArchivedPendingWork.objects.all(), self.archived.pk)
+        record.remark = 'Edited while archived'
+        save_record(record)
+        self.assertFalse(PendingWork.objects.filter(pk=self.archived.pk).exists())
+        self.assertEqual(ArchivedPendingWork.objects.get(pk=self.archived.pk).remark, 'Edited while archived')
+
+        record = get_record(PendingWork.objects.all(), ArchivedPendingWork.objects.all(), self.archived.pk)
+        record.isArchived = False
+        save_record(record)
+        self.assertFalse(ArchivedPendingWork.objects.filter(pk=self.archived.pk).exists())
+        self.assertEqual(PendingWork.objects.get(pk=self.archived.pk).remark, 'Edited while archived')
+
+
+@mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+class BulkCreateWithoutReturningTests(TestCase):
+    """MySQL returns no primary keys from a bulk insert; bulk_create_with_history reads them back."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.other = make_tenant(2)
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin, userName='Admin')
+        self.group = UpdatedGroup.objects.get(subAdminID=self.subAdmin)
+
+    def companies(self, count, start=0):
+        return [UpdatedCompany(subAdminID=self.subAdmin, companyName=f'Company {i}', companyType='Pvt',
+                               groupID=self.group, userID=self.admin) for i in range(start, start + count)]
+
+    def assertLinked(self, companies):
+        for company in companies:
+            self.assertEqual(UpdatedCompany.objects.get(pk=company.pk).companyName, company.companyName)
+            self.assertEqual(HistoryCompany.objects.get(companyID=company.pk).companyName, company.companyName)
+
+    def test_primary_keys_are_read_back(self):
+        with CaptureQueriesContext(connection) as queries:
+            few = bulk_create_with_history(self.companies(2))
+        with self.assertNumQueries(len(queries)):
+            many = bulk_create_with_history(self.companies(50, start=2))
+        self.assertLinked(few + many)
+
+    def test_rows_added_meanwhile_fall_back_to_single_inserts(self):
+        bulk_create = UpdatedCompany.objects.bulk_create
+
+        def add_meanwhile(objs, **kwargs):
+            UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Added meanwhile', companyType='Pvt',
+                                          groupID=self.group, userID=self.admin)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(UpdatedCompany.objects, 'bulk_create', side_effect=add_meanwhile):
+            companies = bulk_create_with_history(self.companies(3))
+        self.assertLinked(companies)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImporterTests(TestCase):
+    """What an import writes and which rows it reports back."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin, userName='Admin')
+        self.group = UpdatedGroup.objects.get(subAdminID=self.subAdmin)
+        self.company = UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Acme', companyType='Pvt',
+                                                     groupID=self.group, userID=self.admin)
+
+    def rows(self, *rows):
+        return [(number, row) for number, row in enumerate(rows, start=2)]
+
+    def test_names_taken_meanwhile_are_reported_per_row(self):
+        importer = Importer(self.admin, 'company')
+        # Another request adds a company after the import read the existing names
+        UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='DELTA', companyType='Pvt',
+                                      groupID=self.group, userID=self.admin)
+        importer.run(self.rows(
+            {'groupName': 'Group', 'companyName': 'Beta', 'companyType': 'Pvt'},
+            {'groupName': 'Group', 'companyName': 'Delta', 'companyType': 'Pvt'},
+            {'groupName': 'Group', 'companyName': 'Gamma', 'companyType': 'Pvt'},
+        ))
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(importer.errors, [(3, "Company 'Delta' already exists.")])
+        self.assertEqual(sorted(UpdatedCompany.objects.values_list('companyName', flat=True)),
+                         ['Acme', 'Beta', 'DELTA', 'Gamma'])
+        self.assertEqual(HistoryCompany.objects.count(), 2)
+
+    def test_error_report_lists_each_failing_row(self):
+        login_subAdmin(self.client, self.subAdmin)
+        upload = SimpleUploadedFile('clients.csv', (
+            'Client Name,Company Name,Phone Number\n'
+            'Asha,Acme,9000000001\n'
+            'R2D2,Acme,9000000002\n'
+            'Ravi,Nowhere,9000000003\n'
+            '\n'
+            'Meena,Acme,12345\n'
+        ).encode())
+        response = self.client.post('/user/importData', {'importType': 'client', 'importFile': upload}, secure=True)
+        self.assertEqual((response.context['created'], response.context['errorCount']), (1, 3))
+
+        report = self.client.get('/user/importErrors', secure=True).content.decode().splitlines()
+        self.assertEqual(report, [
+            'Row,Error',
+            '3,Client name can only contain letters and spaces.',
+            "4,Company 'Nowhere' not found.",
+            '6,Phone number must be exactly 10 digits.',
+        ])
+
+    def test_duplicate_phones_in_the_file_and_stored(self):
+        UpdatedClient.objects.create(subAdminID=self.subAdmin, clientName='Stored', companyID=self.company,
+                                     clientPhone='90000-00002', userID=self.admin)
+        importer = Importer(self.admin, 'client').run(self.rows(
+            {'clientName': 'Asha', 'companyName': 'Acme', 'clientPhone': '9000000001'},
+            {'clientName': 'Ravi', 'companyName': 'Acme', 'clientPhone': '9000000001'},
+            {'clientName': 'Meena', 'companyName': 'Acme', 'clientPhone': '9000000002'},
+        ))
+        self.assertEqual(importer.created, 1)
+        self.assertEqual(importer.errors, [
+            (3, "Phone number 9000000001 appears more than once in the file."),
+            (4, "Phone number 9000000002 already exists."),
+        ])
+
+    def test_dsc_import_stops_at_the_plan_limit(self):
+        SubscriptionPlan.objects.update(planName='Free Trial')  # 100 DSCs
+        UpdatedDSC.objects.bulk_create([
+            UpdatedDSC(subAdminID=self.subAdmin, clientName=f'Client {i}', companyID=self.company, status='IN',
+                       location='Office', clientPhone='0', userID=self.admin)
+            for i in range(98)
+        ])
+        row = {'companyName': 'Acme', 'clientName': 'Asha', 'status': 'IN', 'location': 'Office',
+               'receivedBy': 'Desk', 'receivedFrom': 'Asha', 'clientPhone': '9000000001'}
+        importer = Importer(self.admin, 'dsc').run(self.rows(row, row, row, row))
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(importer.errors, [(4, "DSC limit of your subscription plan reached."),
+                                           (5, "DSC limit of your subscription plan reached.")])
+        self.assertEqual(UpdatedDSC.objects.filter(subAdminID=self.subAdmin).count(), 100)
+
+    def test_pending_work_gets_consecutive_srn_numbers_across_batches(self):
+        first = next_srn(self.subAdmin, PendingWork) + 1
+        row = {'formNo': 'Form 1', 'companyName': 'Acme', 'eventDate': '2024-01-01', 'actualDueDate': '2024-01-31',
+               'internalDueDate': '2024-01-20', 'cutOffTime': '10:00', 'status': 'Pending', 'billing': 'No'}
+        UpdatedUser.objects.create(subAdminID=self.subAdmin, userName='Staff', userPhone='8000000001',
+                                   userUsername='staff', userPassword='x', isActive=True)
+        rows = [{**row, 'userName': 'Staff', 'remark': f'Row {i}'} for i in range(5)]
+        with mock.patch('user.importer.BATCH_SIZE', 2):
+            importer = Importer(self.admin, 'pendingWork').run(self.rows(*rows))
+        self.assertEqual((importer.created, importer.errors), (5, []))
+        self.assertEqual(list(PendingWork.objects.order_by('indexSRN').values_list('indexSRN', 'remark')),
+                         [(first + i, f'Row {i}') for i in range(5)])
+        self.assertEqual(next_srn(self.subAdmin, PendingWork), first + 5)
+
+
+class HistoryCompactionTests(TestCase):
+    """Compacting and pruning history keeps every surviving version exactly as it was."""
+    VERSIONS = 8
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        add_rows(self.subAdmin, 1)
+        self.work = PendingWork.objects.get(subAdminID=self.subAdmin)
+        statuses = ['Pending', 'Mailed For Sign', 'Approved']
+        for i in range(self.VERSIONS):
+            self.work.status = statuses[i % len(statuses)]
+            self.work.remark = f'Version {i}' if i % 2 else ''
+            self.work.amt = i * 100
+            save_with_history(self.work)
+        # Version i was written VERSIONS - i days ago
+        now = timezone.now()
+        for i, pk in enumerate(self.history().values_list('pk', flat=True)):
+            HistoryPendingWork.objects.filter(pk=pk).update(modifiedDate=now - timedelta(days=self.VERSIONS - i))
+
+    def history(self):
+        return HistoryPendingWork.objects.filter(pendingWorkID=self.work.pk).order_by('modifiedDate', 'pk')
+
+    def timeline(self, **kwargs):
+        return [(row.pk, row.modifiedDate, history_values(row))
+                for row in HistoryTimeline(PendingWork, self.work.pk, **kwargs)]
+
+    def test_compaction_round_trip(self):
+        before = self.timeline()
+        self.assertEqual(len(before), self.VERSIONS)
+        compact_history(0)
+        self.assertFalse(self.history().exists())
+        self.assertEqual(self.timeline(), before)
+
+        # The first entry holds every column, the rest only what changed
+        entries = CompactedHistory.objects.filter(objectID=self.work.pk).order_by('modifiedDate')
+        self.assertEqual([entry.changes for entry in entries], [before[0][2]] + [
+            {name: value for name, value in new.items() if old[name] != value}
+            for (_, _, old), (_, _, new) in zip(before, before[1:])
+        ])
+
+    def test_pruned_timeline_starts_with_a_full_snapshot(self):
+        before = self.timeline()
+        now = timezone.now()
+        metrics = {'compacted': 0, 'pruned': 0, 'bytes': 0}
+        compact_model(PendingWork, now - timedelta(days=2), metrics)  # versions 0-6 become diffs
+        prune_tenant(self.subAdmin.pk, now - timedelta(days=self.VERSIONS - 3 + 0.5), metrics)  # drops 0-2
+
+        self.assertEqual(self.timeline(), before[3:])
+        oldest = CompactedHistory.objects.filter(objectID=self.work.pk).order_by('modifiedDate').first()
+        self.assertEqual(oldest.historyID, before[3][0])
+        self.assertEqual(oldest.changes, before[3][2])
+
+    def test_newest_first_pages_cross_the_compacted_boundary(self):
+        newest_first = self.timeline()[::-1]
+        compact_model(PendingWork, timezone.now() - timedelta(days=self.VERSIONS // 2), {'compacted': 0, 'bytes': 0})
+        self.assertTrue(self.history().exists())
+
+        timeline = HistoryTimeline(PendingWork, self.work.pk, newest_first=True)
+        for limit in (1, 3, 5):
+            for offset in range(self.VERSIONS + 1):
+                with self.subTest(offset=offset, limit=limit):
+                    rows, total = timeline.page(offset, limit)
+                    self.assertEqual(total, self.VERSIONS)
+                    self.assertEqual([(row.pk, row.modifiedDate, history_values(row)) for row in rows],
+                                     newest_first[offset:offset + limit])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HistoryQueryCountTests(TestCase):
+    """An update page and one page of its history cost the same queries however long the history is."""
+    VERSIONS = 60
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        add_rows(self.subAdmin, 1)
+        login_subAdmin(self.client, self.subAdmin)
+        self.live = PendingWork.objects.get(subAdminID=self.subAdmin)
+        self.archived = ArchivedPendingWork.objects.get(subAdminID=self.subAdmin)
+        self.urls = [f'/user/{view}/{pk}/' for pk in (self.live.pk, self.archived.pk)
+                     for view in ('updatePendingWork', 'pendingWorkHistoryData')]
+
+    def add_history(self, count):
+        for pk in (self.live.pk, self.archived.pk):
+            record = get_record(PendingWork.objects.all(), ArchivedPendingWork.objects.all(), pk)
+            HistoryPendingWork.objects.bulk_create([history_row(record) for _ in range(count)])
+
+    def get(self, url, offset, size=10):
+        response = self.client.get(url, {'offset': offset, 'size': size}, secure=True)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def warm_count(self, url, offset, size=10):
+        self.get(url, offset, size)  # fill the account and option caches the first request loads
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(url, offset, size)
+        return len(queries), response
+
+    def add_versions(self, count):
+        """count compacted versions, then count more still in the history table."""
+        self.add_history(count)
+        compact_history(0)
+        self.add_history(count)
+
+    def offsets(self):
+        # The first page comes from compacted versions only, the second from both tables
+        compacted = CompactedHistory.objects.filter(objectID=self.live.pk).count()
+        return {'compacted': 0, 'both': compacted - 5}
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.add_versions(11)
+        counts = {(url, name): self.warm_count(url, offset)[0]
+                  for url in self.urls for name, offset in self.offsets().items()}
+
+        self.add_versions(self.VERSIONS)
+        total = 2 * (11 + self.VERSIONS)
+        for url in self.urls:
+            for name, offset in self.offsets().items():
+                with self.subTest(url=url, page=name):
+                    count, response = self.warm_count(url, offset)
+                    self.assertEqual(count, counts[url, name])
+                    if 'HistoryData' in url:
+                        data = response.json()
+                        self.assertEqual((len(data['rows']), data['total'], data['next']), (10, total, offset + 10))
+                        # Foreign keys are loaded per page, not per row
+                        self.assertEqual(self.warm_count(url, offset, size=20)[0], count)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class NameKeyConstraintTests(TestCase):
+    """Names differing only in case or spacing, and phones, are unique per sub-admin only."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin)
+        self.group = UpdatedGroup.objects.get(subAdminID=self.subAdmin)
+        self.company = UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Acme Corp',
+                                                     companyType='Pvt', groupID=self.group, userID=self.admin)
+        login_subAdmin(self.client, self.subAdmin)
+
+    def post(self, url, data):
+        """The message the request added last."""
+        response = self.client.post(f'/user/{url}', data, secure=True)
+        return str(list(get_messages(response.wsgi_request))[-1])
+
+    def add_client(self, companyName, phone):
+        return self.post('addClient', {'clientName': 'Client', 'companyName': companyName, 'clientPhone': phone})
+
+    def test_company_names_differing_in_case_or_spacing_are_rejected(self):
+        data = {'groupName': 'Group', 'companyName': '  ACME   corp ', 'companyType': 'Pvt'}
+        self.assertEqual(self.post('addCompany', data), "Company already exists.")
+        self.assertEqual(UpdatedCompany.objects.filter(subAdminID=self.subAdmin).count(), 1)
+
+        other = UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Beta', companyType='Pvt',
+                                              groupID=self.group, userID=self.admin)
+        self.assertEqual(self.post(f'updateCompany/{other.pk}/', data), "Company already exists.")
+        other.refresh_from_db()
+        self.assertEqual((other.companyName, other.companyKey), ('Beta', 'beta'))
+
+        # Another tenant may use the name
+        make_tenant(2)
+        self.client.logout()
+        login_subAdmin(self.client, SignUP.objects.get(subAdminPhone='9000000002'))
+        self.assertEqual(self.post('addCompany', data), "Company added successfully.")
+
+    def test_group_names_differing_in_case_or_spacing_are_rejected(self):
+        self.assertEqual(self.post('addGroup', {'groupName': ' GROUP'}), "Group already exists.")
+        self.assertEqual(self.post('addGroup', {'groupName': 'Group 2'}), "Group added successfully.")
+        self.assertEqual(UpdatedGroup.objects.filter(subAdminID=self.subAdmin).count(), 2)
+
+    def test_phone_is_unique_per_sub_admin(self):
+        other = make_tenant(2)
+        add_rows(other, 1)
+        phone = UpdatedClient.objects.get(subAdminID=other).clientPhone
+        self.assertEqual(self.add_client('Acme Corp', phone), "Client added successfully.")
+
+        UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Beta', companyType='Pvt',
+                                      groupID=self.group, userID=self.admin)
+        self.assertEqual(self.add_client('Beta', phone), "Phone number already exists.")
+        self.assertEqual(UpdatedClient.objects.filter(clientPhoneKey=phone_key(phone)).count(), 2)
+
+    def test_backfill_fills_legacy_keys_and_reports_duplicates(self):
+        UpdatedCompany.objects.filter(pk=self.company.pk).update(companyKey=None)
+        legacy = UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='ACME  CORP', companyType='Pvt',
+                                               groupID=self.group, userID=self.admin)
+        UpdatedCompany.objects.filter(pk=legacy.pk).update(companyKey=None)
+        # Until the backfill runs, rows without a key do not collide
+        self.assertEqual(UpdatedCompany.objects.filter(subAdminID=self.subAdmin, companyKey=None).count(), 2)
+
+        out = StringIO()
+        call_command('backfill_name_keys', stdout=out)
+        self.assertIn(f"UpdatedCompany {legacy.pk} ('ACME  CORP') duplicates UpdatedCompany {self.company.pk}",
+                      out.getvalue())
+        self.assertEqual(dict(UpdatedCompany.objects.values_list('pk', 'companyKey')),
+                         {self.company.pk: 'acme corp', legacy.pk: None})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LookupMapsEtagTests(TestCase):
+    """lookupMaps answers 304 until a company, group, client or form of the tenant is written."""
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        add_rows(self.subAdmin, 1)
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin)
+        self.company = UpdatedCompany.objects.get(subAdminID=self.subAdmin)
+        login_subAdmin(self.client, self.subAdmin)
+
+    def get(self, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get('/user/lookupMaps/', headers=headers, secure=True)
+
+    def assertChangesEtag(self, write):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+        write()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+        return response.json()
+
+    def test_unchanged_maps_answer_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['companies']['Company 0'][:4], ['Group', 'Pvt', 'Client 0', '7000000000'])
+        not_modified = self.get(response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+        # Writes to another tenant leave the ETag alone
+        add_rows(make_tenant(2), 1)
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+
+    def test_company_write_changes_etag(self):
+        data = self.assertChangesEtag(lambda: self.client.post(
+            '/user/addCompany', {'groupName': 'Group', 'companyName': 'Beta', 'companyType': 'LLP'}, secure=True))
+        self.assertEqual(data['companies']['Beta'][:2], ['Group', 'LLP'])
+
+    def test_client_write_changes_etag(self):
+        def rename():
+            client = UpdatedClient.objects.get(subAdminID=self.subAdmin)
+            client.clientName = 'Renamed'
+            save_with_history(client)
+        data = self.assertChangesEtag(rename)
+        self.assertEqual(data['companies']['Company 0'][2], 'Renamed')
+
+    def test_work_write_changes_etag(self):
+        data = self.assertChangesEtag(lambda: self.client.post(
+            '/user/addWork', {'formNo': 'Form 2', 'matter': 'Matter', 'filingDays': '15'}, secure=True))
+        self.assertEqual(data['forms']['Form 2'][:2], ['Matter', 15])
+
+
+class AlertTests(TestCase):
+    """The alert scan's due windows, its per-tenant batches and the digests it queues."""
+    TODAY = date(2026, 1, 15)
+
+    def setUp(self):
+        self.subAdmin = make_tenant()
+        self.admin = UpdatedUser.objects.get(subAdminID=self.subAdmin)
+        self.staff = UpdatedUser.objects.create(subAdminID=self.subAdmin, userName='Staff', userPhone='8000000001',
+                                                userUsername='staff', userPassword='x', isActive=True)
+        UpdatedUser.objects.create(subAdminID=self.subAdmin, userName='Client', userPhone='8000000002',
+                                   userUsername='client', userPassword='x', isActive=True, isClientUser=True)
+        self.group = UpdatedGroup.objects.get(subAdminID=self.subAdmin)
+        self.company = UpdatedCompany.objects.create(subAdminID=self.subAdmin, companyName='Acme', companyType='Pvt',
+                                                     groupID=self.group, userID=self.admin)
+
+    def work(self, days, company=None, **fields):
+        """Pending work whose actual due date is days from TODAY; the internal one is out of range."""
+        company = company or self.company
+        return PendingWork.objects.create(
+            subAdminID=company.subAdminID, formID=Work.objects.get(subAdminID=company.subAdminID), companyID=company,
+            eventDate=self.TODAY, internalDueDate=self.TODAY + timedelta(days=100),
+            actualDueDate=self.TODAY + timedelta(days=days), userID=fields.pop('userID', company.userID),
+            status=fields.pop('status', 'Pending'), billing='Pending', modifiedBy='Admin', **fields,
+        )
+
+    def refresh(self):
+        metrics = {'created': 0, 'updated': 0, 'removed': 0, 'emails': 0}
+        refresh_alerts(self.TODAY, metrics)
+        return metrics
+
+    def digest(self):
+        metrics = {'emails': 0}
+        send_digests(metrics)
+        return metrics['emails']
+
+    def alerts(self, user):
+        return set(Alert.objects.filter(userID=user).values_list('sourceModel', 'objectID', 'dateField', 'state'))
+
+    def test_due_window(self):
+        expired_days = settings.ALERT_EXPIRED_DAYS
+        first, last = self.work(-expired_days), self.work(DUE_SOON_DAYS - 1)
+        today = self.work(0, userID=self.staff)
+        self.work(-expired_days - 1), self.work(DUE_SOON_DAYS)
+        self.work(1, status='Approved'), self.work(1, isArchived=True)
+
+        midnight = timezone.make_aware(datetime.combine(self.TODAY + timedelta(days=DUE_SOON_DAYS), time.min))
+        dsc = UpdatedDSC.objects.create(subAdminID=self.subAdmin, clientName='Client', companyID=self.company,
+                                        status='IN', location='Office', clientPhone='7000000000', userID=self.admin,
+                                        renewalDate=midnight - timedelta(seconds=1))
+        UpdatedDSC.objects.create(subAdminID=self.subAdmin, clientName='Client', companyID=self.company, status='IN',
+                                  location='Office', clientPhone='7000000001', userID=self.admin, renewalDate=midnight)
+        mark = Trademark.objects.create(subAdminID=self.subAdmin, nameOfTrademark='Mark', nameOfApplicant='Applicant',
+                                        groupID=self.group, modifiedBy=self.admin, status1='Objected',
+                                        hearingDate=self.TODAY - timedelta(days=1))
+
+        self.refresh()
+        self.assertEqual(self.alerts(self.admin), {
+            ('PendingWork', first.pk, 'actualDueDate', 'expired'),
+            ('PendingWork', today.pk, 'actualDueDate', 'dueSoon'),
+            ('PendingWork', last.pk, 'actualDueDate', 'dueSoon'),
+            ('UpdatedDSC', dsc.pk, 'renewalDate', 'dueSoon'),
+            ('Trademark', mark.pk, 'hearingDate', 'expired'),
+        })
+        # Staff hear about work assigned to them and every row of their group that is not assigned
+        self.assertEqual(self.alerts(self.staff), {
+            ('PendingWork', today.pk, 'actualDueDate', 'dueSoon'),
+            ('UpdatedDSC', dsc.pk, 'renewalDate', 'dueSoon'),
+            ('Trademark', mark.pk, 'hearingDate', 'expired'),
+        })
+        self.assertFalse(Alert.objects.filter(userID__isClientUser=True).exists())
+
+    def test_each_batch_loads_only_its_tenants(self):
+        other = make_tenant(2)
+        otherCompany = UpdatedCompany.objects.create(subAdminID=other, companyName='Beta', companyType='Pvt',
+                                                     groupID=UpdatedGroup.objects.get(subAdminID=other),
+                                                     userID=UpdatedUser.objects.get(subAdminID=other))
+        mine, theirs = self.work(1, userID=self.staff), self.work(2, company=otherCompany)
+
+        with mock.patch('user.alerts.TENANT_BATCH_SIZE', 1), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh()['created'], 3)
+        loads = [query['sql'] for query in queries
+                 if query['sql'].startswith('SELECT') and 'FROM "user_alert"' in query['sql']]
+        self.assertEqual(len(loads), 2)
+        for sql, subAdmin in zip(loads, (self.subAdmin, other)):
+            self.assertIn(f'"user_alert"."subAdminID_id" IN ({subAdmin.pk})', sql)
+
+        # A later date makes the alert news again; a filed row loses its alerts
+        Alert.objects.update(isRead=True, emailedDate=timezone.now())
+        PendingWork.objects.filter(pk=theirs.pk).update(actualDueDate=self.TODAY + timedelta(days=3))
+        PendingWork.objects.filter(pk=mine.pk).update(status='Approved')
+        with mock.patch('user.alerts.TENANT_BATCH_SIZE', 1):
+            self.assertEqual(self.refresh(), {'created': 0, 'updated': 1, 'removed': 2, 'emails': 0})
+        alert = Alert.objects.get()
+        self.assertEqual((alert.objectID, alert.dueDate, alert.isRead, alert.emailedDate),
+                         (theirs.pk, self.TODAY + timedelta(days=3), False, None))
+
+    def test_one_digest_per_sub_admin(self):
+        other = make_tenant(2)
+        otherCompany = UpdatedCompany.objects.create(subAdminID=other, companyName='Beta', companyType='Pvt',
+                                                     groupID=UpdatedGroup.objects.get(subAdminID=other),
+                                                     userID=UpdatedUser.objects.get(subAdminID=other))
+        self.work(-2, userID=self.staff)
+        soon = self.work(2, userID=self.staff)
+        self.work(1, company=otherCompany)
+        self.refresh()
+        self.assertEqual(Alert.objects.filter(subAdminID=self.subAdmin).count(), 4)  # the assignee and the Admin user
+
+        self.assertEqual(self.digest(), 2)
+        mails = {email.recipients[0]: email for email in OutboxEmail.objects.all()}
+        self.assertEqual(set(mails), {self.subAdmin.subAdminEmail, other.subAdminEmail})
+        mine = mails[self.subAdmin.subAdminEmail]
+        self.assertEqual(mine.subject, 'FIND MY DSC: 2 due dates need attention')
+        self.assertIn('Passed:\n  - Due date 13-01-2026: Acme - Form 1', mine.body)
+        self.assertIn('Coming up:\n  - Due date 17-01-2026: Acme - Form 1', mine.body)
+        self.assertEqual(mails[other.subAdminEmail].subject, 'FIND MY DSC: 1 due date need attention')
+        self.assertFalse(Alert.objects.filter(emailedDate=None).exists())
+
+        # Only alerts not mailed yet go out again
+        self.assertEqual(self.digest(), 0)
+        PendingWork.objects.filter(pk=soon.pk).update(actualDueDate=self.TODAY + timedelta(days=3))
+        self.refresh()
+        self.assertEqual(self.digest(), 1)
+        self.assertNotIn('13-01-2026', OutboxEmail.objects.latest('pk').body)
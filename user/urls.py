@@ -13,6 +13,13 @@ urlpatterns = [
     path('listTrademark', views.listTrademark, name='listTrademark'),
     path('listPendingWorkReport', views.listPendingWorkReport, name='listPendingWorkReport'),
     path('listAnnualReport', views.listAnnualReport, name='listAnnualReport'),
+    path('listDSCData', views.listDSCData, name='listDSCData'),
+    path('listWorkData', views.listWorkData, name='listWorkData'),
+    path('listPendingWorkData', views.listPendingWorkData, name='listPendingWorkData'),
+    path('listAnnualData', views.listAnnualData, name='listAnnualData'),
+    path('listCompanyData', views.listCompanyData, name='listCompanyData'),
+    path('listClientData', views.listClientData, name='listClientData'),
+    path('listTrademarkData', views.listTrademarkData, name='listTrademarkData'),
     path('addDSC', views.addDSC, name='addDSC'),
     path('addWork', views.addWork, name='addWork'),
     path('addPendingWork', views.addPendingWork, name='addPendingWork'),
@@ -29,6 +36,16 @@ urlpatterns = [
     path('updateGroup/<int:groupID>/', views.updateGroup, name='updateGroup'),
     path('updateClient/<int:clientID>/', views.updateClient, name='updateClient'),
     path('updateTrademark/<int:trademarkID>/', views.updateTrademark, name='updateTrademark'),
+    path('dscHistoryData/<int:dscID>/', views.dscHistoryData, name='dscHistoryData'),
+    path('workHistoryData/<int:formID>/', views.workHistoryData, name='workHistoryData'),
+    path('pendingWorkHistoryData/<int:pendingWorkID>/', views.pendingWorkHistoryData, name='pendingWorkHistoryData'),
+    path('annualHistoryData/<int:annualFilingID>/', views.annualHistoryData, name='annualHistoryData'),
+    path('companyHistoryData/<int:companyID>/', views.companyHistoryData, name='companyHistoryData'),
+    path('groupHistoryData/<int:groupID>/', views.groupHistoryData, name='groupHistoryData'),
+    path('clientHistoryData/<int:clientID>/', views.clientHistoryData, name='clientHistoryData'),
+    path('trademarkHistoryData/<int:trademarkID>/', views.trademarkHistoryData, name='trademarkHistoryData'),
+    path('alertCount/', views.alertCount, name='alertCount'),
+    path('listAlerts', views.listAlerts, name='listAlerts'),
     path('deleteDSC', views.deleteDSC, name='deleteDSC'),
     path('deleteWork', views.deleteWork, name='deleteWork'),
     path('deletePendingWork', views.deletePendingWork, name='deletePendingWork'),
@@ -38,9 +55,10 @@ urlpatterns = [
     path('deleteClient', views.deleteClient, name='deleteClient'),
     path('deleteTrademark', views.deleteTrademark, name='deleteTrademark'),
     path('feedBack', views.feedBack, name='feedBack'),
-    path('fetchGroupName', views.fetchGroupName, name='fetchGroupName'),
-    path('fetchFormDetails', views.fetchFormDetails, name='fetchFormDetails'),
+    path('lookupMaps/', views.lookupMaps, name='lookupMaps'),
     path('updatePassword', views.updatePassword, name='updatePassword'),
+    path('importData', views.importData, name='importData'),
+    path('importErrors', views.importErrors, name='importErrors'),
 
 
 
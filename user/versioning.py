@@ -0,0 +1,233 @@
+import json
+from collections import defaultdict
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, prefetch_related_objects
+from .models import (
+    UpdatedUser, HistoryUser, UpdatedGroup, HistoryGroup, UpdatedCompany, HistoryCompany,
+    UpdatedClient, HistoryClient, UpdatedDSC, HistoryDSC, Work, HistoryWork,
+    PendingWork, HistoryPendingWork, AnnualFiling, HistoryAnnualFiling, Trademark, HistoryTrademark,
+    CompactedHistory, CompanyGroupMixin, NormalizedKeyMixin,
+)
+from .tenant_cache import NAMESPACE_MODELS, bump_tenant_version
+
+# Live model -> the table keeping a copy of every saved version of its rows
+HISTORY_MODELS = {
+    UpdatedUser: HistoryUser,
+    UpdatedGroup: HistoryGroup,
+    UpdatedCompany: HistoryCompany,
+    UpdatedClient: HistoryClient,
+    UpdatedDSC: HistoryDSC,
+    Work: HistoryWork,
+    PendingWork: HistoryPendingWork,
+    AnnualFiling: HistoryAnnualFiling,
+    Trademark: HistoryTrademark,
+}
+
+# When each history row was written; the rest use modifiedDate
+HISTORY_DATE_FIELDS = {
+    HistoryUser: 'userModifiedDate',
+    HistoryGroup: 'groupModifiedDate',
+    HistoryCompany: 'companyModifiedDate',
+    HistoryClient: 'clientModifiedDate',
+}
+
+
+def history_date_field(history_model):
+    return HISTORY_DATE_FIELDS.get(history_model, 'modifiedDate')
+
+
+def history_row(instance):
+    """Build the unsaved History* row for a saved live instance.
+
+    Every history column is copied from the live field with the same name,
+    except the one named after the live primary key, which links back to it.
+    """
+    live_model = type(instance)
+    history_model = HISTORY_MODELS[live_model]
+    live_pk = live_model._meta.pk.name
+
+    values = {}
+    for field in history_model._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.name == live_pk:
+            values[field.attname] = instance.pk
+        else:
+            values[field.attname] = getattr(instance, live_model._meta.get_field(field.name).attname)
+    return history_model(**values)
+
+
+def save_with_history(instance):
+    """Save a live row and its history row in one transaction."""
+    with transaction.atomic():
+        instance.save()
+        history = history_row(instance)
+        history.save()
+    return history
+
+
+class _Interleaved(Exception):
+    pass
+
+
+def _bulk_insert(model, instances, batch_size):
+    """bulk_create that sets the primary keys on MySQL too, which returns none from a multi-row INSERT.
+
+    Ids only grow, so the tenants' rows above the largest id seen before the
+    INSERT are the new ones, in insertion order. If another request added
+    rows for the same tenants in between, the count is off and the rows are
+    saved one by one instead.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(instances, batch_size=batch_size)
+    last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    new_rows = model.objects.filter(
+        subAdminID__in={instance.subAdminID_id for instance in instances}, pk__gt=last
+    ).order_by('pk')
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(instances, batch_size=batch_size)
+            pks = list(new_rows.values_list('pk', flat=True))
+            if len(pks) != len(instances):
+                raise _Interleaved
+    except _Interleaved:
+        for instance in instances:
+            instance.save(force_insert=True)
+        return instances
+    for instance, pk in zip(instances, pks):
+        instance.pk = pk
+    return instances
+
+
+def bulk_create_with_history(instances, batch_size=500):
+    """Insert many new live rows of one model together with their history rows.
+
+    Each table gets one INSERT per batch; on MySQL one more query reads the
+    new primary keys back (see _bulk_insert).
+    """
+    instances = list(instances)
+    if not instances:
+        return instances
+    model = type(instances[0])
+    # bulk_create skips save(), which fills these copied columns
+    for instance in instances:
+        if isinstance(instance, NormalizedKeyMixin):
+            instance.normalize_keys()
+        if isinstance(instance, CompanyGroupMixin):
+            instance.sync_company_group()
+
+    with transaction.atomic():
+        instances = _bulk_insert(model, instances, batch_size)
+        HISTORY_MODELS[model].objects.bulk_create(
+            [history_row(instance) for instance in instances], batch_size=batch_size
+        )
+
+    # bulk_create sends no post_save, so invalidate cached dropdowns here
+    namespaces = defaultdict(set)
+    for namespace, cached_model in NAMESPACE_MODELS.items():
+        if cached_model is model:
+            for instance in instances:
+                namespaces[instance.subAdminID_id].add(namespace)
+    for subAdminID, names in namespaces.items():
+        bump_tenant_version(subAdminID, *names)
+    return instances
+
+
+def history_values(row):
+    """A history row's columns as JSON values, keyed by attname (primary key and date left out)."""
+    skip = {row._meta.pk.attname, history_date_field(type(row))}
+    values = {field.attname: getattr(row, field.attname) for field in row._meta.concrete_fields if field.attname not in skip}
+    return json.loads(json.dumps(values, cls=DjangoJSONEncoder))
+
+
+def rebuild_history_row(history_model, state, entry):
+    """Unsaved history_model instance for a CompactedHistory entry, given the folded column state."""
+    values = {
+        field.attname: field.to_python(state[field.attname])
+        for field in history_model._meta.concrete_fields if field.attname in state
+    }
+    values[history_model._meta.pk.attname] = entry.historyID
+    values[history_date_field(history_model)] = entry.modifiedDate
+    return history_model(**values)
+
+
+class HistoryTimeline:
+    """Every saved version of one live row, oldest first unless newest_first.
+
+    Compacted versions are rebuilt from their diffs and put in front of the
+    History* rows still stored in full. page() loads one slice; iterating
+    loads the whole timeline on first use, like a queryset.
+    """
+
+    def __init__(self, live_model, object_id, newest_first=False):
+        self.history_model = HISTORY_MODELS[live_model]
+        self.live_pk = live_model._meta.pk.name
+        self.object_id = object_id
+        self.newest_first = newest_first
+        self._rows = None
+
+    def _entries(self):
+        return CompactedHistory.objects.filter(historyModel=self.history_model.__name__, objectID=self.object_id)
+
+    def _stored(self):
+        return self.history_model.objects.filter(**{self.live_pk: self.object_id}).order_by(
+            history_date_field(self.history_model), 'pk'
+        )
+
+    def _relations(self):
+        return [field.name for field in self.history_model._meta.concrete_fields
+                if field.is_relation and field.name != self.live_pk]
+
+    def page(self, offset=0, limit=None, related=None):
+        """(rows, total) for limit versions starting offset versions into the timeline.
+
+        related lists the foreign key paths to load along with the rows
+        (select_related for stored rows, one prefetch for rebuilt ones);
+        by default every direct foreign key.
+        """
+        related = self._relations() if related is None else related
+        # select_related() without paths would follow every foreign key
+        stored = self._stored().select_related(*related) if related else self._stored()
+        compacted_count = self._entries().count()
+        total = compacted_count + stored.count()
+
+        # The slice in oldest-first positions
+        end = total if limit is None else min(offset + limit, total)
+        start, end = (total - end, total - offset) if self.newest_first else (offset, end)
+        start = max(start, 0)
+        if start >= end:
+            return [], total
+
+        rows = []
+        if start < compacted_count:
+            state, rebuilt = {}, []
+            for position, entry in enumerate(self._entries().order_by('modifiedDate', 'historyID')[:end]):
+                state.update(entry.changes)
+                if position >= start:
+                    rebuilt.append(rebuild_history_row(self.history_model, state, entry))
+            prefetch_related_objects(rebuilt, *related)
+            rows += rebuilt
+        if end > compacted_count:
+            rows += list(stored[max(start - compacted_count, 0):end - compacted_count])
+        if self.newest_first:
+            rows.reverse()
+        return rows, total
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            self._rows = self.page()[0]
+        return self._rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def count(self):
+        return len(self.rows)
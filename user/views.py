@@ -1,69 +1,63 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from .models import *
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseRedirect, HttpResponse
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
 import re
+import csv
 from django.contrib.auth.hashers import check_password, make_password
-from datetime import date, datetime, timedelta
-from django.db.models import Max
-from django.utils.timezone import localtime
+from datetime import datetime
 from urllib.parse import urlparse
+from .principal import resolve_principal
+from .permissions import view_capability
+from .listing import paginate_list, list_json, list_projection, history_json
+from .sequences import next_srn
+from .tenant_cache import tenant_cached, tenant_version
+from .blockers import find_blockers
+from .versioning import save_with_history, HistoryTimeline
+from .archive import get_record, save_record, delete_archived
+from .plans import dsc_limit
+from .importer import IMPORT_COLUMNS, IMPORT_LABELS, Importer, ImportFileError, read_rows
+from .alerts import ALERT_URLS, DATE_LABELS
 
 def getUser(request):
-    userID = request.session.get('userID')
-    subAdminID = request.session.get('subAdminID')
-    superAdminID = request.session.get('superAdminID')
-
-    user = None
-    base = None
-    subAdmin = None
-    superAdmin = None
+    principal = resolve_principal(request)
 
     # Check if it's a user or subAdmin session
-    if userID:
-        try: 
-            user = UpdatedUser.objects.get(userID=userID)
-            base = 'base/userBase.html'
-            if user.isClientUser:
-                base = 'base/clientBase.html'
-        except UpdatedUser.DoesNotExist:
+    if principal.role == 'user':
+        if principal.user is None:
             messages.error(request, "User not found.")
             return redirect('userSignIn')
-    elif subAdminID:
-        try:
-            subAdmin = SignUP.objects.get(subAdminID=subAdminID)
-            user = UpdatedUser.objects.get(userPhone=subAdmin.subAdminPhone, isActive=False)
-            base = 'base/subAdminBase.html'
-            if subAdmin.freeUser:
-                base = 'base/freeUserBase.html'
-        except SignUP.DoesNotExist or UpdatedUser.DoesNotExist:
+    elif principal.role == 'subAdmin':
+        if principal.subAdmin is None or principal.user is None:
             messages.error(request, "SubAdmin not found.")
             return redirect('adminSignIn')
-    elif superAdminID:
-        try:
-            superAdmin = SuperAdmin.objects.get(superAdminID=superAdminID)
-            base = 'base/superAdminBase.html'
-        except SuperAdmin.DoesNotExist:
+    elif principal.role == 'superAdmin':
+        if principal.superAdmin is None:
             messages.error(request, "SuperAdmin not found.")
             return redirect('adminSignIn')
     else:
         return redirect('adminSignIn')
 
-    return {'user': user, 'base': base, 'subAdmin': subAdmin, 'superAdmin': superAdmin}
+    return {'user': principal.user, 'base': principal.base, 'subAdmin': principal.subAdmin, 'superAdmin': principal.superAdmin}
 
-def query(user, model):
+def query(user, model, listing=False):
     qs = model.objects.filter(subAdminID=user.subAdminID)
 
-    if model == UpdatedCompany or model == HistoryCompany or model == UpdatedUser or model == Trademark:
-        # If the user has a group assigned, filter by that group
-        if user.groupID:
-            qs = qs.filter(groupID=user.groupID)
+    # List pages load only the columns and relations their templates render
+    if listing:
+        qs = list_projection(qs)
 
-    elif model == UpdatedDSC or model == UpdatedClient or model == HistoryDSC or model == HistoryClient or model == AnnualFiling or model == PendingWork:
-        # If the user has a group assigned, filter by that group
+    if (model == UpdatedCompany or model == HistoryCompany or model == UpdatedUser or model == Trademark or model == ArchivedTrademark
+            or model in COMPANY_GROUP_MODELS):
+        # If the user has a group assigned, filter by that group (company rows carry a copy of it)
         if user.groupID:
-            qs = qs.filter(companyID__groupID=user.groupID)
+            qs = qs.filter(groupID=user.groupID)
 
     elif model == UpdatedGroup:
         if user.groupID:
@@ -71,83 +65,100 @@ def query(user, model):
 
     return qs
 
+# Dropdown sources for the add/update forms, cached per tenant and group until the rows change
+def companyOptions(user):
+    return tenant_cached(user.subAdminID_id, 'companies', f'options:{user.groupID_id}',
+                         lambda: list(query(user, UpdatedCompany).values('companyName')))
+
+def formOptions(user):
+    return tenant_cached(user.subAdminID_id, 'forms', 'options',
+                         lambda: list(Work.objects.filter(subAdminID=user.subAdminID).values('formNo')))
+
+def userOptions(user):
+    return tenant_cached(user.subAdminID_id, 'users', f'options:{user.groupID_id}',
+                         lambda: list(query(user, UpdatedUser).filter(isActive=True).values('userID', 'userName')))
+
+# Fields the add forms post primary keys in: field -> (model, name column typed instead, cache namespace)
+PICKED_FIELDS = {
+    'companyID': (UpdatedCompany, 'companyName', 'companies'),
+    'formID': (Work, 'formNo', 'forms'),
+    'userID': (UpdatedUser, 'userName', 'users'),
+    'groupID': (UpdatedGroup, 'groupName', 'groups'),
+}
+
+def nameIDs(user, field):
+    """{name_key: pk} of the rows a typed name can pick; None where several rows share the name."""
+    model, column, namespace = PICKED_FIELDS[field]
+
+    def load():
+        ids = {}
+        for pk, name in query(user, model).values_list('pk', column):
+            key = name_key(name)
+            ids[key] = None if key in ids else pk
+        return ids
+    return tenant_cached(user.subAdminID_id, namespace, f'ids:{user.groupID_id}', load)
+
+def pickedRows(user, data, **names):
+    """Rows picked in a POST, e.g. pickedRows(user, request.POST, companyID='companyName').
+
+    Each field holds a primary key; when the browser sent none (no script, or a
+    typed name) the name field is resolved through nameIDs instead. Every pick is
+    then checked in one tenant-scoped pk__in query per model, and a row whose
+    name no longer matches the one on screen is not picked. Returns
+    ({field: row or None}, set of fields whose name matched several rows).
+    """
+    ids, ambiguous = {}, set()
+    for field, nameField in names.items():
+        value = (data.get(field) or '').strip()
+        if value.isdigit():
+            ids[field] = int(value)
+        elif data.get(nameField):
+            ids[field] = nameIDs(user, field).get(name_key(data[nameField]), 0)
+            if ids[field] is None:
+                ambiguous.add(field)
+
+    rows = {field: None for field in names}
+    for field, pk in ids.items():
+        if not pk:
+            continue
+        model, column, _ = PICKED_FIELDS[field]
+        qs = query(user, model)
+        if model is UpdatedCompany:
+            qs = qs.select_related('groupID')  # the forms show the company's group
+        row = qs.in_bulk([pk]).get(pk)
+        typed = data.get(names[field])
+        if row and (not typed or name_key(getattr(row, column)) == name_key(typed)):
+            rows[field] = row
+    return rows, ambiguous
+
 def allow_only_client_users(view_func):
+    # Resolved once here; each request then needs a single bitwise test
+    required = view_capability(view_func.__name__)
+
     def wrapper(request, *args, **kwargs):
-        userID = request.session.get('userID')
-        subAdminID = request.session.get('subAdminID')
-        if userID:
-            try:
-                user = UpdatedUser.objects.get(userID=userID)
-                # If user is not a client user → allow full access
-                if not user.isClientUser:
-                    return view_func(request, *args, **kwargs)
-
-                allowed_views = [
-                         'updatePassword'  # Add more allowed view names here
-                    ]
-                if user.canReadOnly:
-                    if user.accessToPendingWork:
-                        allowed_views.append('listPendingWork')
-                    if user.accessToAnnual:
-                        allowed_views.append('listAnnual')
-                    if user.accessToTrademark:
-                        allowed_views.append('listTrademark')
-                
-                elif user.canReadWrite:
-                    # If user is a client user with read/write access → allow access to all views
-                    if user.accessToPendingWork:
-                        add_views = [
-                            'listPendingWork', 'addPendingWork', 'updatePendingWork', 'deletePendingWork'
-                        ]
-                        allowed_views.extend(add_views)
-                    if user.accessToAnnual:
-                        add_views = [
-                            'listAnnual', 'addAnnual', 'updateAnnual', 'deleteAnnual'
-                        ]
-                        allowed_views.extend(add_views)
-                    if user.accessToTrademark:
-                        add_views = [
-                            'listTrademark', 'addTrademark', 'updateTrademark', 'deleteTrademark'
-                        ]
-                        allowed_views.extend(add_views)
-                else:
-                    # If user has no specific permissions, redirect to a default page
-                    messages.error(request, "Access denied: You are not allowed to view this page.")
-                    return redirect('userSignIn')  # Or any default allowed view
-                
-                # Check if current view function is allowed
-                if view_func.__name__ in allowed_views:
-                    return view_func(request, *args, **kwargs)
-                else:
-                    messages.error(request, "Access denied: You are not allowed to view this page.")
-                    return redirect(request.META.get('HTTP_REFERER'))  # Or any default allowed view
-            except UpdatedUser.DoesNotExist:
+        principal = resolve_principal(request)
+        if principal.role == 'user':
+            if principal.user is None:
                 messages.error(request, "User not found.")
                 return redirect('userSignIn')
-            
-        elif subAdminID:
-            try:
-                subAdmin = SignUP.objects.get(subAdminID=subAdminID)
-                # If user is not a client user → allow full access
-                if not subAdmin.freeUser:
-                    return view_func(request, *args, **kwargs)
-
-                allowed_views_subAdmin = [
-                    'listDSC', 'addDSC', 'updateDSC', 'deleteDSC', 'listGroup', 'addGroup', 'updateGroup', 'deleteGroup', 'listCompany', 'addCompany', 'updateCompany', 'deleteCompany', 'feedBack', 'updatePassword', 'updateProfile', 'deleteProfile'
-                ]
-
-                # Check if current view function is allowed
-                if view_func.__name__ in allowed_views_subAdmin:
-                    return view_func(request, *args, **kwargs)
-                else:
-                    messages.error(request, "Access denied: You are not allowed to view this page.")
-                    return redirect(request.META.get('HTTP_REFERER'))  # Or any default allowed view
-            except SignUP.DoesNotExist:
+            if not principal.capabilities:
+                # Client user with no permission level
+                messages.error(request, "Access denied: You are not allowed to view this page.")
+                return redirect('userSignIn')
+
+        elif principal.role == 'subAdmin':
+            if principal.subAdmin is None:
                 messages.error(request, "SubAdmin not found.")
                 return redirect('adminSignIn')
         else:
             return redirect('adminSignIn')
-        
+
+        if principal.capabilities & required:
+            return view_func(request, *args, **kwargs)
+        messages.error(request, "Access denied: You are not allowed to view this page.")
+        return redirect(request.META.get('HTTP_REFERER'))  # Or any default allowed view
+
+    wrapper.capability = required
     return wrapper
 
 def parse_date(date_str):
@@ -175,18 +186,12 @@ def listDSC(request):
 
     whatsapp_url = request.session.pop('whatsapp_url', None)
 
-    updatedDSCs = query(user, UpdatedDSC).order_by('-modifiedDate')
-
-    today = date.today()
-    for dsc in updatedDSCs:
-        if dsc.renewalDate:
-            dsc.is_expired = dsc.renewalDate.date() < today
-        else:
-            dsc.is_expired = False  
+    page = paginate_list(request, 'listDSC', query(user, UpdatedDSC, listing=True).with_flags())
 
     context = {
         'base': base,
-        'updatedDSCs': updatedDSCs,
+        'updatedDSCs': page.rows,
+        'page': page,
         'user': user,
         'whatsurl': whatsapp_url,
     }
@@ -198,10 +203,11 @@ def listCompany(request):
     user = user_data.get('user')
     base = user_data.get('base')
 
-    companies = query(user, UpdatedCompany).order_by('-companyModifiedDate')
+    page = paginate_list(request, 'listCompany', query(user, UpdatedCompany, listing=True))
     context = {
         'base': base,
-        'companies': companies,
+        'companies': page.rows,
+        'page': page,
         'user': user,
     }
     return render(request, 'company/listCompany.html', context)
@@ -226,10 +232,11 @@ def listClient(request):
     user = user_data.get('user')
     base = user_data.get('base')
 
-    clients = query(user, UpdatedClient).order_by('-clientModifiedDate')
+    page = paginate_list(request, 'listClient', query(user, UpdatedClient, listing=True))
     context = {
         'base': base,
-        'clients': clients,
+        'clients': page.rows,
+        'page': page,
         'user': user,
     }
     return render(request, 'client/listClient.html', context)
@@ -240,11 +247,12 @@ def listWork(request):
     user = user_data.get('user')
     base = user_data.get('base')
 
-    work = Work.objects.filter(subAdminID=user.subAdminID).order_by('-modifiedDate')
+    page = paginate_list(request, 'listWork', query(user, Work, listing=True))
     context = {
         'base': base,
         'user': user,
-        'work': work
+        'work': page.rows,
+        'page': page,
     }
     return render(request, 'work/listWork.html', context)
 
@@ -256,36 +264,17 @@ def listPendingWork(request):
 
     show_archived = request.GET.get('archived', 'false').lower() == 'true'
 
-    # Base queryset: all pending work for this sub-admin and archive flag
-    qs = PendingWork.objects.filter(
-        subAdminID=user.subAdminID,
-        isArchived=show_archived
-    )
+    # Base queryset: pending work for this sub-admin (narrowed to the user's group), read from the archive table for ?archived=true
+    qs = query(user, ArchivedPendingWork, listing=True) if show_archived else query(user, PendingWork, listing=True).filter(isArchived=False)
 
-    # If the user has a group, narrow to work for companies in that group
-    if user.groupID:
-        qs = qs.filter(companyID__groupID=user.groupID)
-
-    # Order and annotate
-    pendingWork = qs.order_by('-isPinned', '-modifiedDate')
-    today = localtime().date()
-
-    for work in pendingWork:
-        if work.internalDueDate:
-            work.is_internal_expired = work.internalDueDate < today
-            work.is_internal_due_soon = today <= work.internalDueDate < (today + timedelta(days=4))
-        if work.actualDueDate:
-            work.is_actual_expired = work.actualDueDate < today
-            work.is_actual_due_soon = today <= work.actualDueDate < (today + timedelta(days=4))
-        work.is_approved              = (work.status == "Approved")
-        work.is_marked_for_resubmission = (work.status == "Sent For Resubmission")
-        work.is_pending_for_approval  = (work.status == "Pending For Approval")
-        work.is_rejected              = (work.status == "Rejected")
+    # Order, paginate and flag due dates and statuses in the same query
+    page = paginate_list(request, 'listPendingWork', qs.with_flags())
 
     return render(request, 'pendingWork/listPendingWork.html', {
         'base': base,
         'user': user,
-        'pendingWork': pendingWork,
+        'pendingWork': page.rows,
+        'page': page,
         'show_archived': show_archived,
     })
 
@@ -297,36 +286,16 @@ def listAnnual(request):
 
     show_archived = request.GET.get('archived', 'false').lower() == 'true'
 
-    # Base queryset: all annual filings for this sub-admin and archive flag
-    qs = AnnualFiling.objects.filter(
-        subAdminID=user.subAdminID,
-        isArchived=show_archived
-    )
+    # Base queryset: annual filings for this sub-admin (narrowed to the user's group), read from the archive table for ?archived=true
+    qs = query(user, ArchivedAnnualFiling, listing=True) if show_archived else query(user, AnnualFiling, listing=True).filter(isArchived=False)
+
+    page = paginate_list(request, 'listAnnual', qs.with_flags())
 
-    # If the user has a group, narrow to filings for companies in that group
-    if user.groupID:
-        qs = qs.filter(companyID__groupID=user.groupID)
-
-    annualFilies = qs.order_by('-isPinned', '-modifiedDate')
-
-    for af in annualFilies:
-        af.is_approved_DPT3 = (af.statusDPT3 == 'Approved')
-        af.is_approved_MGT14 = (af.statusMGT14 == 'Approved')
-        af.is_approved_AOC4 = (af.statusAOC4 == 'Approved')
-        af.is_approved_MGT7 = (af.statusMGT7 == 'Approved')
-        af.is_approved_Form11 = (af.statusForm11 == 'Approved')
-        af.is_approved_Form8 = (af.statusForm8 == 'Approved')
-
-        af.is_pending_DPT3 = (af.statusDPT3 == 'Pending')
-        af.is_pending_MGT14 = (af.statusMGT14 == 'Pending')
-        af.is_pending_AOC4 = (af.statusAOC4 == 'Pending')
-        af.is_pending_MGT7 = (af.statusMGT7 == 'Pending')
-        af.is_pending_Form11 = (af.statusForm11 == 'Pending')
-        af.is_pending_Form8 = (af.statusForm8 == 'Pending')
     return render(request, 'annualFiling/listAnnual.html', {
         'base': base,
         'user': user,
-        'annualFilies': annualFilies,
+        'annualFilies': page.rows,
+        'page': page,
         'show_archived': show_archived,
     })
 
@@ -338,29 +307,16 @@ def listTrademark(request):
 
     show_archived = request.GET.get('archived', 'false').lower() == 'true'
 
-    # Base queryset: all annual filings for this sub-admin and archive flag
-    qs = Trademark.objects.filter(
-        subAdminID=user.subAdminID,
-        isArchived=show_archived
-    )
-
-    # If the user has a group, narrow to filings for companies in that group
-    if user.groupID:
-        qs = qs.filter(groupID=user.groupID)
+    # Base queryset: trademarks for this sub-admin (narrowed to the user's group), read from the archive table for ?archived=true
+    qs = query(user, ArchivedTrademark, listing=True) if show_archived else query(user, Trademark, listing=True).filter(isArchived=False)
 
-    trademark = qs.order_by('-modifiedDate') 
-
-    for tm in trademark:
-        tm.is_objected = (tm.status1 == "Objected")
-        tm.is_accepted = (tm.status1 == "Accepted")  
-        tm.is_registered = (tm.status1 == "Registered")
-        tm.is_abandoned = (tm.status1 == "Abandoned")
-        tm.is_opposed = (tm.status1 == "Opposed")
+    page = paginate_list(request, 'listTrademark', qs.with_flags())
 
     return render(request, 'trademark/listTrademark.html', {
         'base': base,
         'user': user,
-        'trademark': trademark,
+        'trademark': page.rows,
+        'page': page,
         'show_archived': show_archived,
     })
 
@@ -370,14 +326,8 @@ def listPendingWorkReport(request):
     user = user_data.get('user')
     base = user_data.get('base')
 
-    # Base queryset
-    qs = PendingWork.objects.filter(subAdminID=user.subAdminID)
-
-    # Group‑gate: if user has a group, limit to that group’s companies
-    if user.groupID:
-        qs = qs.filter(companyID__groupID=user.groupID)
-
-    pendingWork = qs.all()
+    # Base queryset, limited to the user's group when they have one
+    pendingWork = list(query(user, PendingWork, listing=True)) + list(query(user, ArchivedPendingWork, listing=True))
 
     return render(request, 'report/listPendingWorkReport.html', {
         'base': base,
@@ -391,14 +341,8 @@ def listAnnualReport(request):
     user = user_data.get('user')
     base = user_data.get('base')
 
-    # Base queryset
-    qs = AnnualFiling.objects.filter(subAdminID=user.subAdminID)
-
-    # Group‑gate: if user has a group, limit to that group’s companies
-    if user.groupID:
-        qs = qs.filter(companyID__groupID=user.groupID)
-
-    annualFilies = qs.all()
+    # Base queryset, limited to the user's group when they have one
+    annualFilies = list(query(user, AnnualFiling, listing=True)) + list(query(user, ArchivedAnnualFiling, listing=True))
 
     return render(request, 'report/listAnnualReport.html', {
         'base': base,
@@ -407,6 +351,145 @@ def listAnnualReport(request):
     })
 
 
+
+# JSON data endpoints for the paginated lists (?cursor=, ?sort=, ?q=, ?size=)
+@allow_only_client_users
+def listDSCData(request):
+    user = getUser(request).get('user')
+    return list_json(request, 'listDSC', query(user, UpdatedDSC).with_flags())
+
+@allow_only_client_users
+def listCompanyData(request):
+    user = getUser(request).get('user')
+    return list_json(request, 'listCompany', query(user, UpdatedCompany))
+
+@allow_only_client_users
+def listClientData(request):
+    user = getUser(request).get('user')
+    return list_json(request, 'listClient', query(user, UpdatedClient))
+
+@allow_only_client_users
+def listWorkData(request):
+    user = getUser(request).get('user')
+    return list_json(request, 'listWork', Work.objects.filter(subAdminID=user.subAdminID))
+
+@allow_only_client_users
+def listPendingWorkData(request):
+    user = getUser(request).get('user')
+    show_archived = request.GET.get('archived', 'false').lower() == 'true'
+    qs = query(user, ArchivedPendingWork) if show_archived else query(user, PendingWork).filter(isArchived=False)
+    return list_json(request, 'listPendingWork', qs.with_flags())
+
+@allow_only_client_users
+def listAnnualData(request):
+    user = getUser(request).get('user')
+    show_archived = request.GET.get('archived', 'false').lower() == 'true'
+    qs = query(user, ArchivedAnnualFiling) if show_archived else query(user, AnnualFiling).filter(isArchived=False)
+    return list_json(request, 'listAnnual', qs)
+
+@allow_only_client_users
+def listTrademarkData(request):
+    user = getUser(request).get('user')
+    show_archived = request.GET.get('archived', 'false').lower() == 'true'
+    qs = query(user, ArchivedTrademark) if show_archived else query(user, Trademark).filter(isArchived=False)
+    return list_json(request, 'listTrademark', qs)
+
+
+# History panels of the update pages, loaded page by page when expanded (?offset=, ?size=)
+def historyNotFound(label):
+    return JsonResponse({'status': 'error', 'message': f'{label} not found.'}, status=404)
+
+@allow_only_client_users
+def dscHistoryData(request, dscID):
+    user = getUser(request).get('user')
+    if not query(user, UpdatedDSC).filter(dscID=dscID).exists():
+        return historyNotFound('DSC')
+    return history_json(request, HistoryTimeline(UpdatedDSC, dscID, newest_first=True))
+
+@allow_only_client_users
+def companyHistoryData(request, companyID):
+    user = getUser(request).get('user')
+    if not query(user, UpdatedCompany).filter(companyID=companyID).exists():
+        return historyNotFound('Company')
+    return history_json(request, HistoryTimeline(UpdatedCompany, companyID, newest_first=True))
+
+@allow_only_client_users
+def groupHistoryData(request, groupID):
+    user = getUser(request).get('user')
+    if not query(user, UpdatedGroup).filter(groupID=groupID).exists():
+        return historyNotFound('Group')
+    return history_json(request, HistoryTimeline(UpdatedGroup, groupID, newest_first=True))
+
+@allow_only_client_users
+def clientHistoryData(request, clientID):
+    user = getUser(request).get('user')
+    if not query(user, UpdatedClient).filter(clientID=clientID).exists():
+        return historyNotFound('Client')
+    return history_json(request, HistoryTimeline(UpdatedClient, clientID, newest_first=True))
+
+@allow_only_client_users
+def workHistoryData(request, formID):
+    user = getUser(request).get('user')
+    if not Work.objects.filter(formID=formID, subAdminID=user.subAdminID).exists():
+        return historyNotFound('Work')
+    return history_json(request, HistoryTimeline(Work, formID))
+
+@allow_only_client_users
+def pendingWorkHistoryData(request, pendingWorkID):
+    user = getUser(request).get('user')
+    if not (query(user, PendingWork).filter(pendingWorkID=pendingWorkID).exists()
+            or query(user, ArchivedPendingWork).filter(pendingWorkID=pendingWorkID).exists()):
+        return historyNotFound('Pending work')
+    return history_json(request, HistoryTimeline(PendingWork, pendingWorkID))
+
+@allow_only_client_users
+def annualHistoryData(request, annualFilingID):
+    user = getUser(request).get('user')
+    if not (query(user, AnnualFiling).filter(annualFilingID=annualFilingID).exists()
+            or query(user, ArchivedAnnualFiling).filter(annualFilingID=annualFilingID).exists()):
+        return historyNotFound('Annual Filing')
+    return history_json(request, HistoryTimeline(AnnualFiling, annualFilingID))
+
+@allow_only_client_users
+def trademarkHistoryData(request, trademarkID):
+    user = getUser(request).get('user')
+    if not (query(user, Trademark).filter(trademarkID=trademarkID).exists()
+            or query(user, ArchivedTrademark).filter(trademarkID=trademarkID).exists()):
+        return historyNotFound('Trademark')
+    return history_json(request, HistoryTimeline(Trademark, trademarkID))
+
+
+# Alerts kept by the scheduled scan (user/alerts.py); the menu polls alertCount for its badge
+ALERT_LIST_LIMIT = 500
+
+@allow_only_client_users
+def alertCount(request):
+    user = getUser(request).get('user')
+    counts = Alert.objects.filter(userID=user, isRead=False).aggregate(
+        count=Count('alertID'), expired=Count('alertID', filter=Q(state='expired'))
+    )
+    return JsonResponse({'status': 'success', **counts})
+
+@allow_only_client_users
+def listAlerts(request):
+    user_data = getUser(request)
+    user = user_data.get('user')
+    base = user_data.get('base')
+
+    alerts = list(Alert.objects.filter(userID=user).order_by('-state', 'dueDate', 'title')[:ALERT_LIST_LIMIT])
+    for alert in alerts:
+        alert.label = DATE_LABELS.get(alert.dateField, alert.dateField)
+        alert.url = reverse(ALERT_URLS[alert.sourceModel], args=[alert.objectID])
+    # Opening the page counts as having seen them
+    Alert.objects.filter(pk__in=[alert.pk for alert in alerts if not alert.isRead]).update(isRead=True)
+
+    return render(request, 'alerts/listAlerts.html', {
+        'base': base,
+        'user': user,
+        'alerts': alerts,
+    })
+
+
 # All Add Function are here
 @allow_only_client_users
 def addDSC(request):
@@ -419,31 +502,15 @@ def addDSC(request):
     except SignUP.DoesNotExist:
         messages.error(request, "SubAdmin not found.")
         return redirect('listDSC')
-    if not subAdmin.freeUser:
-        try:
-            # Fetch the user's subscription plan
-            subscription_plan = SubAdminSubscription.objects.get(subAdminID=user.subAdminID, isActive='True')
-            subscription_plan_name = subscription_plan.planID.planName.lower()
-            if subscription_plan_name == 'free trial':
-                max_dsc_allowed = 100
-            elif subscription_plan_name == 'basic':
-                max_dsc_allowed = 350
-            elif subscription_plan_name == 'standard':
-                max_dsc_allowed = 700
-            elif subscription_plan_name == 'premimum':
-                max_dsc_allowed = 1500
-            elif subscription_plan_name == 'premimum plus':
-                max_dsc_allowed = float('inf')
-            else:
-                max_dsc_allowed = 0  # fallback if plan is somehow invalid
-        except SubAdminSubscription.DoesNotExist:
-            messages.error(request, "Subscription plan not found.")
-            return redirect('listDSC')
-    else:
-        max_dsc_allowed = float('inf')  # Free users can add unlimited DSCs
+    try:
+        # Limit from the user's subscription plan (free users can add unlimited DSCs)
+        max_dsc_allowed = dsc_limit(subAdmin)
+    except SubAdminSubscription.DoesNotExist:
+        messages.error(request, "Subscription plan not found.")
+        return redirect('listDSC')
 
     existing_dsc_count = UpdatedDSC.objects.filter(subAdminID=user.subAdminID).count()
-    companies = query(user, UpdatedCompany).all()
+    companies = companyOptions(user)
 
     context = {
         'base': base,
@@ -479,11 +546,12 @@ def addDSC(request):
             messages.error(request, f"You can only add up to {max_dsc_allowed} DSCs based on your subscription plan.")
         else:
             subAdminID = user.subAdminID
-            company = query(user, UpdatedCompany).filter(companyName=companyName).first()
+            company = pickedRows(user, request.POST, companyID='companyName')[0]['companyID']
 
             if not company:
                 messages.error(request, "Company not found.")
                 form_data['companyName'] = ''
+                form_data['companyID'] = ''
                 form_data['receivedFrom'] = ''
                 form_data['deliveredTo'] = ''
                 
@@ -502,25 +570,7 @@ def addDSC(request):
                     userID=user,
                     subAdminID=subAdminID
                 )
-                dsc.save()
-
-                dscHistory = HistoryDSC(
-                    dscID=dsc,
-                    clientName=clientName,
-                    companyID=company,
-                    status=status,
-                    receivedBy=receivedBy,
-                    receivedFrom=receivedFrom,
-                    deliveredTo=deliveredTo,
-                    deliveredBy=deliveredBy,
-                    location=location,
-                    renewalDate=renewalDate,
-                    clientPhone=clientPhone,
-                    userID=user,
-                    subAdminID=subAdminID,
-                    modifiedDate=dsc.modifiedDate
-                )
-                dscHistory.save()
+                save_with_history(dsc)
 
                 # Send WhatsApp message based on status
                 if status == 'IN':
@@ -572,24 +622,16 @@ def addCompany(request):
             group = query(user, UpdatedGroup).filter(groupName=groupName).first()
 
             if group:
-                # Normalize the company name for case-insensitive comparison
-                companyName_normalized = companyName.lower()
-
-                if UpdatedCompany.objects.filter(companyName__iexact=companyName_normalized, subAdminID=subAdminID).exists():
+                company = UpdatedCompany(
+                    companyName=companyName,companyType=companyType, groupID=group, userID=user, subAdminID=subAdminID
+                )
+                try:
+                    # The (subAdminID, companyKey) constraint rejects names differing only in case or spacing
+                    save_with_history(company)
+                except IntegrityError:
                     messages.error(request, "Company already exists.")
                     form_data['companyName'] = ''  # Clear the company name in case of this error
                 else:
-                    company = UpdatedCompany(
-                        companyName=companyName,companyType=companyType, groupID=group, userID=user, subAdminID=subAdminID
-                    )
-                    company.save()
-
-                    companyHistory = HistoryCompany(
-                        companyID=company, companyName=companyName,companyType=companyType, groupID=group,
-                        userID=user, subAdminID=subAdminID, companyModifiedDate=company.companyModifiedDate
-                    )
-                    companyHistory.save()
-
                     messages.success(request, "Company added successfully.")
                     return HttpResponseRedirect(reverse('listCompany'))
             else:
@@ -621,24 +663,17 @@ def addGroup(request):
         else:
             if user:
                 subAdminID = user.subAdminID
-                # Normalize the group name to make it case-insensitive
-                groupName_normalized = groupName.lower()
-                if UpdatedGroup.objects.filter(groupName__iexact=groupName_normalized, subAdminID=subAdminID).exists():
+                group = UpdatedGroup(
+                    groupName=groupName, userID=user, subAdminID=subAdminID
+                )
+                try:
+                    # The (subAdminID, groupKey) constraint rejects names differing only in case or spacing
+                    save_with_history(group)
+                except IntegrityError:
                     messages.error(request, "Group already exists.")
                     return redirect(request.path)
-                else:
-                    group = UpdatedGroup(
-                        groupName=groupName, userID=user, subAdminID=subAdminID
-                    )
-                    group.save()
-
-                    groupHistory = HistoryGroup(
-                        groupID=group, groupName=groupName, userID=user,
-                        subAdminID=subAdminID, groupModifiedDate=group.groupModifiedDate
-                    )
-                    groupHistory.save()
-                    messages.success(request, "Group added successfully.")
-                    return HttpResponseRedirect(reverse('listGroup'))
+                messages.success(request, "Group added successfully.")
+                return HttpResponseRedirect(reverse('listGroup'))
 
     
     return render(request, 'group/addGroup.html', context)
@@ -685,25 +720,18 @@ def addClient(request):
             company = query(user, UpdatedCompany).filter(companyName=companyName).first()
 
             if company:
-                if UpdatedClient.objects.filter(clientPhone=clientPhone).exists():
+                # Create and save the new client
+                client = UpdatedClient(
+                    clientName=clientName, companyID=company, userID=user,
+                    clientPhone=clientPhone, subAdminID=subAdminID
+                )
+                try:
+                    # The (subAdminID, clientPhoneKey) constraint rejects a phone already on file
+                    save_with_history(client)
+                except IntegrityError:
                     messages.error(request, "Phone number already exists.")
                     form_data['clientPhone'] = ''  # Clear phone field
                 else:
-                    # Create and save the new client
-                    client = UpdatedClient(
-                        clientName=clientName, companyID=company, userID=user,
-                        clientPhone=clientPhone, subAdminID=subAdminID
-                    )
-                    client.save()
-
-                    # Save the client to the history
-                    clientHistory = HistoryClient(
-                        clientID=client, clientName=clientName, companyID=company,
-                        userID=user, clientPhone=clientPhone,
-                        subAdminID=subAdminID, clientModifiedDate=client.clientModifiedDate
-                    )
-                    clientHistory.save()
-
                     messages.success(request, "Client added successfully.")
                     return HttpResponseRedirect(reverse('listClient'))
             else:
@@ -757,17 +785,7 @@ def addWork(request):
                     filingDays=int(filingDays),
                     modifiedBy=user,
                 )
-                work.save()
-                historyWork = HistoryWork(
-                    formID=work,
-                    subAdminID=user.subAdminID,  # Assumes 'user' is an instance of SignUp
-                    formNo=formNo,
-                    matter=matter,
-                    filingDays=int(filingDays),
-                    modifiedBy=user,
-                    modifiedDate=work.modifiedDate
-                )
-                historyWork.save()
+                save_with_history(work)
                 messages.success(request, "Work added successfully.")
                 return HttpResponseRedirect(reverse('listWork'))
             except Exception as e:
@@ -784,9 +802,9 @@ def addPendingWork(request):
     user_data = getUser(request)
     user = user_data.get('user')
     base = user_data.get('base')
-    companies = query(user, UpdatedCompany)
-    forms = Work.objects.filter(subAdminID=user.subAdminID).all()
-    users = query(user, UpdatedUser).filter(isActive="True").all()
+    companies = companyOptions(user)
+    forms = formOptions(user)
+    users = userOptions(user)
     context = {
         'base': base,
         'companies': companies,
@@ -804,7 +822,7 @@ def addPendingWork(request):
         cutOffTime        = request.POST.get('cutOffTime')          
         srnNo             = request.POST.get('srnNo', '')
         internal_due_date = request.POST.get('internalDueDate')
-        user_id_str       = request.POST.get('userID')
+        user_name         = request.POST.get('userName')
         status            = request.POST.get('status')
         srn_date_str      = request.POST.get('srnDate', '')
         amt_str           = request.POST.get('amt', '')
@@ -816,15 +834,17 @@ def addPendingWork(request):
 
         form_data = request.POST.copy()
 
+        picked, ambiguous = pickedRows(user, request.POST, companyID='companyName', formID='formNo', userID='userName')
+        company = picked['companyID']
+
         if company_name:
-            try:
-                company = query(user, UpdatedCompany).get(companyName=company_name)
-                groupName = company.groupID.groupName
-            except UpdatedCompany.DoesNotExist:
+            if not company:
                 messages.error(request, "Company not found.")
                 form_data['companyName'] = ''
+                form_data['companyID'] = ''
                 context['form_data'] = form_data
                 return render(request, 'pendingWork/addPendingWork.html', context)
+            groupName = company.groupID.groupName
         else:
             groupName = ''
         
@@ -832,7 +852,7 @@ def addPendingWork(request):
         
         # Check required fields (optional fields for srnNo, srnDate, and amt are not required)
         if not all([form_no, company_name, event_date, actual_due_date, 
-                    cutOffTime, user_id_str, status, billing]):
+                    cutOffTime, user_name, status, billing]):
             messages.error(request, "Please fill all required fields.")
             context['form_data'] = form_data
             return render(request, 'pendingWork/addPendingWork.html', context)
@@ -841,29 +861,27 @@ def addPendingWork(request):
         amt = parse_amount(amt_str)
         fees = parse_amount(fees)
         
-        # Fetch foreign key objects:
-        try:
-            work_instance = Work.objects.get(formNo=form_no, subAdminID=user.subAdminID)
-            updated_user_instance = UpdatedUser.objects.get(userName=user_id_str, subAdminID=user.subAdminID)
-        except Work.DoesNotExist:
+        work_instance = picked['formID']
+        updated_user_instance = picked['userID']
+        if not work_instance:
             messages.error(request, "Work record not found.")
             form_data['formNo'] = ''
+            form_data['formID'] = ''
             form_data['matter'] = ''
             context['form_data'] = form_data
             return render(request, 'pendingWork/addPendingWork.html', context)
-        except UpdatedUser.DoesNotExist:
-            messages.error(request, "User record not found.")
+        if not updated_user_instance:
+            if 'userID' in ambiguous:
+                messages.error(request, "More than one user has that name; pick the user from the list.")
+            else:
+                messages.error(request, "User record not found.")
+                form_data['userName'] = ''
             form_data['userID'] = ''
             context['form_data'] = form_data
             return render(request, 'pendingWork/addPendingWork.html', context)
         
         # --- Auto-generate indexSRN for the current subAdminID ---
-        max_index_dict = PendingWork.objects.filter(subAdminID=user.subAdminID).aggregate(max_index=Max('indexSRN'))
-        max_index = max_index_dict.get('max_index')
-        try:
-            next_index = int(max_index) + 1 if max_index is not None else 1
-        except Exception:
-            next_index = 1
+        next_index = next_srn(user.subAdminID, PendingWork)
         # ----------------------------------------------------------
         
         # Create and save the PendingWork record (with indexSRN included)
@@ -889,33 +907,7 @@ def addPendingWork(request):
                 modifiedBy=user.userName,
                 indexSRN=next_index,  # New auto-increment field for the subAdmin
             )
-            pending_work.save()
-            
-            # Optionally, create a history record as well
-            history_pending_work = HistoryPendingWork(
-                pendingWorkID=pending_work,
-                subAdminID=user.subAdminID,
-                formID=work_instance,
-                companyID=company,
-                eventDate=event_date,
-                cutOffTime=cutOffTime,
-                internalDueDate=internal_due_date,
-                actualDueDate=actual_due_date,
-                userID=updated_user_instance,
-                status=status,
-                srnNo=srnNo,
-                srnDate=srnDate,
-                amt=amt,
-                remark=remark,
-                billing=billing,
-                fees=fees,
-                isArchived=isArchived,
-                isPinned=isPinned,
-                indexSRN=next_index,
-                modifiedBy=user.userName,
-                modifiedDate=pending_work.modifiedDate  # assuming this field exists
-            )
-            history_pending_work.save()
+            save_record(pending_work)
             
             messages.success(request, "Pending work added successfully.")
             return HttpResponseRedirect(reverse('listPendingWork'))
@@ -931,7 +923,7 @@ def addAnnual(request):
     user_data = getUser(request)
     user = user_data.get('user')
     base = user_data.get('base')
-    companies = query(user, UpdatedCompany)
+    companies = companyOptions(user)
     context = {
         'base': base,
         'user': user,
@@ -978,12 +970,11 @@ def addAnnual(request):
 
 
         
-        company = query(user, UpdatedCompany).filter(companyName=company_name).first()
-        groupName = company.groupID.groupName
+        company = pickedRows(user, request.POST, companyID='companyName')[0]['companyID']
         # Prepare form data to repopulate form in case of error
 
         form_data = request.POST.copy()
-        form_data['groupName'] = groupName
+        form_data['groupName'] = company.groupID.groupName if company else ''
 
         # Validate required fields
         if not company_name or not financialYear:
@@ -991,11 +982,9 @@ def addAnnual(request):
             context['form_data'] = form_data
             return render(request, 'annualFiling/addAnnual.html', context)
 
-        # Look up the company record using the provided company name and current sub-admin
-        try:
-            company = query(user, UpdatedCompany).get(companyName=company_name)
-        except UpdatedCompany.DoesNotExist:
+        if not company:
             messages.error(request, "Company not found.")
+            form_data['companyID'] = ''
             context['form_data'] = form_data
             return render(request, 'annualFiling/addAnnual.html', context)
 
@@ -1014,8 +1003,7 @@ def addAnnual(request):
         amtForm8  = parse_amount(amtForm8_str)
 
         try:
-            # Create the AnnualFiling record without indexSRN first.
-            af = AnnualFiling.objects.create(
+            af = AnnualFiling(
                 subAdminID     = user.subAdminID,
                 companyID      = company,
                 financialYear  = financialYear,
@@ -1055,58 +1043,8 @@ def addAnnual(request):
                 modifiedBy=user
             )
             # --- Auto-generate indexSRN for AnnualFiling for the current subAdminID ---
-            max_index_dict = AnnualFiling.objects.filter(subAdminID=user.subAdminID).aggregate(max_index=Max('indexSRN'))
-            max_index = max_index_dict.get('max_index')
-            try:
-                next_index = int(max_index) + 1 if max_index is not None else 1
-            except Exception:
-                next_index = 1
-            af.indexSRN = next_index
-            af.save()
-            # Optionally, create a history record for AnnualFiling.
-            historyaf = HistoryAnnualFiling(
-                annualFilingID = af,
-                subAdminID     = user.subAdminID,
-                companyID      = company,
-                financialYear  = financialYear,
-                
-                statusDPT3     = statusDPT3,
-                srnNoDPT3      = srnNoDPT3,
-                srnDateDPT3    = srnDateDPT3,
-                amtDPT3        = amtDPT3,
-                
-                statusMGT14    = statusMGT14,
-                srnNoMGT14     = srnNoMGT14,
-                srnDateMGT14   = srnDateMGT14,
-                amtMGT14       = amtMGT14,
-                
-                statusAOC4     = statusAOC4,
-                srnNoAOC4      = srnNoAOC4,
-                srnDateAOC4    = srnDateAOC4,
-                amtAOC4        = amtAOC4,
-                
-                statusMGT7     = statusMGT7,
-                srnNoMGT7      = srnNoMGT7,
-                srnDateMGT7    = srnDateMGT7,
-                amtMGT7        = amtMGT7,
-                
-                statusForm11   = statusForm11,
-                srnNoForm11    = srnNoForm11,
-                srnDateForm11  = srnDateForm11,
-                amtForm11      = amtForm11,
-                
-                statusForm8    = statusForm8,
-                srnNoForm8     = srnNoForm8,
-                srnDateForm8   = srnDateForm8,
-                amtForm8       = amtForm8,
-                
-                isArchived     = isArchived,
-                isPinned       = isPinned,
-                modifiedDate   = af.modifiedDate,
-                indexSRN       = af.indexSRN,
-                modifiedBy=user
-            )
-            historyaf.save()
+            af.indexSRN = next_srn(user.subAdminID, AnnualFiling)
+            save_record(af)
             messages.success(request, "Annual Filing added successfully!")
             return HttpResponseRedirect(reverse('listAnnual'))
         except Exception as e:
@@ -1172,16 +1110,17 @@ def addTrademark(request):
             context['form_data'] = form_data
             return render(request, 'trademark/addTrademark.html', context)
         
-        try:
-            group = query(user, UpdatedGroup).get(groupName=groupName)
-        except UpdatedGroup.DoesNotExist:
+        group = pickedRows(user, request.POST, groupID='groupName')[0]['groupID']
+        if not group:
             messages.error(request, "Group record not found.")
             form_data['groupName'] = ''
+            form_data['groupID'] = ''
             context['form_data'] = form_data
             return render(request, 'trademark/addTrademark.html', context)
 
         if applicationNo:
-            if query(user, Trademark).filter(applicationNo=applicationNo).exists():
+            if (query(user, Trademark).filter(applicationNo=applicationNo).exists()
+                    or query(user, ArchivedTrademark).filter(applicationNo=applicationNo).exists()):
                 messages.error(request, "Application No. already exists.")
                 form_data['applicationNo'] = ''
                 context['form_data'] = form_data
@@ -1193,12 +1132,7 @@ def addTrademark(request):
             return render(request, 'trademark/addTrademark.html', context)
         
         # --- Auto-generate indexSRN for the current subAdminID ---
-        max_index_dict = Trademark.objects.filter(subAdminID=user.subAdminID).aggregate(max_index=Max('indexSRN'))
-        max_index = max_index_dict.get('max_index')
-        try:
-            next_index = int(max_index) + 1 if max_index is not None else 1
-        except Exception:
-            next_index = 1
+        next_index = next_srn(user.subAdminID, Trademark)
         
         try:
             trademark = Trademark(
@@ -1222,33 +1156,7 @@ def addTrademark(request):
                 modifiedBy=user,
                 indexSRN=next_index
             )
-            trademark.save()
-            
-            # Optionally, create a history record as well
-            history_trademark = HistoryTrademark(
-                trademarkID=trademark,
-                subAdminID=trademark.subAdminID,
-                nameOfTrademark=trademark.nameOfTrademark,
-                applicationNo=trademark.applicationNo,
-                classNo=trademark.classNo,
-                nameOfApplicant=trademark.nameOfApplicant,
-                dateOfApp=trademark.dateOfApp,
-                status1=trademark.status1,
-                status2=trademark.status2,
-                hearingDate=trademark.hearingDate,
-                remark=trademark.remark,
-                groupID=trademark.groupID,
-                oppDate=trademark.oppDate,
-                lastDate=trademark.lastDate,
-                expiryDate=trademark.expiryDate,
-                fees=trademark.fees,
-                feesStatus=trademark.feesStatus,
-                isArchived=trademark.isArchived,
-                modifiedBy=user,
-                indexSRN=trademark.indexSRN,
-                modifiedDate=trademark.modifiedDate  # assuming this field exists
-            )
-            history_trademark.save()
+            save_record(trademark)
             
             messages.success(request, "Trademark added successfully.")
             return HttpResponseRedirect(reverse('listTrademark'))
@@ -1267,10 +1175,9 @@ def updateDSC(request, dscID):
     user = user_data.get('user')
     base = user_data.get('base')
 
-    companies = query(user, UpdatedCompany)
+    companies = companyOptions(user)
     try:
         dsc = query(user, UpdatedDSC).get(dscID=dscID)
-        dscHistory = query(user, HistoryDSC).filter(dscID=dscID).order_by('-modifiedDate')
     except UpdatedDSC.DoesNotExist:
         messages.error(request, "DSC not found.")
         return redirect('listDSC')
@@ -1290,7 +1197,7 @@ def updateDSC(request, dscID):
     context = {
         'base': base,
         'dsc': dsc,
-        'dscHistory': dscHistory,
+        'historyUrl': reverse('dscHistoryData', args=[dscID]),
         'user': user,
         'companies': companies,
         'options': ['IN', 'OUT'],
@@ -1344,15 +1251,7 @@ def updateDSC(request, dscID):
                         whatsapp_url = send_whatsapp_message(phone_number=clientPhone, client_name=clientName, status=status, person=dsc.deliveredTo)
 
                     dsc.clientPhone = clientPhone
-                    dsc.save()
-
-                    # Save history
-                    dscHistory = HistoryDSC(
-                        dscID=dsc, clientName=clientName, companyID=company, status=status, receivedBy=receivedBy, 
-                        receivedFrom=receivedFrom, deliveredTo=deliveredTo, deliveredBy=deliveredBy, location=location, renewalDate=renewalDate, 
-                        clientPhone=clientPhone, userID=user, subAdminID=user.subAdminID, modifiedDate=dsc.modifiedDate
-                    )
-                    dscHistory.save()
+                    save_with_history(dsc)
 
                     # Send WhatsApp message
                     messages.success(request, "DSC updated successfully.")
@@ -1374,7 +1273,6 @@ def updateCompany(request, companyID):
     groups = query(user, UpdatedGroup)
     try:
         company = query(user, UpdatedCompany).get(companyID=companyID)
-        companyHistory = query(user, HistoryCompany).filter(companyID=companyID).all().order_by('-companyModifiedDate')
     except UpdatedCompany.DoesNotExist:
         messages.error(request, "Company not found.")
         return redirect('listCompany')
@@ -1382,7 +1280,7 @@ def updateCompany(request, companyID):
         'base': base,
         'company': company,
         'groups': groups,
-        'companyHistory': companyHistory,
+        'historyUrl': reverse('companyHistoryData', args=[companyID]),
         'user': user
     }
     if request.method == 'POST':
@@ -1399,25 +1297,22 @@ def updateCompany(request, companyID):
                 group = query(user, UpdatedGroup).filter(groupName=groupName).first()
 
                 if group:
-                    companyName_normalized = companyName.lower()
-                    if UpdatedCompany.objects.filter(companyName__iexact=companyName_normalized, companyType=companyType, groupID=group).exclude(companyID=companyID).exists():
+                    company.companyName = companyName
+                    company.companyType = companyType
+                    movedGroup = company.groupID_id != group.groupID
+                    company.groupID = group
+                    company.userID = user
+                    try:
+                        with transaction.atomic():
+                            save_with_history(company)
+                            if movedGroup:
+                                company.sync_row_groups()
+                    except IntegrityError:
                         messages.error(request, "Company already exists.")
                         return redirect(request.path)
-                    else:
-                        company.companyName = companyName
-                        company.companyType = companyType
-                        company.groupID = group
-                        company.userID = user
-                        company.save()
-
-                        companyHistory = HistoryCompany(
-                            companyID=company, companyName=companyName, companyType=companyType, groupID=group,
-                            userID=user, subAdminID=user.subAdminID, companyModifiedDate=company.companyModifiedDate
-                        )
-                        companyHistory.save()
-
-                        messages.success(request, "Company updated successfully.")
-                        return redirect(request.path)
+
+                    messages.success(request, "Company updated successfully.")
+                    return redirect(request.path)
                 else:
                     messages.error(request, "Group not found.")
                     return redirect(request.path)
@@ -1432,7 +1327,6 @@ def updateGroup(request, groupID):
         
     try:
         group = UpdatedGroup.objects.get(groupID=groupID)
-        groupHistory = HistoryGroup.objects.filter(groupID=groupID).all().order_by('-groupModifiedDate')
     except UpdatedGroup.DoesNotExist:
         messages.error(request, "Group not found.")
         return redirect('listGroup')
@@ -1440,7 +1334,7 @@ def updateGroup(request, groupID):
         'base': base,
         'group': group,
         'user': user,
-        'groupHistory': groupHistory
+        'historyUrl': reverse('groupHistoryData', args=[groupID]),
     }
 
     if request.method == 'POST':
@@ -1451,22 +1345,14 @@ def updateGroup(request, groupID):
             return redirect(request.path)
         else:
             if user:
-                groupName_normalized = groupName.lower()
-                # Check if the group already exists with the new name
-                if UpdatedGroup.objects.filter(groupName__iexact=groupName_normalized).exclude(groupID=groupID).exists():
-                    messages.error(request, "Group already exists.")
-                    return redirect(request.path)
-                
                 group.groupName = groupName
                 group.userID = user
                 group.subAdminID = user.subAdminID
-                group.save()
-
-                groupHistory = HistoryGroup(
-                    groupID=group, groupName=groupName, userID=user,
-                    subAdminID=user.subAdminID, groupModifiedDate=group.groupModifiedDate
-                )
-                groupHistory.save()
+                try:
+                    save_with_history(group)
+                except IntegrityError:
+                    messages.error(request, "Group already exists.")
+                    return redirect(request.path)
 
                 messages.success(request, "Group updated successfully.")
                 return redirect(request.path)
@@ -1481,7 +1367,6 @@ def updateClient(request, clientID):
 
     try:
         client = query(user, UpdatedClient).get(clientID=clientID)
-        clientHistory = query(user, HistoryClient).filter(clientID=clientID).all().order_by('-clientModifiedDate')
     except UpdatedClient.DoesNotExist:
         messages.error(request, "Client not found.")
         return redirect('listClient')
@@ -1489,7 +1374,7 @@ def updateClient(request, clientID):
     context = {
         'base': base,
         'client': client,
-        'clientHistory': clientHistory,
+        'historyUrl': reverse('clientHistoryData', args=[clientID]),
         'user': user
     }
 
@@ -1514,24 +1399,15 @@ def updateClient(request, clientID):
 
         if user:
             if client:
-                # Check if the phone number or email already exists
-                if UpdatedClient.objects.filter(clientPhone=clientPhone, clientName=clientName).exclude(clientID=clientID).exists():
-                    messages.error(request, "Phone number already exists.")
-                    return redirect(request.path)
-
                 # Update client details
                 client.clientName = clientName
                 client.userID = user
                 client.clientPhone = clientPhone
-                client.save()
-
-                # Update client history
-                clientHistory = HistoryClient(
-                    clientID=client, clientName=clientName, companyID=client.companyID,
-                    userID=user, clientPhone=clientPhone,
-                    subAdminID=user.subAdminID, clientModifiedDate=client.clientModifiedDate
-                )
-                clientHistory.save()
+                try:
+                    save_with_history(client)
+                except IntegrityError:
+                    messages.error(request, "Phone number already exists.")
+                    return redirect(request.path)
 
                 messages.success(request, "Client updated successfully.")
                 return redirect(request.path)
@@ -1549,14 +1425,13 @@ def updateWork(request, formID):
     
     try:
         work = Work.objects.get(formID=formID, subAdminID=user.subAdminID)
-        historyWork = HistoryWork.objects.filter(formID=work.formID).all()
     except Work.DoesNotExist:
         messages.error(request, "Work not found.")
         return redirect('listWork')
     
     context = {
         'base': base,
-        'historyWork': historyWork,
+        'historyUrl': reverse('workHistoryData', args=[formID]),
         'work': work
     }
     
@@ -1591,18 +1466,7 @@ def updateWork(request, formID):
                 work.matter = matter
                 work.filingDays = int(filingDays)
                 work.modifiedBy = user
-                work.save()
-
-                historyWork = HistoryWork(
-                    formID=work,
-                    subAdminID=user.subAdminID,  # Assumes 'user' is an instance of SignUp
-                    formNo=formNo,
-                    matter=matter,
-                    filingDays=int(filingDays),
-                    modifiedBy=user,
-                    modifiedDate=work.modifiedDate
-                )
-                historyWork.save()
+                save_with_history(work)
 
                 messages.success(request, "Work updated successfully.")
                 return redirect(request.path)
@@ -1631,13 +1495,12 @@ def updatePendingWork(request, pendingWorkID):
     base = user_data.get('base')
     
     # Retrieve companies, forms, and users for the form dropdowns
-    companies = query(user,UpdatedCompany)
-    forms = Work.objects.filter(subAdminID=user.subAdminID).all()
-    users = query(user, UpdatedUser).filter(isActive="True").all()
+    companies = companyOptions(user)
+    forms = formOptions(user)
+    users = userOptions(user)
 
     try:
-        pending_work = query(user, PendingWork).get(pendingWorkID=pendingWorkID)
-        historyPendingWork = HistoryPendingWork.objects.filter(pendingWorkID=pending_work.pendingWorkID)
+        pending_work = get_record(query(user, PendingWork), query(user, ArchivedPendingWork), pendingWorkID)
     except PendingWork.DoesNotExist:
         messages.error(request, "Pending work not found.")
         return redirect('listPendingWork') 
@@ -1648,7 +1511,7 @@ def updatePendingWork(request, pendingWorkID):
         'users': users,
         'user': user,
         'pending_work': pending_work,
-        'historyPendingWork': historyPendingWork
+        'historyUrl': reverse('pendingWorkHistoryData', args=[pendingWorkID]),
     }
     
     if request.method == 'POST':
@@ -1738,31 +1601,7 @@ def updatePendingWork(request, pendingWorkID):
             pending_work.isPinned         = isPinned
             pending_work.modifiedBy       = user.userName
         
-            pending_work.save()
-
-            history_pending_work = HistoryPendingWork(
-                pendingWorkID=pending_work,
-                subAdminID=user.subAdminID,
-                formID=work_instance,
-                companyID=company_instance,
-                eventDate=event_date,
-                cutOffTime=cutOffTime,
-                internalDueDate=internal_due_date,
-                actualDueDate=actual_due_date,
-                userID=updated_user_instance,
-                status=status,
-                srnNo=srnNo_input,
-                srnDate=srnDate,
-                amt=amt,
-                remark=remark,
-                billing=billing,
-                fees=fees,
-                isArchived=isArchived,
-                isPinned=isPinned,
-                modifiedBy=user.userName,
-                modifiedDate=pending_work.modifiedDate
-            )
-            history_pending_work.save()
+            save_record(pending_work)
             messages.success(request, "Pending work updated successfully.")
             return redirect(request.path)
         except Exception as e:
@@ -1803,11 +1642,10 @@ def updateAnnual(request, annualFilingID):
     user_data = getUser(request)
     user = user_data.get('user')
     base = user_data.get('base')
-    companies = query(user, UpdatedCompany)
+    companies = companyOptions(user)
 
     try:
-        annual_filing = query(user, AnnualFiling).get(annualFilingID=annualFilingID)
-        historyAnnualFiling = HistoryAnnualFiling.objects.filter(annualFilingID=annual_filing.annualFilingID)
+        annual_filing = get_record(query(user, AnnualFiling), query(user, ArchivedAnnualFiling), annualFilingID)
     except AnnualFiling.DoesNotExist:
         messages.error(request, "Annual Filing not found.")
         return redirect('listAnnual')
@@ -1816,7 +1654,7 @@ def updateAnnual(request, annualFilingID):
         'base': base,
         'user': user,
         'companies': companies,
-        'historyAnnualFiling': historyAnnualFiling,
+        'historyUrl': reverse('annualHistoryData', args=[annualFilingID]),
         'annual_filing': annual_filing
     }
     
@@ -1934,50 +1772,7 @@ def updateAnnual(request, annualFilingID):
             annual_filing.isArchived    = isArchived
             annual_filing.isPinned      = isPinned
             annual_filing.modifiedBy = user
-            annual_filing.save()
-
-            historyaf = HistoryAnnualFiling(
-                annualFilingID = annual_filing,
-                subAdminID     = user.subAdminID,
-                companyID      = company,
-                financialYear  = financialYear,
-                
-                statusDPT3     = statusDPT3,
-                srnNoDPT3      = srnNoDPT3,
-                srnDateDPT3    = srnDateDPT3,
-                amtDPT3        = amtDPT3,
-                
-                statusMGT14    = statusMGT14,
-                srnNoMGT14     = srnNoMGT14,
-                srnDateMGT14   = srnDateMGT14,
-                amtMGT14       = amtMGT14,
-                
-                statusAOC4     = statusAOC4,
-                srnNoAOC4      = srnNoAOC4,
-                srnDateAOC4    = srnDateAOC4,
-                amtAOC4        = amtAOC4,
-                
-                statusMGT7     = statusMGT7,
-                srnNoMGT7      = srnNoMGT7,
-                srnDateMGT7    = srnDateMGT7,
-                amtMGT7        = amtMGT7,
-                
-                statusForm11   = statusForm11,
-                srnNoForm11    = srnNoForm11,
-                srnDateForm11  = srnDateForm11,
-                amtForm11      = amtForm11,
-                
-                statusForm8    = statusForm8,
-                srnNoForm8     = srnNoForm8,
-                srnDateForm8   = srnDateForm8,
-                amtForm8       = amtForm8,
-                
-                isArchived     = isArchived,
-                isPinned       = isPinned,
-                modifiedBy=user,
-                modifiedDate   = annual_filing.modifiedDate
-            )
-            historyaf.save()
+            save_record(annual_filing)
             messages.success(request, "Annual Filing updated successfully!")
             return redirect(request.path)
         except Exception as e:
@@ -2037,8 +1832,7 @@ def updateTrademark(request, trademarkID):
 
     groups = query(user, UpdatedGroup)
     try:
-        trademark = query(user, Trademark).get(trademarkID=trademarkID)
-        historyTrademark = HistoryTrademark.objects.filter(trademarkID=trademark.trademarkID)
+        trademark = get_record(query(user, Trademark), query(user, ArchivedTrademark), trademarkID)
     except Trademark.DoesNotExist:  
         messages.error(request, "Trademark not found.")
         return redirect('listTrademark')
@@ -2047,7 +1841,7 @@ def updateTrademark(request, trademarkID):
         'user': user,
         'groups': groups,
         'trademark': trademark,
-        'historyTrademark': historyTrademark
+        'historyUrl': reverse('trademarkHistoryData', args=[trademarkID]),
     }
     
     if request.method == 'POST':
@@ -2105,7 +1899,8 @@ def updateTrademark(request, trademarkID):
             return render(request, 'trademark/updateTrademark.html', context)
         
         if applicationNo:
-            if query(user, Trademark).filter(applicationNo=applicationNo).exclude(trademarkID=trademarkID).exists():
+            if (query(user, Trademark).filter(applicationNo=applicationNo).exclude(trademarkID=trademarkID).exists()
+                    or query(user, ArchivedTrademark).filter(applicationNo=applicationNo).exclude(trademarkID=trademarkID).exists()):
                 messages.error(request, "Application No. already exists.")
                 form_data['applicationNo'] = ''
                 context['form_data'] = form_data
@@ -2135,32 +1930,7 @@ def updateTrademark(request, trademarkID):
             trademark.isArchived=isArchived
             trademark.modifiedBy=user
         
-            trademark.save()
-
-            history_trademark = HistoryTrademark(
-                subAdminID=user.subAdminID,
-                trademarkID=trademark,
-                nameOfTrademark=trademark.nameOfTrademark,
-                applicationNo=trademark.applicationNo,
-                classNo=trademark.classNo,
-                nameOfApplicant=trademark.nameOfApplicant,
-                dateOfApp=trademark.dateOfApp,
-                status1=trademark.status1,
-                status2=trademark.status2,
-                hearingDate=trademark.hearingDate,
-                remark=trademark.remark,
-                groupID=trademark.groupID,
-                oppDate=trademark.oppDate,
-                lastDate=trademark.lastDate,
-                expiryDate=trademark.expiryDate,
-                fees=trademark.fees,
-                feesStatus=trademark.feesStatus,
-                isArchived=trademark.isArchived,
-                modifiedBy=user,
-                indexSRN=trademark.indexSRN,
-                modifiedDate=trademark.modifiedDate  # assuming this field exists
-            )
-            history_trademark.save()
+            save_record(trademark)
             messages.success(request, "Trademark updated successfully.")
             return redirect(request.path)
         except Exception as e:
@@ -2225,20 +1995,14 @@ def deleteCompany(request):
                 messages.error(request, "No companies selected for deletion.")
             else:
                 companies_to_delete = query(user, UpdatedCompany).filter(companyID__in=companyIDs)
-                undeletable_companies = []
-
-                for company in companies_to_delete:
-                    # Check if there are clients or DSCs associated with the company
-                    has_clients = query(user, UpdatedClient).filter(companyID=company.companyID).exists()
-                    has_dscs = query(user, UpdatedDSC).filter(companyID=company.companyID).exists()
-                    has_pending_work = PendingWork.objects.filter(companyID=company.companyID).exists()
-                    has_annual = AnnualFiling.objects.filter(companyID=company.companyID).exists()
+                companyNames = dict(companies_to_delete.values_list('companyID', 'companyName'))
 
-                    if has_clients or has_dscs or has_pending_work or has_annual:
-                        undeletable_companies.append(company.companyID)
+                # Clients, DSCs, pending work or annual filings keep a company from being deleted
+                blockers = find_blockers(UpdatedCompany, companyNames)
 
-                if undeletable_companies:
-                    messages.error(request,f"Phone Book / DSC exist. You can't delete Company.")
+                if blockers:
+                    for companyID, reasons in blockers.items():
+                        messages.error(request, f"You can't delete Company {companyNames[companyID]}: {', '.join(reasons)} exist.")
                 else:
                     count, _ = companies_to_delete.delete()
                     if count > 0:
@@ -2252,6 +2016,7 @@ def deleteCompany(request):
 
 @allow_only_client_users
 def deleteGroup(request): 
+    user = getUser(request).get('user')
     if request.method == 'POST':
         groupIDs = request.POST.getlist('groupIDs')
         confirmation = request.POST.get('deleteGroup')
@@ -2259,23 +2024,16 @@ def deleteGroup(request):
             if not groupIDs:
                 messages.error(request, "No groups selected for deletion.")
             else:
-                groups_to_delete = UpdatedGroup.objects.filter(groupID__in=groupIDs)
-                undeletable_groups = []
-
-                for group in groups_to_delete:
-                    # Check if there are companies, clients, or DSCs associated with the group
-                    has_companies = UpdatedCompany.objects.filter(groupID=group.groupID).exists()
-                    has_clients = UpdatedClient.objects.filter(companyID__groupID=group.groupID).exists()
-                    has_dscs = UpdatedDSC.objects.filter(companyID__groupID=group.groupID).exists()
-                    has_pending_work = PendingWork.objects.filter(companyID__groupID=group.groupID).exists()
-                    has_annual = AnnualFiling.objects.filter(companyID__groupID=group.groupID).exists()
-                    has_trademark = Trademark.objects.filter(groupID=group.groupID).exists()
-
-                    if has_companies or has_clients or has_dscs or has_pending_work or has_annual or has_trademark:
-                        undeletable_groups.append(group.groupID)
-
-                if undeletable_groups:
-                    messages.error(request, "Company / Phone Book / DSC exist. You can't delete Group.")
+                groups_to_delete = query(user, UpdatedGroup).filter(groupID__in=groupIDs)
+                groupNames = dict(groups_to_delete.values_list('groupID', 'groupName'))
+
+                # Companies or trademarks keep a group from being deleted; clients, DSCs,
+                # pending work and annual filings always hang off one of its companies
+                blockers = find_blockers(UpdatedGroup, groupNames)
+
+                if blockers:
+                    for groupID, reasons in blockers.items():
+                        messages.error(request, f"You can't delete Group {groupNames[groupID]}: {', '.join(reasons)} exist.")
                 else:
                     count, _ = groups_to_delete.delete()
                     if count > 0:
@@ -2318,7 +2076,8 @@ def deleteWork(request):
                 messages.error(request, "No work records selected for deletion.")
             else:
                 # Check if any of the selected work has pending work attached
-                has_pending = PendingWork.objects.filter(formID__in=formIDs).exists()
+                has_pending = (PendingWork.objects.filter(formID__in=formIDs).exists()
+                               or ArchivedPendingWork.objects.filter(formID__in=formIDs).exists())
 
                 if has_pending:
                     messages.error(request, "Some Pending Work exist. You can't delete work.")
@@ -2355,6 +2114,7 @@ def deletePendingWork(request):
                 messages.error(request, "No pending work records selected for deletion.")
             else:
                 count, _ = query(user, PendingWork).filter(pendingWorkID__in=pendingWorkIDs).delete()
+                count += delete_archived(query(user, ArchivedPendingWork).filter(pendingWorkID__in=pendingWorkIDs))
 
                 if count > 0:
                     messages.success(request, f"Deleted pending work record(s) successfully.")
@@ -2385,6 +2145,7 @@ def deleteAnnual(request):
                 messages.error(request, "No annual filing records selected for deletion.")
             else:
                 count, _ = query(user, AnnualFiling).filter(annualFilingID__in=annualFilingIDs).delete()
+                count += delete_archived(query(user, ArchivedAnnualFiling).filter(annualFilingID__in=annualFilingIDs))
 
                 if count > 0:
                     messages.success(request, f"Deleted annual filing record(s) successfully.")
@@ -2415,6 +2176,7 @@ def deleteTrademark(request):
                 messages.error(request, "No Trademark records selected for deletion.")
             else:
                 count, _ = query(user, Trademark).filter(trademarkID__in=trademarkIDs).delete()
+                count += delete_archived(query(user, ArchivedTrademark).filter(trademarkID__in=trademarkIDs))
                 
                 if count > 0:
                     messages.success(request, f"Deleted Trademark record(s) successfully.")
@@ -2520,72 +2282,116 @@ def feedBack(request):
     return render(request, 'contactUs/feedBack.html', context)
 
 
-def fetchGroupName(request):
-    if request.method == 'POST':
-        companyName = request.POST.get('companyName')  # Corrected typo
-        user = getUser(request).get('user')
+# Bulk import from CSV / XLSX
+@allow_only_client_users
+def importData(request):
+    user_data = getUser(request)
+    user = user_data.get('user')
+    base = user_data.get('base')
 
-        try:
-            company = query(user, UpdatedCompany).get(companyName=companyName)
-            groupName = company.groupID.groupName
-            companyType = company.companyType
-            try: 
-                client = query(user, UpdatedClient).get(companyID=company.companyID)
-                clientName = client.clientName
-                clientPhone = client.clientPhone
-            except:
-                clientName = ''
-                clientPhone = ''
-
-            response_data = {
-                'status': 'success',
-                'group_name': groupName,
-                'client_name': clientName,
-                'client_phone': clientPhone,
-                'company_type': companyType,  
-                'exists': True
-            }
-    
-        except UpdatedCompany.DoesNotExist:
-            response_data = {
-                'status': 'error',
-                'message': 'Company name does not exist',
-                'exists': False
-            }
-        
-        return JsonResponse(response_data)
-    
-    return JsonResponse({'status': 'error', 'message': 'Invalid request method'})
+    if not request.session.get('subAdminID'):
+        messages.error(request, "Only Admins have permission.")
+        return redirect('adminSignIn')
+
+    context = {
+        'base': base,
+        'user': user,
+        'importTypes': [(key, label, list(IMPORT_COLUMNS[key])) for key, label in IMPORT_LABELS.items()],
+    }
 
-def fetchFormDetails(request):
     if request.method == 'POST':
-        formNo = request.POST.get('formNo')  # Corrected typo
-        user = getUser(request).get('user')
+        import_type = request.POST.get('importType')
+        upload = request.FILES.get('importFile')
 
-        subAdminID = user.subAdminID
+        if import_type not in IMPORT_COLUMNS or not upload:
+            messages.error(request, "Please choose what to import and a file.")
+            return render(request, 'import/importData.html', context)
 
         try:
-            form = Work.objects.get(formNo=formNo, subAdminID=subAdminID)
-            
-            matter = form.matter
-            filingDays = form.filingDays
-
-            response_data = {
-                'status': 'success',
-                'form_matter': matter, 
-                'filing_days': filingDays,
-                'exists': True
-            }
-        except Work.DoesNotExist:
-            response_data = {
-                'status': 'error',
-                'message': 'Form does not exist',
-                'exists': False
-            }
-        
-        return JsonResponse(response_data)
-    
-    return JsonResponse({'status': 'error', 'message': 'Invalid request method'})
+            importer = Importer(user, import_type).run(read_rows(upload, import_type))
+        except ImportFileError as e:
+            messages.error(request, str(e))
+            return render(request, 'import/importData.html', context)
+        except SubAdminSubscription.DoesNotExist:
+            messages.error(request, "Subscription plan not found.")
+            return render(request, 'import/importData.html', context)
+
+        # Keep the full error list for the CSV report; the page shows the first rows
+        cache.set(f'import-errors:{user.subAdminID_id}', importer.errors, 3600)
+        context.update({
+            'importLabel': IMPORT_LABELS[import_type],
+            'created': importer.created,
+            'errorCount': len(importer.errors),
+            'errors': importer.errors[:100],
+        })
+        if importer.created:
+            messages.success(request, f"{importer.created} {IMPORT_LABELS[import_type]} row(s) imported.")
+        if importer.errors:
+            messages.error(request, f"{len(importer.errors)} row(s) could not be imported.")
+
+    return render(request, 'import/importData.html', context)
+
+@allow_only_client_users
+def importErrors(request):
+    user = getUser(request).get('user')
+    errors = cache.get(f'import-errors:{user.subAdminID_id}') or []
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="import errors.csv"'
+    writer = csv.writer(response)
+    writer.writerow(['Row', 'Error'])
+    writer.writerows(errors)
+    return response
+
+
+# Company and form details behind the autocomplete fields of the add/update forms.
+# The browser loads them once per page and revalidates with the ETag, which
+# changes whenever a company, group, client or form of the tenant is written.
+LOOKUP_NAMESPACES = ('companies', 'groups', 'clients', 'forms')
+
+def lookupEtag(request):
+    user = resolve_principal(request).user
+    if user is None:
+        return None
+    versions = '-'.join(str(tenant_version(user.subAdminID_id, namespace)) for namespace in LOOKUP_NAMESPACES)
+    return f'{user.subAdminID_id}-{user.groupID_id}-{versions}'
+
+def buildLookupMaps(user):
+    # companyName -> [groupName, companyType, clientName, clientPhone, companyID]
+    companies = {
+        companyName: [groupName, companyType, '', '', companyID]
+        for companyID, companyName, companyType, groupName in
+        query(user, UpdatedCompany).values_list('companyID', 'companyName', 'companyType', 'groupID__groupName')
+    }
+    clients = {}
+    for companyName, clientName, clientPhone in query(user, UpdatedClient).values_list(
+            'companyID__companyName', 'clientName', 'clientPhone'):
+        clients.setdefault(companyName, []).append((clientName, clientPhone))
+    for companyName, companyClients in clients.items():
+        # The client is only filled in when the company has exactly one
+        if companyName in companies and len(companyClients) == 1:
+            companies[companyName][2:4] = companyClients[0]
+
+    # formNo -> [matter, filingDays, formID]
+    forms = {
+        formNo: [matter, filingDays, formID]
+        for formID, formNo, matter, filingDays in
+        Work.objects.filter(subAdminID=user.subAdminID).values_list('formID', 'formNo', 'matter', 'filingDays')
+    }
+    return {'companies': companies, 'forms': forms}
+
+@require_GET
+@condition(etag_func=lookupEtag)
+def lookupMaps(request):
+    user = resolve_principal(request).user
+    if user is None:
+        return JsonResponse({'status': 'error', 'message': 'Not signed in'}, status=403)
+
+    maps = tenant_cached(user.subAdminID_id, 'companies', f'lookup:{lookupEtag(request)}',
+                         lambda: buildLookupMaps(user))
+    response = JsonResponse({'status': 'success', **maps})
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 import urllib.parse
 def send_whatsapp_message(phone_number, client_name, status, person):